@@ -0,0 +1,278 @@
+# benchmarks/pipeline_benchmark.py
+"""
+End-to-end pipeline benchmark on synthetic statements.
+
+    PYTHONPATH=src python benchmarks/pipeline_benchmark.py --sizes 1k 100k --formats csv xlsx pdf
+    PYTHONPATH=src python benchmarks/pipeline_benchmark.py --sizes 1k --baseline benchmarks/baseline.json
+    PYTHONPATH=src python benchmarks/pipeline_benchmark.py --sizes 1k --save-baseline benchmarks/baseline.json
+
+For every (format, size) statement from synthetic_statements.py it times:
+
+    parse        parse_bank_statement_file (includes its rule_based_labeling pass)
+    label        rule_based_labeling on the raw rows alone
+    export       labeled CSV + DOCX export (utils.exporters.export_labeled)
+    index.add    FaissIndexer.add over the document's chunks (capped by --index-chunks)
+    index.search FaissIndexer.search, one query at a time (latency percentiles)
+    orchestrate  orchestrate() on an analysis, a retrieval and a duplicates question;
+                 the first (cold, parses + indexes) call is reported on its own
+
+Mongo is replaced by the SQLite backend in a scratch directory and Ollama
+by a stub that answers instantly, so the numbers are the pipeline's own
+cost. Auto Q/A generation + fine-tuning is switched off. Every stage
+records items/sec, latency percentiles, the process peak RSS and, with
+--trace-memory, the peak Python allocation of that stage (tracemalloc
+slows the stage down; compare like with like).
+
+Results are written to --out as JSON. With --baseline, each stage is
+compared to the stored run: throughput lower than (1 - tolerance) x
+baseline, or p95 latency higher than (1 + tolerance) x baseline, is a
+regression and makes the exit code 1.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(HERE, "..", "src")))
+sys.path.insert(0, HERE)
+
+from synthetic_statements import write_statement, generate_rows, parse_size, WRITERS  # noqa: E402
+
+STAGES = ["parse", "label", "export", "index", "orchestrate"]
+QUERIES = [
+    "debit by month",
+    "how much was paid to uber?",
+    "any duplicate payments?",
+]
+
+
+def _sandbox(workdir: str):
+    """Point every store at a scratch directory; must run before the pipeline modules are imported."""
+    os.environ.update({
+        "STORAGE_BACKEND": "sqlite",
+        "SQLITE_PATH": os.path.join(workdir, "audit_ai.db"),
+        "FAISS_INDEX_PATH": os.path.join(workdir, "faiss.index"),
+        "TX_STORE_DIR": os.path.join(workdir, "transactions"),
+        "TX_INDEX_PATH": os.path.join(workdir, "transaction_index.db"),
+        "CATEGORY_CACHE_PATH": os.path.join(workdir, "category_cache.db"),
+        "CATEGORIZER_LLM": "0",
+        "LLM_BACKEND": "ollama",
+    })
+    os.chdir(workdir)     # logs/ and datasets/ written relative to cwd
+
+
+def _stub_ollama():
+    from llm import answer_generator
+    answer_generator._pick_model = lambda: "stub"
+    answer_generator._call_ollama = lambda prompt, model=None, max_tokens=512: "stub answer"
+    from orchestration import orchestrator
+    orchestrator._generate_and_save_qas = lambda shared_context: 0
+
+
+# ---------------------------------------
+# measurement
+# ---------------------------------------
+def peak_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:     # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def _percentile(values: list, p: float):
+    if not values:
+        return None
+    s = sorted(values)
+    return s[min(len(s) - 1, int(round(p * (len(s) - 1))))]
+
+
+def measure(fn, items: int = 1, repeat: int = 1, trace_memory: bool = False) -> dict:
+    """Run fn `repeat` times; items = work units per run (rows, chunks, queries)."""
+    latencies = []
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            latencies.append(time.perf_counter() - start)
+        peak_alloc = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    total = sum(latencies)
+    out = {
+        "items": items * repeat,
+        "seconds": round(total, 4),
+        "items_per_sec": round(items * repeat / total, 1) if total else None,
+        "p50_ms": round(1000 * _percentile(latencies, 0.5), 3),
+        "p95_ms": round(1000 * _percentile(latencies, 0.95), 3),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    if peak_alloc is not None:
+        out["peak_alloc_mb"] = round(peak_alloc / (1024 * 1024), 1)
+    return out
+
+
+# ---------------------------------------
+# stages
+# ---------------------------------------
+def bench_statement(path: str, n_rows: int, args) -> dict:
+    from parsers.bank_statement_parser import parse_bank_statement_file, rule_based_labeling
+    from utils.exporters import export_labeled
+    from rag.faiss_indexer import FaissIndexer
+
+    out = {}
+    parsed = {}
+    tm = args.trace_memory
+    stages = set(args.stages)
+
+    def parse():
+        parsed.update(parse_bank_statement_file(path))
+    out["parse"] = measure(parse, n_rows, trace_memory=tm)
+    out["parse"]["rows_parsed"] = len(parsed.get("rows", []))
+
+    if "label" in stages:
+        raw = list(generate_rows(n_rows, args.seed))
+        out["label"] = measure(lambda: rule_based_labeling(raw), n_rows, trace_memory=tm)
+        del raw
+
+    if "export" in stages:
+        rows = parsed.get("rows", [])
+        target = os.path.join(args.workdir, "exports", os.path.basename(path))
+        out["export"] = measure(lambda: export_labeled(rows, target + ".csv", target + ".docx"), len(rows),
+                                trace_memory=tm)
+
+    if "index" in stages:
+        chunks = parsed.get("chunks", [])[:args.index_chunks]
+        texts = [c["text"] for c in chunks]
+        metas = [{"document_id": "bench", "chunk_id": i, "text": t} for i, t in enumerate(texts)]
+        index = FaissIndexer()
+        if texts:
+            out["index.add"] = measure(lambda: index.add(texts, metas, save=False), len(texts), trace_memory=tm)
+            out["index.add"]["chunks_total"] = len(parsed.get("chunks", []))
+            queries = [QUERIES[i % len(QUERIES)] for i in range(args.queries)]
+            it = iter(queries)
+            out["index.search"] = measure(lambda: index.search(next(it), k=5), 1, repeat=len(queries))
+    return out
+
+
+def bench_orchestrate(path: str, n_rows: int, args) -> dict:
+    from orchestration.orchestrator import orchestrate
+    out = {}
+    if n_rows > args.orchestrate_max_rows:
+        return {"orchestrate": {"skipped": f"{n_rows} rows > --orchestrate-max-rows {args.orchestrate_max_rows}"}}
+    out["orchestrate.cold"] = measure(lambda: orchestrate({"user_query": QUERIES[0], "doc_id": path}), 1)
+    queries = [QUERIES[i % len(QUERIES)] for i in range(args.queries)]
+    it = iter(queries)
+    out["orchestrate.warm"] = measure(lambda: orchestrate({"user_query": next(it), "doc_id": path}), 1,
+                                      repeat=len(queries))
+    return out
+
+
+# ---------------------------------------
+# baseline comparison
+# ---------------------------------------
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    rows = []
+    for case, stages in results["cases"].items():
+        for stage, cur in stages.items():
+            ref = baseline.get("cases", {}).get(case, {}).get(stage)
+            if not ref or "skipped" in cur or "skipped" in ref:
+                continue
+            row = {"case": case, "stage": stage, "regression": False}
+            if cur.get("items_per_sec") and ref.get("items_per_sec"):
+                row["throughput_ratio"] = round(cur["items_per_sec"] / ref["items_per_sec"], 3)
+                row["regression"] |= row["throughput_ratio"] < 1 - tolerance
+            if cur.get("p95_ms") and ref.get("p95_ms"):
+                row["p95_ratio"] = round(cur["p95_ms"] / ref["p95_ms"], 3)
+                row["regression"] |= row["p95_ratio"] > 1 + tolerance
+            rows.append(row)
+    return rows
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="End-to-end pipeline benchmark on synthetic statements")
+    ap.add_argument("--sizes", nargs="+", default=["1k"], help="row counts, e.g. 1k 100k 1m")
+    ap.add_argument("--formats", nargs="+", default=list(WRITERS), choices=list(WRITERS))
+    ap.add_argument("--stages", nargs="+", default=STAGES, choices=STAGES,
+                    help="parse always runs: the other stages use its output")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--queries", type=int, default=20, help="queries per search / orchestrate run")
+    ap.add_argument("--index-chunks", type=int, default=2000, help="chunks embedded per statement")
+    ap.add_argument("--orchestrate-max-rows", type=int, default=100_000)
+    ap.add_argument("--data-dir", default=os.path.join("datasets", "synthetic"),
+                    help="where generated statements are cached")
+    ap.add_argument("--out", default=os.path.join(HERE, "results"))
+    ap.add_argument("--baseline", help="compare against this results JSON")
+    ap.add_argument("--save-baseline", help="also write the results here")
+    ap.add_argument("--tolerance", type=float, default=0.2)
+    ap.add_argument("--trace-memory", action="store_true", help="per-stage tracemalloc peak (slower)")
+    ap.add_argument("--keep-workdir", action="store_true")
+    args = ap.parse_args(argv)
+
+    data_dir = os.path.abspath(args.data_dir)
+    out_dir = os.path.abspath(args.out)
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+    save_baseline = os.path.abspath(args.save_baseline) if args.save_baseline else None
+    args.workdir = tempfile.mkdtemp(prefix="audit-bench-")
+    _sandbox(args.workdir)
+    if "orchestrate" in args.stages:
+        _stub_ollama()
+
+    results = {
+        "created_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "args": {k: v for k, v in vars(args).items() if k not in ("workdir",)},
+        "cases": {},
+    }
+    try:
+        for size in args.sizes:
+            n = parse_size(size)
+            for fmt in args.formats:
+                case = f"{fmt}/{n}"
+                started = time.perf_counter()
+                path = write_statement(fmt, n, data_dir, args.seed)
+                print(f"[bench] {case}: statement ready in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+                stages = bench_statement(path, n, args)
+                if "orchestrate" in args.stages:
+                    stages.update(bench_orchestrate(path, n, args))
+                results["cases"][case] = stages
+                print(f"[bench] {case}: " + ", ".join(
+                    f"{s}={v.get('items_per_sec')}/s" for s, v in stages.items() if "items_per_sec" in v
+                ), file=sys.stderr)
+    finally:
+        if not args.keep_workdir:
+            shutil.rmtree(args.workdir, ignore_errors=True)
+
+    exit_code = 0
+    if baseline_path:
+        with open(baseline_path, "r", encoding="utf-8") as f:
+            results["comparison"] = compare(results, json.load(f), args.tolerance)
+        regressions = [r for r in results["comparison"] if r["regression"]]
+        results["regressions"] = len(regressions)
+        exit_code = 1 if regressions else 0
+
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"pipeline_{datetime.utcnow():%Y%m%dT%H%M%S}.json")
+    for target in filter(None, (path, save_baseline)):
+        with open(target, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    print(json.dumps({"results": path, "regressions": results.get("regressions"),
+                      "comparison": results.get("comparison")}, indent=2))
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
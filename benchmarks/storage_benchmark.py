@@ -0,0 +1,109 @@
+# benchmarks/storage_benchmark.py
+"""
+Compare storage backends on the operations the pipeline performs.
+
+    PYTHONPATH=src python benchmarks/storage_benchmark.py --backends sqlite mongo --docs 200
+
+For each backend: document ingest (header + chunks + text), batched chunk
+fetch for retrieval hits, header lookups with projection, queued log
+writes (timed until flushed) and registry upserts. Prints a JSON report
+with ops/sec and mean latency per operation.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+from db.storage import create_backend, set_backend  # noqa: E402
+from db import mongo_client  # noqa: E402
+
+
+def _timed(n_ops: int, fn) -> dict:
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    return {"ops": n_ops, "seconds": round(elapsed, 4), "ops_per_sec": round(n_ops / elapsed, 1) if elapsed else None,
+            "mean_ms": round(1000 * elapsed / n_ops, 3) if n_ops else None}
+
+
+def run(backend_name: str, n_docs: int, chunks_per_doc: int, n_logs: int, seed: int = 7) -> dict:
+    rng = random.Random(seed)
+    if backend_name == "sqlite":
+        os.environ.setdefault("SQLITE_PATH", os.path.join(tempfile.mkdtemp(), "bench.db"))
+        from db.sqlite_backend import SQLiteBackend
+        backend = SQLiteBackend(os.environ["SQLITE_PATH"])
+    else:
+        backend = create_backend(backend_name)
+    set_backend(backend)
+
+    doc_ids = []
+
+    def ingest():
+        for d in range(n_docs):
+            chunks = [{"text": f"2025-01-{c % 28 + 1:02d} PAYMENT {rng.randint(1, 9999)} " * 10, "start": c * 500, "end": c * 500 + 500}
+                      for c in range(chunks_per_doc)]
+            saved = mongo_client.insert_document({
+                "filename": f"bench-{d}.csv",
+                "text": "".join(c["text"] for c in chunks),
+                "chunks": chunks,
+                "metadata": {"filetype": ".csv"},
+                "version": 1,
+            })
+            doc_ids.append(str(saved["_id"]))
+
+    def fetch_chunks():
+        for _ in range(n_docs):
+            refs = [(rng.choice(doc_ids), rng.randrange(chunks_per_doc)) for _ in range(5)]
+            mongo_client.find_chunks_many(refs)
+
+    def headers():
+        for doc_id in doc_ids:
+            mongo_client.find_document(doc_id, fields=["filename", "version"])
+
+    def logs():
+        for i in range(n_logs):
+            mongo_client.insert_log("run_executor", f"bench-{i}", {"type": "retrieve"}, {"retrieved_chunks": [{"text": "x" * 200}] * 5})
+        mongo_client.flush_writes()
+
+    def registry():
+        for i in range(n_docs):
+            mongo_client.upsert_registry_entry(f"bench-hash-{i}", {"path": f"/tmp/bench-{i}.csv"},
+                                               {"filename": f"bench-{i}.csv", "version": 1})
+
+    report = {
+        "backend": backend_name,
+        "insert_document": _timed(n_docs, ingest),
+        "find_chunks_many (5 hits)": _timed(n_docs, fetch_chunks),
+        "find_document (projection)": _timed(len(doc_ids), headers),
+        "insert_log (queued + flush)": _timed(n_logs, logs),
+        "upsert_registry_entry": _timed(n_docs, registry),
+    }
+    backend.close()
+    set_backend(None)
+    return report
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--backends", nargs="+", default=["sqlite", "mongo"])
+    ap.add_argument("--docs", type=int, default=200)
+    ap.add_argument("--chunks", type=int, default=20)
+    ap.add_argument("--logs", type=int, default=2000)
+    args = ap.parse_args()
+
+    results = []
+    for name in args.backends:
+        try:
+            results.append(run(name, args.docs, args.chunks, args.logs))
+        except Exception as e:
+            results.append({"backend": name, "error": f"{type(e).__name__}: {e}"})
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+# benchmarks/synthetic_statements.py
+"""
+Deterministic synthetic bank statements for benchmarks.
+
+    PYTHONPATH=src python benchmarks/synthetic_statements.py --rows 100000 --formats csv xlsx pdf --out /tmp/stmts
+
+The same (rows, seed) always produces the same statement: dated rows with
+a merchant description, a debit or a credit, and a running balance that
+reconciles. Writers are stdlib only and stream row by row, so 1M-row
+files do not need the rows in memory twice:
+
+- CSV   Date, Description, Debit, Credit, Balance
+- XLSX  one sheet, inline strings (read by pandas / openpyxl)
+- PDF   multi-page, one ruled table per page (pdfplumber's extract_table
+        finds it), ROWS_PER_PAGE rows per page
+"""
+import os
+import csv
+import random
+import zipfile
+import argparse
+from datetime import date, timedelta
+from xml.sax.saxutils import escape
+
+HEADER = ["Date", "Description", "Debit", "Credit", "Balance"]
+ROWS_PER_PAGE = 40
+
+MERCHANTS = [
+    ("UBER TRIP", 8, 40), ("UBER EATS", 12, 60), ("AMAZON MKTPLACE", 10, 250), ("WALMART SUPERCENTER", 15, 180),
+    ("STARBUCKS", 3, 12), ("NETFLIX.COM", 9, 20), ("SHELL FUEL", 25, 90), ("ELECTRICITY BOARD", 40, 160),
+    ("RENT PAYMENT", 900, 1800), ("ATM CASH WITHDRAWAL", 20, 400), ("SERVICE CHARGE", 1, 25),
+    ("INSURANCE PREMIUM", 50, 300), ("LOAN EMI", 200, 900), ("ACME SUPPLIES LTD", 30, 2000),
+]
+CREDITS = [("SALARY ACME CORP", 2500, 6000), ("NEFT TRANSFER FROM", 50, 1500), ("REFUND AMAZON", 5, 200),
+           ("INTEREST CREDIT", 1, 30)]
+
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+
+def parse_size(text: str) -> int:
+    return SIZES.get(text.lower()) or int(text)
+
+
+def generate_rows(n: int, seed: int = 7, start: date = date(2024, 1, 1)):
+    """Yield n statement rows as dicts (Date, Description, Debit, Credit, Balance)."""
+    rng = random.Random(seed)
+    balance = 5000.0
+    day = start
+    for i in range(n):
+        if rng.random() < 0.35:
+            day += timedelta(days=1)
+        if rng.random() < 0.2:
+            name, lo, hi = rng.choice(CREDITS)
+            amount = round(rng.uniform(lo, hi), 2)
+            debit, credit = "", f"{amount:.2f}"
+            balance += amount
+        else:
+            name, lo, hi = rng.choice(MERCHANTS)
+            amount = round(rng.uniform(lo, hi), 2)
+            debit, credit = f"{amount:.2f}", ""
+            balance -= amount
+        yield {
+            "Date": day.isoformat(),
+            "Description": f"{name} REF{seed:02d}{i:07d}",
+            "Debit": debit,
+            "Credit": credit,
+            "Balance": f"{balance:.2f}",
+        }
+
+
+# ---------------------------------------
+# writers
+# ---------------------------------------
+def write_csv(rows, path: str) -> str:
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=HEADER)
+        writer.writeheader()
+        writer.writerows(rows)
+    return path
+
+
+_XLSX_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/></Relationships>'
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Statement" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/></Relationships>'
+    ),
+}
+
+
+def _xlsx_cell(value) -> str:
+    if value == "":
+        return "<c/>"
+    try:
+        float(value)
+        return f"<c><v>{value}</v></c>"
+    except ValueError:
+        return f'<c t="inlineStr"><is><t>{escape(value)}</t></is></c>'
+
+
+def write_xlsx(rows, path: str) -> str:
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, xml in _XLSX_PARTS.items():
+            zf.writestr(name, xml)
+        with zf.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as out:
+            out.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                      b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+            out.write(("<row>" + "".join(_xlsx_cell(h) for h in HEADER) + "</row>").encode("utf-8"))
+            block = []
+            for row in rows:
+                block.append("<row>" + "".join(_xlsx_cell(row[h]) for h in HEADER) + "</row>")
+                if len(block) >= 1000:
+                    out.write("".join(block).encode("utf-8"))
+                    block = []
+            out.write(("".join(block) + "</sheetData></worksheet>").encode("utf-8"))
+    return path
+
+
+# PDF page geometry (points): A4 portrait, one ruled table per page
+_PAGE_W, _PAGE_H = 595, 842
+_COLS = [40, 110, 370, 440, 500, 565]       # column boundaries
+_TOP, _ROW_H = 800, 18
+
+
+def _pdf_text(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _page_stream(page_rows: list) -> bytes:
+    lines = [HEADER] + [[r[h] for h in HEADER] for r in page_rows]
+    bottom = _TOP - _ROW_H * len(lines)
+    ops = ["0.5 w"]
+    for i in range(len(lines) + 1):
+        y = _TOP - i * _ROW_H
+        ops.append(f"{_COLS[0]} {y} m {_COLS[-1]} {y} l S")
+    for x in _COLS:
+        ops.append(f"{x} {_TOP} m {x} {bottom} l S")
+    ops.append("BT /F1 8 Tf")
+    for i, cells in enumerate(lines):
+        y = _TOP - (i + 1) * _ROW_H + 6
+        for x, cell in zip(_COLS, cells):
+            ops.append(f"1 0 0 1 {x + 3} {y} Tm ({_pdf_text(cell)}) Tj")
+    ops.append("ET")
+    return "\n".join(ops).encode("latin-1")
+
+
+def write_pdf(rows, path: str, rows_per_page: int = ROWS_PER_PAGE) -> str:
+    """Objects: 1 catalog, 2 pages, 3 font, then (page, content) pairs."""
+    offsets = {}
+    page_ids = []
+    with open(path, "wb") as f:
+        def obj(num: int, body: bytes):
+            offsets[num] = f.tell()
+            f.write(f"{num} 0 obj\n".encode() + body + b"\nendobj\n")
+
+        f.write(b"%PDF-1.4\n")
+        obj(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+        num = 4
+        rows = iter(rows)
+        while True:
+            page_rows = [r for _, r in zip(range(rows_per_page), rows)]
+            if not page_rows:
+                break
+            stream = _page_stream(page_rows)
+            obj(num + 1, f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream")
+            obj(num, (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {_PAGE_W} {_PAGE_H}] "
+                      f"/Resources << /Font << /F1 3 0 R >> >> /Contents {num + 1} 0 R >>").encode())
+            page_ids.append(num)
+            num += 2
+        kids = " ".join(f"{p} 0 R" for p in page_ids)
+        obj(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode())
+        obj(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+
+        xref = f.tell()
+        f.write(f"xref\n0 {num}\n0000000000 65535 f \n".encode())
+        for i in range(1, num):
+            f.write(f"{offsets[i]:010d} 00000 n \n".encode())
+        f.write(f"trailer\n<< /Size {num} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+    return path
+
+
+WRITERS = {"csv": write_csv, "xlsx": write_xlsx, "pdf": write_pdf}
+
+
+def write_statement(fmt: str, n: int, out_dir: str, seed: int = 7) -> str:
+    """Write (or reuse) statement_<n>_<seed>.<fmt> in out_dir."""
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"statement_{n}_{seed}.{fmt}")
+    if not os.path.exists(path):
+        tmp = path + ".part"
+        WRITERS[fmt](generate_rows(n, seed), tmp)
+        os.replace(tmp, path)
+    return path
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Write deterministic synthetic bank statements")
+    ap.add_argument("--rows", nargs="+", default=["1k"], help="row counts, e.g. 1k 100k 1m")
+    ap.add_argument("--formats", nargs="+", default=list(WRITERS), choices=list(WRITERS))
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--out", default=os.path.join("datasets", "synthetic"))
+    args = ap.parse_args()
+    for size in args.rows:
+        for fmt in args.formats:
+            print(write_statement(fmt, parse_size(size), args.out, args.seed))
+
+
+if __name__ == "__main__":
+    main()
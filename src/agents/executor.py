@@ -1,13 +1,27 @@
 # src/agents/executor.py
 import os
-from db.mongo_client import insert_document, find_document
-from parsers.bank_statement_parser import parse_bank_statement_file
-from rag.faiss_indexer import FaissIndexer
+import threading
+from db.mongo_client import insert_document, find_chunks_many
+from db.document_registry import register_document, mark_stage, is_done, resolve_document_id, superseded_document_id
 from utils.logger import logger
-from llm.answer_generator import generate_final_answer
-import pandas as pd
 
-faiss_index = FaissIndexer()
+RETRIEVE_TOP_K = int(os.getenv("RETRIEVE_TOP_K", "3"))
+
+# Heavy dependencies (pandas/pyarrow, pdfplumber, FAISS + sentence-transformers,
+# the LLM client) are imported inside the task branches that use them.
+
+_faiss_index = None
+_faiss_lock = threading.Lock()
+
+def get_faiss_index():
+    """Process-wide FAISS index, loaded on first use."""
+    global _faiss_index
+    if _faiss_index is None:
+        with _faiss_lock:
+            if _faiss_index is None:
+                from rag.faiss_indexer import FaissIndexer
+                _faiss_index = FaissIndexer()
+    return _faiss_index
 
 def run_executor(payload: dict) -> dict:
     task = payload.get("task", {})
@@ -19,39 +33,96 @@ def run_executor(payload: dict) -> dict:
     # 1. PARSE DOCUMENT
     # ---------------------------------------
     if ttype == "parse":
+        from db.transaction_store import write_transactions, has_transactions, load_rows
+        from db.transaction_index import index_transactions
+        from parsers.bank_statement_parser import parse_bank_statement_file
+        from parsers.categorizer import categorize_rows
+        from parsers.chunker import chunk_meta
+
         doc_id = args.get("doc_id")
+        entry = register_document(doc_id)
+        content_hash = entry["_id"]
+        document_id = entry.get("document_id")
+
+        # Known content with every ingest stage done -> nothing to redo
+        if is_done(entry, "parsed", "indexed") and has_transactions(document_id):
+            return {
+                "status": "ok",
+                "document_id": document_id,
+                "version": entry.get("version"),
+                "skipped": True,
+                "parsed_rows": load_rows(document_id)
+            }
+
         parsed = parse_bank_statement_file(doc_id)
 
-        # Save parsed doc to MongoDB
-        doc_record = {
-            "filename": os.path.basename(doc_id),
-            "text": parsed.get("text", ""),
-            "chunks": parsed.get("chunks", []),
-            "metadata": parsed.get("metadata", {}),
-            "source": "upload",
-            "version": 1
-        }
-        saved = insert_document(doc_record)
+        if not is_done(entry, "parsed") or not document_id:
+            # Save parsed doc to MongoDB
+            doc_record = {
+                "filename": os.path.basename(doc_id),
+                "text": parsed.get("text", ""),
+                "chunks": parsed.get("chunks", []),
+                "metadata": parsed.get("metadata", {}),
+                "source": "upload",
+                "version": entry.get("version", 1),
+                "content_hash": content_hash
+            }
+            saved = insert_document(doc_record)
+            document_id = str(saved["_id"])
+
+        # Categories first: the anomaly stats and the aggregates are per category
+        rows = categorize_rows(parsed.get("rows", []))
+        # Persist the transactions (+ aggregates) for the analysis task
+        write_transactions(document_id, rows)
+        # Cross-document duplicate / anomaly index (no-op if already indexed);
+        # the version this upload replaces leaves the index first
+        flagged = index_transactions(document_id, rows, supersedes=superseded_document_id(entry))
+        mark_stage(content_hash, "parsed", document_id=document_id)
 
         # Save chunks to FAISS
-        if parsed.get("chunks"):
-            texts = [c["text"] for c in parsed["chunks"]]
-            metas = [
-                {"document_id": str(saved["_id"]), "chunk_id": i, "text": texts[i]}
-                for i in range(len(texts))
-            ]
-            faiss_index.add(texts, metas)
+        if not is_done(entry, "indexed"):
+            if parsed.get("chunks"):
+                texts = [c["text"] for c in parsed["chunks"]]
+                metas = [
+                    {"document_id": document_id, "chunk_id": i, "text": texts[i], **chunk_meta(c)}
+                    for i, c in enumerate(parsed["chunks"])
+                ]
+                get_faiss_index().add(texts, metas)
+            mark_stage(content_hash, "indexed")
 
         return {
             "status": "ok",
-            "document_id": str(saved["_id"]),
-            "parsed_rows": parsed.get("rows", [])
+            "document_id": document_id,
+            "version": entry.get("version"),
+            "parsed_rows": parsed.get("rows", []),
+            "flags": {"duplicates": len(flagged["duplicates"]), "anomalies": len(flagged["anomalies"])}
         }
 
     # ---------------------------------------
-    # 2. ANALYSIS (TOTAL DEBIT / TOTAL CREDIT)
+    # 2. ANALYSIS (TOTALS / GROUP-BY / DATE RANGE)
     # ---------------------------------------
     if ttype == "analysis":
+        import pandas as pd
+        from db.transaction_store import has_transactions, query_transactions
+
+        memory = payload.get("context", {}).get("memory", {})
+        document_id = (
+            memory.get("document_id")
+            or args.get("document_id")
+            or resolve_document_id(args.get("doc_id"))
+        )
+
+        # Vectorized query against the persisted transaction store
+        if has_transactions(document_id):
+            return {
+                "analysis": query_transactions(
+                    document_id,
+                    group_by=args.get("group_by"),
+                    start_date=args.get("start_date"),
+                    end_date=args.get("end_date"),
+                )
+            }
+
         rows = args.get("rows", [])
         df = pd.DataFrame(rows)
 
@@ -65,6 +136,22 @@ def run_executor(payload: dict) -> dict:
             }
         }
 
+    # ---------------------------------------
+    # 2b. DUPLICATES / ANOMALIES (CROSS-DOCUMENT INDEX)
+    # ---------------------------------------
+    if ttype == "anomalies":
+        from db.transaction_index import find_flags
+
+        memory = payload.get("context", {}).get("memory", {})
+        document_id = None
+        if args.get("scope") != "all":
+            document_id = (
+                memory.get("document_id")
+                or args.get("document_id")
+                or resolve_document_id(args.get("doc_id"))
+            )
+        return {"anomalies": find_flags(document_id, kind=args.get("kind"))}
+
     # ---------------------------------------
     # 3. GENERATE SUMMARY (PLACEHOLDER)
     # ---------------------------------------
@@ -76,30 +163,36 @@ def run_executor(payload: dict) -> dict:
     # ---------------------------------------
     if ttype == "retrieve":
         query = args.get("query", "")
+        faiss_index = get_faiss_index()
 
         if faiss_index.index is None or faiss_index.index.ntotal == 0:
             return {"error": "No indexed documents found. Upload a statement first."}
 
-        hits = faiss_index.search(query, k=5)
+        # hits may be prefetched by a batched search (orchestrate_many)
+        hits = args.get("hits")
+        if hits is None:
+            # metadata filters (document, date / amount range) narrow the
+            # candidates before the vector search, so few chunks are enough
+            hits = faiss_index.search(query, k=args.get("k", RETRIEVE_TOP_K), filters=args.get("filters"))
         if not hits:
             return {
                 "results": [],
                 "message": "No relevant chunks found."
             }
 
+        # one projected query for all hit chunks
+        chunks = find_chunks_many([(h["document_id"], h["chunk_id"]) for h in hits])
+
         out = []
         for hit in hits:
-            doc = find_document(hit["document_id"])
-            if not doc:
+            chunk = chunks.get((str(hit["document_id"]), hit["chunk_id"]))
+            if not chunk:
                 continue
 
-            chunk_id = hit["chunk_id"]
-            chunk_text = doc["chunks"][chunk_id]["text"]
-
             out.append({
                 "document_id": hit["document_id"],
-                "chunk_id": chunk_id,
-                "text": chunk_text
+                "chunk_id": hit["chunk_id"],
+                "text": chunk["text"]
             })
 
         return {"retrieved_chunks": out}
@@ -108,6 +201,8 @@ def run_executor(payload: dict) -> dict:
     # 5. ANSWER USING OLLAMA (LOCAL LLM)
     # ---------------------------------------
     if ttype == "answer":
+        from llm.answer_generator import generate_final_answer
+
         query = args.get("query") or ""
 
         # get memory (shared context)
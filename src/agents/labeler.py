@@ -1,42 +1,35 @@
 # src/agents/labeler.py
 from parsers.bank_statement_parser import parse_bank_statement_file, rule_based_labeling
 from db.mongo_client import insert_labeled_document
+from db.document_registry import register_document, mark_stage, is_done
+from db.transaction_store import has_transactions, load_rows, write_transactions
+from parsers.categorizer import categorize_rows
 from utils.logger import logger
+from utils.exporters import CSV_FIELDS, to_columns, write_csv, write_docx, export_labeled, read_csv
 import os
-import csv
-from docx import Document
 
 def export_labeled_csv(labeled_rows, out_path):
-    keys = ["line_id", "date", "description", "debit", "credit", "balance", "category", "raw"]
-    with open(out_path, "w", newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=keys)
-        writer.writeheader()
-        for r in labeled_rows:
-            row = {k: r.get(k) for k in keys}
-            writer.writerow(row)
+    write_csv(to_columns(labeled_rows, CSV_FIELDS), out_path)
 
 def export_labeled_docx(labeled_rows, out_path):
-    doc = Document()
-    doc.add_heading('Labeled Bank Statement', level=1)
-    table = doc.add_table(rows=1, cols=7)
-    hdr = table.rows[0].cells
-    hdr[0].text = 'Line'
-    hdr[1].text = 'Date'
-    hdr[2].text = 'Description'
-    hdr[3].text = 'Debit'
-    hdr[4].text = 'Credit'
-    hdr[5].text = 'Balance'
-    hdr[6].text = 'Category'
-    for r in labeled_rows:
-        row_cells = table.add_row().cells
-        row_cells[0].text = str(r.get('line_id', ''))
-        row_cells[1].text = str(r.get('date', '') or '')
-        row_cells[2].text = str(r.get('description', '') or '')
-        row_cells[3].text = str(r.get('debit', '') or '')
-        row_cells[4].text = str(r.get('credit', '') or '')
-        row_cells[5].text = str(r.get('balance', '') or '')
-        row_cells[6].text = str(r.get('category', '') or '')
-    doc.save(out_path)
+    write_docx(to_columns(labeled_rows, CSV_FIELDS), out_path)
+
+def export_paths(doc_path: str, content_hash: str):
+    """Labeled CSV / DOCX paths; keyed on the content hash so same-named files never collide."""
+    name = f"{os.path.basename(doc_path)}.{content_hash[:12]}"
+    return (os.path.join("datasets", "labeled_data", name + ".csv"),
+            os.path.join("outputs", "labeled_docs", name + ".docx"))
+
+def _stored_labels(entry: dict):
+    """Labels of already-labeled content: from the transaction store, else from its exports; None if gone."""
+    document_id = entry.get("document_id")
+    if has_transactions(document_id):
+        return load_rows(document_id)
+    # labeled but never parsed: no document_id, the exports are all there is
+    exports = [entry.get("labeled_csv"), entry.get("labeled_docx")]
+    if not document_id and exports[0] and all(os.path.exists(p) for p in exports if p):
+        return read_csv(exports[0])
+    return None
 
 def run_labeler(payload: dict) -> dict:
     task = payload.get("task", {})
@@ -45,22 +38,32 @@ def run_labeler(payload: dict) -> dict:
     doc_path = args.get("doc_id")
     if not doc_path:
         return {"status": "error", "message": "doc_id (path) required"}
+    entry = register_document(doc_path)
+    document_id = entry.get("document_id")
+    # Same content already labeled -> reuse the stored labels and exports
+    labeled = _stored_labels(entry) if is_done(entry, "labeled") else None
+    if labeled is not None:
+        return {"status": "ok", "labeled_count": len(labeled), "csv": entry.get("labeled_csv"),
+                "docx": entry.get("labeled_docx"), "labels": labeled, "skipped": True}
     parsed = parse_bank_statement_file(doc_path)
-    labeled = parsed.get("rows", [])
-    # Optionally call LLM for ambiguous rows (not implemented here; placeholder)
+    # keyword rules -> category cache -> batched LLM for the rest
+    labeled = categorize_rows(parsed.get("rows", []))
+    if document_id:
+        # keep the transaction store's category aggregates in step with the labels
+        write_transactions(document_id, labeled)
     # Save labeled JSON to DB and disk
     record = {
+        "document_id": document_id,
         "document_path": doc_path,
         "labels": labeled,
         "labeler_version": "v0.2"
     }
     saved = insert_labeled_document(record)
     os.makedirs("datasets/labeled_data", exist_ok=True)
-    out_csv = os.path.join("datasets", "labeled_data", os.path.basename(doc_path) + ".csv")
-    out_docx = os.path.join("outputs", "labeled_docs", os.path.basename(doc_path) + ".docx")
-    os.makedirs(os.path.dirname(out_docx), exist_ok=True)
-    export_labeled_csv(labeled, out_csv)
-    export_labeled_docx(labeled, out_docx)
+    out_csv, out_docx = export_paths(doc_path, entry["_id"])
+    # CSV + DOCX are streamed concurrently
+    export_labeled(labeled, csv_path=out_csv, docx_path=out_docx)
     logger.info(f"Labeler: saved labeled csv {out_csv} and docx {out_docx}")
+    mark_stage(entry["_id"], "labeled", labeled_csv=out_csv, labeled_docx=out_docx)
     # Return labels so orchestrator can store them in shared memory
     return {"status": "ok", "labeled_count": len(labeled), "csv": out_csv, "docx": out_docx, "labels": labeled}
@@ -1,6 +1,92 @@
 # src/agents/planner.py
+import re
 import uuid
-from db.mongo_client import find_document
+from db.document_registry import lookup_document, is_done
+from db.transaction_index import parse_date
+
+DATE_RE = re.compile(r'\b\d{4}-\d{1,2}-\d{1,2}\b|\b\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4}\b')
+# a bound is only an amount with a currency marker ("over $500", "below 200 rupees")
+# or after an amount noun ("payments above 500"); "more than 3 months" is not one,
+# and a bound on the balance ("balance below 500 rs") is not a transaction amount
+_CURRENCY = r'(?:[$₹€£]|\b(?:rs\.?|inr|usd|eur|gbp)(?=[\s\d]))'
+_CURRENCY_WORD = r'(?:rs|inr|usd|eur|gbp|rupees?|dollars?|euros?|pounds?)\b'
+_AMOUNT_BOUND = (r'\s*(?P<currency>{0})?\s*(?P<value>\d[\d,]*(?:\.\d+)?)(?:\s*(?P<unit>{1}))?'
+                 .format(_CURRENCY, _CURRENCY_WORD))
+AMOUNT_MIN_RE = re.compile(r'(?:\b(?:over|above|more than|greater than|at least)|>=?)' + _AMOUNT_BOUND)
+AMOUNT_MAX_RE = re.compile(r'(?:\b(?:under|below|less than|at most)|<=?)' + _AMOUNT_BOUND)
+AMOUNT_NOUN_RE = re.compile(r'\b(?:amounts?|payments?|transactions?|transfers?|spend|spent|spending|paid|debits?|'
+                            r'credits?|charges?|withdrawals?|deposits?|expenses?|purchases?)\b\W*(?:\w+\W+){0,2}$')
+BALANCE_RE = re.compile(r'\bbalances?\b\W*(?:\w+\W+){0,2}$')
+
+GROUP_BY_KEYWORDS = {
+    "month": ["by month", "per month", "monthly", "each month"],
+    "category": ["by category", "per category", "each category", "categories"],
+    "counterparty": ["by counterparty", "per counterparty", "by merchant", "per merchant", "by payee", "counterparties"],
+}
+
+def _analysis_args(q: str) -> dict:
+    """Group-by and date-range options for the analysis task, taken from the query."""
+    args = {}
+    for group_by, keywords in GROUP_BY_KEYWORDS.items():
+        if any(k in q for k in keywords):
+            args["group_by"] = group_by
+            break
+    dates = DATE_RE.findall(q)
+    if dates:
+        args["start_date"] = dates[0]
+        args["end_date"] = dates[1] if len(dates) > 1 else dates[0]
+    return args
+
+ANOMALY_KEYWORDS = ["duplicate", "anomal", "outlier", "unusual", "suspicious"]
+ALL_DOCUMENTS_KEYWORDS = ["all statements", "all documents", "across", "every statement"]
+
+def _anomaly_args(q: str) -> dict:
+    """Which flags to return and whether to look beyond the current document."""
+    args = {}
+    if "duplicate" in q and not any(k in q for k in ANOMALY_KEYWORDS if k != "duplicate"):
+        args["kind"] = "duplicate"
+    elif "duplicate" not in q:
+        args["kind"] = "anomaly"
+    if any(k in q for k in ALL_DOCUMENTS_KEYWORDS):
+        args["scope"] = "all"
+    return args
+
+def _retrieval_filters(q: str, doc_id) -> dict:
+    """Chunk metadata filters for retrieval: document, date range, amount range."""
+    filters = {}
+    entry = lookup_document(doc_id) if doc_id else None
+    if entry and entry.get("document_id"):
+        filters["document_id"] = entry["document_id"]
+    dates = [parse_date(d) for d in DATE_RE.findall(q)]
+    dates = [d.isoformat() for d in dates if d]
+    if dates:
+        filters["date_from"] = min(dates)
+        filters["date_to"] = max(dates)
+    for key, regex in (("amount_min", AMOUNT_MIN_RE), ("amount_max", AMOUNT_MAX_RE)):
+        value = _amount_bound(q, regex)
+        if value is not None:
+            filters[key] = value
+    return filters
+
+def _amount_bound(q: str, regex):
+    """First bound matched by regex that is clearly a money amount, or None."""
+    for m in regex.finditer(q):
+        if BALANCE_RE.search(q[:m.start()]):
+            continue
+        if m.group("currency") or m.group("unit") or AMOUNT_NOUN_RE.search(q[:m.start()]):
+            return float(m.group("value").replace(",", ""))
+    return None
+
+def _ingest_tasks(doc_id) -> tuple:
+    """
+    Parse task for doc_id, unless the registry says this exact content is
+    already parsed + indexed; then the canonical document_id is passed on
+    to the analysis task instead.
+    """
+    entry = lookup_document(doc_id)
+    if is_done(entry, "parsed", "indexed") and entry.get("document_id"):
+        return [], {"document_id": entry["document_id"]}
+    return [{"task_id": "parse", "type": "parse", "args": {"doc_id": doc_id}}], {}
 
 def run_planner(input_json: dict) -> dict:
     request_id = input_json.get("request_id", str(uuid.uuid4()))
@@ -24,30 +110,39 @@ def run_planner(input_json: dict) -> dict:
             "confidence": 0.9
         }
 
+    # Duplicate / anomaly flow (served from the cross-document index)
+    if any(k in q for k in ANOMALY_KEYWORDS):
+        ingest, known = _ingest_tasks(doc_id) if doc_id else ([], {})
+        tasks += ingest + [
+            {"task_id": "anomalies", "type": "anomalies", "args": {"doc_id": doc_id, **known, **_anomaly_args(q)}}
+        ]
+
     # Summary flow
-    if "summary" in q or "summarize" in q:
-        tasks += [
-            {"task_id": "parse", "type": "parse", "args": {"doc_id": doc_id}},
-            {"task_id": "analysis", "type": "analysis", "args": {"doc_id": doc_id}},
+    elif "summary" in q or "summarize" in q:
+        ingest, known = _ingest_tasks(doc_id)
+        tasks += ingest + [
+            {"task_id": "analysis", "type": "analysis", "args": {"doc_id": doc_id, "group_by": "month", **known, **_analysis_args(q)}},
             {"task_id": "generate_summary", "type": "generate", "args": {"doc_id": doc_id}}
         ]
     
     # Analysis flow
     # elif ("debit" in q or "credit" in q) and "balance sheet" not in q:
     elif any(word in q for word in ["debit", "credit"]) and not ("balance sheet" in q):
-        doc = find_document(doc_id)
-        tasks.append({
-            "task_id": "analysis",
-            "type": "analysis",
-            "args": {"rows": doc.get("rows", []) if doc else []}
-        })
+        ingest, known = _ingest_tasks(doc_id)
+        tasks += ingest + [
+            {"task_id": "analysis", "type": "analysis", "args": {"doc_id": doc_id, **known, **_analysis_args(q)}}
+        ]
 
     # RAG retrieval for document-specific questions
     else:
+        retrieve_args = {"query": input_json.get("user_query")}
+        filters = _retrieval_filters(q, doc_id)
+        if filters:
+            retrieve_args["filters"] = filters
         tasks.append({
             "task_id": "retrieve",
             "type": "retrieve",
-            "args": {"query": input_json.get("user_query")}
+            "args": retrieve_args
         })
         tasks.append({
             "task_id": "answer_from_chunks",
@@ -0,0 +1,166 @@
+# src/agents/validation.py
+"""
+Columnar validation engine for the reviewer.
+
+Rows are turned into NumPy columns once; every check then runs over whole
+columns:
+
+- missing_fields   ratio + row indices of rows without a date / description / amount
+- negative_amounts rows with a negative debit or credit
+- duplicates       rows repeating an earlier (date, description, debit, credit)
+- balance          running-balance reconciliation: between every two rows
+                   carrying a balance, previous + credits - debits must equal
+                   the next balance; plus opening + credits - debits = closing
+
+Each check reports its time in ms and up to MAX_REPORTED_ROWS offending
+row indices (positions in the input list).
+"""
+import os
+import time
+
+import numpy as np
+
+MAX_REPORTED_ROWS = int(os.getenv("REVIEW_MAX_REPORTED_ROWS", "100"))
+BALANCE_TOLERANCE = float(os.getenv("REVIEW_BALANCE_TOLERANCE", "0.01"))
+
+
+def _num(value) -> float:
+    if value is None or value == "":
+        return np.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).replace(",", "").strip())
+    except ValueError:
+        return np.nan
+
+
+def _column(rows: list, key: str) -> np.ndarray:
+    return np.fromiter((_num(r.get(key)) for r in rows), dtype=np.float64, count=len(rows))
+
+
+def _present(rows: list, key: str) -> np.ndarray:
+    return np.fromiter((bool(r.get(key)) for r in rows), dtype=bool, count=len(rows))
+
+
+def _indices(mask: np.ndarray) -> list:
+    return np.flatnonzero(mask)[:MAX_REPORTED_ROWS].tolist()
+
+
+class _Timer:
+    def __init__(self, checks: dict, name: str):
+        self.checks, self.name = checks, name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.checks[self.name]["ms"] = round(1000 * (time.perf_counter() - self.start), 3)
+
+
+# ---------------------------------------
+# checks
+# ---------------------------------------
+def check_missing(cols: dict, n: int) -> dict:
+    out = {}
+    missing = {
+        "date": ~cols["has_date"],
+        "description": ~cols["has_description"],
+        "amount": np.isnan(cols["debit"]) & np.isnan(cols["credit"]),
+    }
+    for field, mask in missing.items():
+        count = int(mask.sum())
+        out[field] = {"count": count, "ratio": round(count / n, 4) if n else 0.0, "rows": _indices(mask)}
+    return out
+
+
+def check_negative(cols: dict) -> dict:
+    # NaN < 0 is False, so missing amounts never count as negative
+    with np.errstate(invalid="ignore"):
+        mask = (cols["debit"] < 0) | (cols["credit"] < 0)
+    return {"count": int(mask.sum()), "rows": _indices(mask)}
+
+
+def _amount_key(value):
+    x = _num(value)
+    return None if x != x else x    # NaN never hashes equal to itself
+
+
+def check_duplicates(rows: list) -> dict:
+    keys = np.fromiter(
+        (hash((str(r.get("date") or ""), str(r.get("description") or "").strip().upper(),
+               _amount_key(r.get("debit")), _amount_key(r.get("credit")))) for r in rows),
+        dtype=np.int64, count=len(rows),
+    )
+    if not len(keys):
+        return {"count": 0, "rows": []}
+    _, first = np.unique(keys, return_index=True)
+    mask = np.ones(len(keys), dtype=bool)
+    mask[first] = False     # every later occurrence of a key is a duplicate
+    return {"count": int(mask.sum()), "rows": _indices(mask)}
+
+
+def check_balance(cols: dict, tolerance: float = BALANCE_TOLERANCE) -> dict:
+    balance = cols["balance"]
+    with_balance = np.flatnonzero(~np.isnan(balance))
+    if len(with_balance) < 2:
+        return {"checked": False, "reason": "fewer than two rows carry a balance", "count": 0, "rows": []}
+
+    # debits reduce the balance whatever sign the parser gave them
+    movement = np.nan_to_num(np.abs(cols["credit"])) - np.nan_to_num(np.abs(cols["debit"]))
+    cum = np.cumsum(movement)
+    prev, nxt = with_balance[:-1], with_balance[1:]
+    expected = balance[prev] + (cum[nxt] - cum[prev])
+    diff = balance[nxt] - expected
+    bad = np.abs(diff) > tolerance
+    mask = np.zeros(len(balance), dtype=bool)
+    mask[nxt[bad]] = True
+
+    first, last = with_balance[0], with_balance[-1]
+    # opening = balance before the first balanced row's own movement
+    opening = balance[first] - movement[first]
+    credits = float(np.nan_to_num(np.abs(cols["credit"][first:last + 1])).sum())
+    debits = float(np.nan_to_num(np.abs(cols["debit"][first:last + 1])).sum())
+    closing = float(balance[last])
+    difference = round(float(opening + credits - debits - closing), 2)
+    return {
+        "checked": True,
+        "opening": round(float(opening), 2),
+        "credits": round(credits, 2),
+        "debits": round(debits, 2),
+        "closing": round(closing, 2),
+        "difference": difference,
+        "reconciled": abs(difference) <= tolerance and not bad.any(),
+        "count": int(bad.sum()),
+        "rows": _indices(mask),
+        "max_abs_diff": round(float(np.abs(diff).max()), 2),
+    }
+
+
+# ---------------------------------------
+# entry point
+# ---------------------------------------
+def validate_rows(rows: list) -> dict:
+    start = time.perf_counter()
+    n = len(rows)
+    checks = {name: {} for name in ("columns", "missing_fields", "negative_amounts", "duplicates", "balance")}
+
+    with _Timer(checks, "columns"):
+        cols = {
+            "debit": _column(rows, "debit"),
+            "credit": _column(rows, "credit"),
+            "balance": _column(rows, "balance"),
+            "has_date": _present(rows, "date"),
+            "has_description": _present(rows, "description"),
+        }
+    with _Timer(checks, "missing_fields"):
+        checks["missing_fields"].update(check_missing(cols, n))
+    with _Timer(checks, "negative_amounts"):
+        checks["negative_amounts"].update(check_negative(cols))
+    with _Timer(checks, "duplicates"):
+        checks["duplicates"].update(check_duplicates(rows))
+    with _Timer(checks, "balance"):
+        checks["balance"].update(check_balance(cols))
+
+    return {"rows": n, "checks": checks, "total_ms": round(1000 * (time.perf_counter() - start), 3)}
@@ -0,0 +1,296 @@
+# src/app/api_server.py
+"""
+Local HTTP API around the orchestrator and the ingest path.
+
+    PYTHONPATH=src python src/app/api_server.py --port 8700
+
+API (JSON):
+    POST /query     {user_query, doc_id?, request_id?}  -> orchestrate() response
+    POST /ingest    {path}                              -> {status, document_id, version, ...}
+                    path: a file under API_UPLOAD_ROOT (relative paths are taken from there)
+    GET  /health    -> {status, workers, endpoints: {name: {running, queued, limit, queue}}}
+    GET  /metrics   -> Prometheus text: API admission counters + pipeline stage latencies
+
+Load control:
+- every endpoint has its own concurrency limit and wait queue
+  (API_QUERY_* for the Ollama-bound query path, API_INGEST_* for parsing);
+- jobs run in one worker pool sized to the sum of those limits, so an
+  admitted job always has a thread and never waits behind another
+  endpoint's work;
+- admission control: a request that finds its endpoint's running + queued
+  slots full is turned away at once with 429 and Retry-After instead of
+  piling up; a queued request that is not started within
+  API_QUEUE_TIMEOUT_SEC gets 429 too, one that does not finish within
+  API_REQUEST_TIMEOUT_SEC gets 504.
+
+Malformed requests get 400, a path outside API_UPLOAD_ROOT 403, and an
+error inside the pipeline 500.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils.lazy import LazyCallable
+from utils.logger import logger
+from utils.tracing import span, metrics
+
+API_HOST = os.getenv("API_HOST", "127.0.0.1")
+API_PORT = int(os.getenv("API_PORT", "8700"))
+API_QUERY_CONCURRENCY = int(os.getenv("API_QUERY_CONCURRENCY", "2"))
+API_QUERY_QUEUE = int(os.getenv("API_QUERY_QUEUE", "16"))
+API_INGEST_CONCURRENCY = int(os.getenv("API_INGEST_CONCURRENCY", str(max(1, (os.cpu_count() or 2) // 2))))
+API_INGEST_QUEUE = int(os.getenv("API_INGEST_QUEUE", "32"))
+API_QUEUE_TIMEOUT_SEC = float(os.getenv("API_QUEUE_TIMEOUT_SEC", "30"))
+API_REQUEST_TIMEOUT_SEC = float(os.getenv("API_REQUEST_TIMEOUT_SEC", "300"))
+API_RETRY_AFTER_SEC = int(os.getenv("API_RETRY_AFTER_SEC", "2"))
+API_MAX_BODY_BYTES = int(os.getenv("API_MAX_BODY_BYTES", str(1 << 20)))
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+# /ingest only reads files below this directory
+API_UPLOAD_ROOT = os.getenv("API_UPLOAD_ROOT", os.path.join(PROJECT_ROOT, "datasets", "raw"))
+
+
+class Rejected(Exception):
+    """The endpoint is saturated; answered with 429."""
+
+
+class BadRequest(Exception):
+    """The request itself is invalid; answered with 400 (or `status`)."""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+# ---------------------------------------
+# admission control
+# ---------------------------------------
+class EndpointLimiter:
+    """At most `limit` running and `queue` waiting requests for one endpoint."""
+
+    def __init__(self, name: str, limit: int, queue: int):
+        self.name = name
+        self.limit = max(1, limit)
+        self.queue = max(0, queue)
+        self._slots = threading.BoundedSemaphore(self.limit)
+        self._lock = threading.Lock()
+        self.running = 0
+        self.queued = 0
+        self.counts = {"admitted": 0, "rejected": 0, "completed": 0, "errors": 0, "timeouts": 0}
+
+    def acquire(self, timeout: float = API_QUEUE_TIMEOUT_SEC):
+        with self._lock:
+            if self.running + self.queued >= self.limit + self.queue:
+                self.counts["rejected"] += 1
+                raise Rejected(f"{self.name}: {self.running} running, {self.queued} queued")
+            self.queued += 1
+            self.counts["admitted"] += 1
+        got = self._slots.acquire(timeout=timeout)
+        with self._lock:
+            self.queued -= 1
+            if got:
+                self.running += 1
+            else:
+                self.counts["rejected"] += 1
+        if not got:
+            raise Rejected(f"{self.name}: not started within {timeout}s")
+
+    def release(self, outcome: str = "completed"):
+        with self._lock:
+            self.running -= 1
+            self.counts[outcome] += 1
+        self._slots.release()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"running": self.running, "queued": self.queued, "limit": self.limit,
+                    "queue": self.queue, **self.counts}
+
+
+# ---------------------------------------
+# service
+# ---------------------------------------
+def ingest_path(path: str) -> dict:
+    from app.app_runtime import ingest_document
+    return ingest_document(path)
+
+
+def resolve_upload(path, root: str = API_UPLOAD_ROOT) -> str:
+    """Absolute path of an existing file under root; BadRequest otherwise."""
+    if not isinstance(path, str) or not path:
+        raise BadRequest("missing field 'path'")
+    root = os.path.realpath(root)
+    full = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, full]) != root:
+        raise BadRequest("path is outside the upload root", status=403)
+    if not os.path.isfile(full):
+        raise BadRequest(f"no such file: {path}")
+    return full
+
+
+class ApiService:
+    def __init__(self, orchestrate=None, ingest=ingest_path, limits: dict = None,
+                 request_timeout: float = API_REQUEST_TIMEOUT_SEC, queue_timeout: float = API_QUEUE_TIMEOUT_SEC,
+                 upload_root: str = API_UPLOAD_ROOT):
+        self.handlers = {
+            "query": orchestrate or LazyCallable("orchestration.orchestrator", "orchestrate"),
+            "ingest": ingest,
+        }
+        limits = limits or {
+            "query": (API_QUERY_CONCURRENCY, API_QUERY_QUEUE),
+            "ingest": (API_INGEST_CONCURRENCY, API_INGEST_QUEUE),
+        }
+        self.limiters = {name: EndpointLimiter(name, *limits[name]) for name in self.handlers}
+        # one thread per admissible running job: admitted work never queues in the pool
+        self.workers = sum(lim.limit for lim in self.limiters.values())
+        self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="api-worker")
+        self.upload_root = upload_root
+        self.request_timeout = request_timeout
+        self.queue_timeout = queue_timeout
+        self.started = time.time()
+
+    def call(self, endpoint: str, *args):
+        """Admit, run on the worker pool, wait. Raises Rejected / TimeoutError."""
+        limiter = self.limiters[endpoint]
+        limiter.acquire(self.queue_timeout)
+        outcome = "errors"
+        try:
+            with span(f"api.{endpoint}"):
+                future = self.pool.submit(self.handlers[endpoint], *args)
+                try:
+                    result = future.result(timeout=self.request_timeout)
+                except FutureTimeout:
+                    # the job keeps its slot until it really finishes
+                    future.add_done_callback(lambda f, lim=limiter: lim.release("timeouts"))
+                    limiter = None
+                    raise TimeoutError(f"{endpoint} did not finish within {self.request_timeout}s")
+            outcome = "completed"
+            return result
+        finally:
+            if limiter is not None:
+                limiter.release(outcome)
+
+    def health(self) -> dict:
+        return {
+            "status": "ok",
+            "uptime_sec": round(time.time() - self.started, 1),
+            "workers": self.workers,
+            "endpoints": {name: lim.snapshot() for name, lim in self.limiters.items()},
+        }
+
+    def render_metrics(self) -> str:
+        lines = []
+        snapshots = {name: lim.snapshot() for name, lim in self.limiters.items()}
+        for field in ("running", "queued", "limit"):
+            metric = f"audit_api_{field}"
+            lines.append(f"# TYPE {metric} gauge")
+            lines += [f'{metric}{{endpoint="{name}"}} {s[field]}' for name, s in snapshots.items()]
+        for field in ("admitted", "rejected", "completed", "errors", "timeouts"):
+            metric = f"audit_api_{field}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines += [f'{metric}{{endpoint="{name}"}} {s[field]}' for name, s in snapshots.items()]
+        return "\n".join(lines) + "\n" + metrics.render_prometheus()
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+# ---------------------------------------
+# HTTP
+# ---------------------------------------
+def make_handler(service: ApiService):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status: int, body, content_type: str = "application/json", headers: dict = None):
+            data = body.encode("utf-8") if isinstance(body, str) else json.dumps(body, default=str).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _body(self) -> dict:
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > API_MAX_BODY_BYTES:
+                raise ValueError(f"body larger than {API_MAX_BODY_BYTES} bytes")
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(body, dict):
+                raise ValueError("body must be a JSON object")
+            return body
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, service.health())
+            elif self.path == "/metrics":
+                self._send(200, service.render_metrics(), "text/plain; version=0.0.4")
+            else:
+                self._send(404, {"error": "not found"})
+
+        def _request(self):
+            """(endpoint, args) for a valid request; raises BadRequest before anything runs."""
+            if self.path not in ("/query", "/ingest"):
+                raise BadRequest("not found", status=404)
+            try:
+                body = self._body()
+            except ValueError as e:     # includes JSONDecodeError
+                raise BadRequest(str(e))
+            if self.path == "/query":
+                if not isinstance(body.get("user_query"), str) or not body["user_query"].strip():
+                    raise BadRequest("missing field 'user_query'")
+                return "query", body
+            return "ingest", resolve_upload(body.get("path"), service.upload_root)
+
+        def do_POST(self):
+            try:
+                endpoint, arg = self._request()
+            except BadRequest as e:
+                self._send(e.status, {"error": str(e)})
+                return
+            try:
+                self._send(200, service.call(endpoint, arg))
+            except Rejected as e:
+                self._send(429, {"error": "busy", "detail": str(e)},
+                           headers={"Retry-After": str(API_RETRY_AFTER_SEC)})
+            except TimeoutError as e:
+                self._send(504, {"error": str(e)})
+            except Exception as e:
+                # the request was valid: anything raised by the pipeline is a server error
+                logger.exception(f"API {endpoint} failed")
+                self._send(500, {"error": str(e)})
+
+        def log_message(self, fmt, *args):
+            logger.debug("api_server: " + fmt % args)
+
+    return Handler
+
+
+def make_server(service: ApiService, host: str = API_HOST, port: int = API_PORT) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    server.daemon_threads = True
+    return server
+
+
+def serve(host: str = API_HOST, port: int = API_PORT):
+    service = ApiService()
+    server = make_server(service, host, port)
+    logger.info(f"API listening on http://{host}:{port} ({service.workers} workers)")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        service.shutdown()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="HTTP API for queries and document ingest")
+    ap.add_argument("--host", default=API_HOST)
+    ap.add_argument("--port", type=int, default=API_PORT)
+    args = ap.parse_args()
+    serve(args.host, args.port)
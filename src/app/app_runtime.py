@@ -0,0 +1,160 @@
+# src/app/app_runtime.py
+"""
+Process-wide runtime behind the Streamlit app.
+
+Streamlit reruns the whole script on every interaction, so anything
+expensive lives here and is created once (st.cache_resource):
+
+- save_upload()     content-addressed upload store: bytes are hashed and
+                    written to datasets/raw/<hash prefix>/<name> only the
+                    first time that content is seen. The file keeps its
+                    original name, so an edited re-upload is registered as
+                    the next version of the same statement
+- PipelineRunner    runs orchestrate() / document ingest in a small
+                    thread pool. Jobs are keyed by (query, document hash);
+                    a key that is running is not started again and a
+                    finished key is answered from an LRU cache. The
+                    script thread only submits and polls. Any query may
+                    look beyond its own document (no document, or
+                    "duplicates across all statements"), so the key also
+                    carries the index generation, which goes up whenever
+                    an ingest finishes (or index_changed() is called): a
+                    new upload is never answered from a stale cached
+                    result.
+"""
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.lazy import LazyCallable
+from utils.logger import logger
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+UPLOAD_DIR = os.getenv("APP_UPLOAD_DIR", os.path.join(PROJECT_ROOT, "datasets", "raw"))
+APP_WORKERS = int(os.getenv("APP_WORKERS", "2"))
+APP_RESULT_CACHE = int(os.getenv("APP_RESULT_CACHE", "128"))
+
+RUNNING, DONE, FAILED, MISSING = "running", "done", "failed", "missing"
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def save_upload(data: bytes, name: str, upload_dir: str = UPLOAD_DIR):
+    """
+    Store an upload as <hash prefix>/<name>; returns (path, hash, created).
+    The name is kept as is: the document registry versions statements by
+    filename, and fast mode recognises CSV/XLSX files by their extension.
+    """
+    digest = content_hash(data)
+    path = os.path.join(upload_dir, digest[:16], os.path.basename(name))
+    if os.path.exists(path) and os.path.getsize(path) == len(data):
+        return path, digest, False
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".part"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return path, digest, True
+
+
+def result_key(query: str, doc_hash: str = None, generation: int = 0) -> tuple:
+    """Cache key: normalized query, document hash and the index generation it was answered at."""
+    return (" ".join((query or "").lower().split()), doc_hash or "", generation)
+
+
+def ingest_document(doc_path: str) -> dict:
+    run_executor = LazyCallable("agents.executor", "run_executor")
+    out = run_executor({"task": {"type": "parse", "args": {"doc_id": doc_path}}, "context": {}})
+    # the UI only needs to know it is there, not the rows
+    return {k: v for k, v in out.items() if k != "parsed_rows"}
+
+
+class PipelineRunner:
+    def __init__(self, orchestrate=None, ingest=ingest_document, workers: int = APP_WORKERS,
+                 cache_size: int = APP_RESULT_CACHE):
+        self.orchestrate = orchestrate or LazyCallable("orchestration.orchestrator", "orchestrate")
+        self.ingest = ingest
+        self.cache_size = cache_size
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="app-pipeline")
+        self._lock = threading.Lock()
+        self._results = OrderedDict()   # key -> result (LRU)
+        self._running = {}              # key -> Future
+        self._errors = {}               # key -> exception, until polled once
+        self.generation = 0             # bumped whenever the searchable index changes
+
+    def index_changed(self):
+        """Something was ingested: cached answers must not be reused."""
+        with self._lock:
+            self.generation += 1
+
+    def _finish(self, key, future):
+        with self._lock:
+            self._running.pop(key, None)
+            if future.exception() is not None:
+                self._errors[key] = future.exception()
+                logger.error(f"App pipeline job {key} failed: {future.exception()}")
+                return
+            if key[0] == "__ingest__":
+                self.generation += 1
+            self._results[key] = future.result()
+            self._results.move_to_end(key)
+            while len(self._results) > self.cache_size:
+                self._results.popitem(last=False)
+
+    def _submit(self, key, fn, *args):
+        with self._lock:
+            if key in self._results or key in self._running or key in self._errors:
+                return key
+            future = self._pool.submit(fn, *args)
+            self._running[key] = future
+        future.add_done_callback(lambda f: self._finish(key, f))
+        return key
+
+    def submit_ingest(self, doc_path: str, doc_hash: str):
+        """Parse + index an upload once per content hash."""
+        return self._submit(("__ingest__", doc_hash), self.ingest, doc_path)
+
+    def submit(self, query: str, doc_path: str = None, doc_hash: str = None):
+        with self._lock:
+            key = result_key(query, doc_hash, self.generation)
+            ingest = self._running.get(("__ingest__", doc_hash))
+        return self._submit(key, self._answer, ingest, {
+            "user_query": query,
+            "doc_id": doc_path,     # None if no file uploaded
+            "allow_no_doc": True,
+        })
+
+    def _answer(self, ingest, payload: dict):
+        if ingest is not None:
+            # let the upload's background ingest finish instead of parsing it twice
+            try:
+                ingest.result()
+            except Exception:
+                pass    # the parse task inside orchestrate() retries and reports it
+        return self.orchestrate(payload)
+
+    def poll(self, key):
+        """(state, result or error) for a submitted key."""
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                return DONE, self._results[key]
+            if key in self._running:
+                return RUNNING, None
+            error = self._errors.get(key)
+        if error is not None:
+            return FAILED, error
+        return MISSING, None
+
+    def forget(self, key):
+        """Drop a cached result or failure so the next submit runs it again."""
+        with self._lock:
+            self._results.pop(key, None)
+            self._errors.pop(key, None)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -1,11 +1,26 @@
 # src/app/streamlit_app.py
 import sys
 import os
+import time
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 import streamlit as st
-from orchestration.orchestrator import orchestrate
+from app.app_runtime import PipelineRunner, save_upload, RUNNING, DONE, FAILED
 
+APP_POLL_SEC = float(os.getenv("APP_POLL_SEC", "0.5"))
+
+
+# ------------------------------------------
+# PROCESS-WIDE RESOURCES (survive reruns)
+# ------------------------------------------
+@st.cache_resource
+def get_runner() -> PipelineRunner:
+    # the orchestrator, FAISS index, models and DB clients are created
+    # inside this runner's workers once and shared by every session
+    return PipelineRunner()
+
+
+runner = get_runner()
 
 st.set_page_config(page_title="Audit Intelligence", layout="wide")
 
@@ -24,13 +39,19 @@ uploaded = st.sidebar.file_uploader(
 )
 
 doc_path = None
+doc_hash = None
 
 if uploaded:
-    doc_path = os.path.join("datasets/raw", uploaded.name)
-    os.makedirs(os.path.dirname(doc_path), exist_ok=True)
-
-    with open(doc_path, "wb") as f:
-        f.write(uploaded.getbuffer())
+    # hash + write once per uploaded file, not on every rerun
+    saved = st.session_state.get("upload")
+    if not saved or saved["file_id"] != uploaded.file_id:
+        path, digest, created = save_upload(uploaded.getvalue(), uploaded.name)
+        saved = {"file_id": uploaded.file_id, "path": path, "hash": digest}
+        st.session_state["upload"] = saved
+        if created:
+            # parse + index in the background while the user types
+            runner.submit_ingest(path, digest)
+    doc_path, doc_hash = saved["path"], saved["hash"]
 
     st.sidebar.success("Uploaded: " + uploaded.name)
     st.info("📄 Document saved. You can now ask document-related questions!")
@@ -49,18 +70,28 @@ query = st.text_input(
 )
 
 if query:
-    with st.status("🎯 Processing your request...", expanded=False) as s:
-
-        # The orchestrator now supports BOTH:
-        # 1. Question over PDF/CSV/XLSX
-        # 2. Pure fine-tuned model Q&A with no doc
-        result = orchestrate({
-            "user_query": query,
-            "doc_id": doc_path,   # will be None if no file uploaded
-            "allow_no_doc": True, # new flag for your fine-tuner system
-        })
-
-        s.update(label="✅ Completed!", state="complete")
+    # The orchestrator supports BOTH:
+    # 1. Question over PDF/CSV/XLSX
+    # 2. Pure fine-tuned model Q&A with no doc
+    # Results are cached per (query, document hash); the pipeline runs in a
+    # background worker and this script only polls.
+    key = runner.submit(query, doc_path, doc_hash)
+    state, result = runner.poll(key)
+
+    if state == RUNNING:
+        st.status("🎯 Processing your request...", expanded=False)
+        time.sleep(APP_POLL_SEC)
+        st.rerun()
+
+    if state == FAILED:
+        st.error(f"Request failed: {result}")
+        if st.button("Retry"):
+            runner.forget(key)
+            st.rerun()
+        st.stop()
+
+    if state != DONE:
+        st.rerun()
 
     st.subheader("🔍 Answer")
 
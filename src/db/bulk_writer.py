@@ -0,0 +1,144 @@
+# src/db/bulk_writer.py
+"""
+Background write pipeline.
+
+Writes are queued as (collection, doc) pairs and flushed by one daemon
+thread in batches through `write_many(collection, docs)` (insert_many /
+bulk_write for Mongo). The queue is bounded: when it is full, submit()
+blocks, which pushes back on producers instead of growing memory.
+
+A batch is flushed when it reaches `batch_size` or `flush_interval`
+seconds after its first item, whichever comes first. flush() blocks
+until everything submitted so far has been written. A document that
+fails in prepare() or in its batch write is counted in `failed` and
+never stops the writer thread; if the thread dies anyway, flush() and
+close() restart it to drain the queue instead of waiting forever.
+"""
+import queue
+import threading
+import time
+from collections import defaultdict
+
+from utils.logger import logger
+from utils.tracing import span
+
+_FLUSH = object()
+_STOP = object()
+_POLL_SEC = 0.5
+
+
+class BulkWriter:
+    def __init__(self, write_many, queue_size: int = 10000, batch_size: int = 500,
+                 flush_interval: float = 1.0, prepare=None, name: str = "bulk-writer"):
+        """
+        write_many(collection, docs): performs one batched write
+        prepare(collection, doc) -> [(collection, doc), ...]: optional
+            per-item transform run on the writer thread (e.g. to split
+            large payloads out into their own collection)
+        """
+        self._write_many = write_many
+        self._prepare = prepare
+        self._queue = queue.Queue(maxsize=queue_size)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.name = name
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.written = 0
+        self.failed = 0
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def submit(self, collection: str, doc: dict):
+        self._ensure_started()
+        self._queue.put((collection, doc))
+
+    def _wait(self, done: threading.Event, timeout: float = None) -> bool:
+        """Wait for `done`, restarting the writer thread if it died meanwhile."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = _POLL_SEC if deadline is None else min(_POLL_SEC, deadline - time.monotonic())
+            if remaining <= 0:
+                return done.is_set()
+            if done.wait(remaining):
+                return True
+            if self._thread is None or not self._thread.is_alive():
+                logger.error(f"{self.name}: writer thread died, restarting it")
+                self._ensure_started()
+
+    def flush(self, timeout: float = None) -> bool:
+        """Block until all previously submitted writes are done."""
+        if self._thread is None:
+            return True
+        self._ensure_started()
+        done = threading.Event()
+        self._queue.put((_FLUSH, done))
+        return self._wait(done, timeout)
+
+    def close(self, timeout: float = None):
+        if self._thread is None:
+            return
+        self.flush(timeout)
+        self._ensure_started()
+        self._queue.put((_STOP, None))
+        self._thread.join(timeout)
+        self._thread = None
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    # ---------------------------------------
+    # writer thread
+    # ---------------------------------------
+    def _write_batch(self, batch: list):
+        grouped = defaultdict(list)
+        for collection, doc in batch:
+            try:
+                items = self._prepare(collection, doc) if self._prepare else [(collection, doc)]
+            except Exception:
+                self.failed += 1
+                logger.exception(f"{self.name}: preparing a document for {collection} failed")
+                continue
+            for c, d in items:
+                grouped[c].append(d)
+        for collection, docs in grouped.items():
+            try:
+                with span("db.bulk_write", collection=collection, docs=len(docs)):
+                    self._write_many(collection, docs)
+                self.written += len(docs)
+            except Exception:
+                self.failed += len(docs)
+                logger.exception(f"{self.name}: bulk write of {len(docs)} docs to {collection} failed")
+
+    def _run(self):
+        batch = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                collection, doc = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                self._write_batch(batch)
+                batch, deadline = [], None
+                continue
+
+            if collection is _FLUSH or collection is _STOP:
+                self._write_batch(batch)
+                batch, deadline = [], None
+                if collection is _STOP:
+                    return
+                doc.set()
+                continue
+
+            batch.append((collection, doc))
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval
+            if len(batch) >= self.batch_size:
+                self._write_batch(batch)
+                batch, deadline = [], None
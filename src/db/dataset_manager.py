@@ -1,14 +1,277 @@
-import json
+# src/db/dataset_manager.py
+"""
+Deduplicated, time-sharded Q/A dataset store.
+
+datasets/finetune/
+    qa_dataset.jsonl        legacy single file, read as the oldest shard
+    qa/qa-YYYYMMDD.jsonl    one shard per day, append-only
+    qa/hashes.txt           normalized-pair hashes already stored
+    qa/offsets.json         per-consumer watermark {shard, offset}
+
+Pairs are deduped by a hash of the normalized question + answer, so the
+store grows with unique knowledge rather than with the number of queries.
+Consumers (e.g. the fine-tuner) read only the records after their
+watermark and commit a new one once they have used them.
+"""
 import os
+import re
+import json
+import hashlib
+import threading
+from datetime import datetime
+
+from utils.logger import logger
 
 # Build a stable path relative to this file
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
 DATASET_DIR = os.path.join(PROJECT_ROOT, "datasets", "finetune")
 DATASET_PATH = os.path.join(DATASET_DIR, "qa_dataset.jsonl")
+QA_STORE_DIR = os.path.join(DATASET_DIR, "qa")
+
+_WS_RE = re.compile(r"\s+")
+_PUNCT_RE = re.compile(r"[^\w\s]")
+
+
+def normalize_text(text: str) -> str:
+    text = _PUNCT_RE.sub(" ", str(text or "").lower())
+    return _WS_RE.sub(" ", text).strip()
+
+
+def pair_hash(question: str, answer: str) -> str:
+    key = normalize_text(question) + "\x1f" + normalize_text(answer)
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class QADatasetStore:
+    def __init__(self, root: str = QA_STORE_DIR, legacy_path: str = DATASET_PATH):
+        self.root = root
+        self.legacy_path = legacy_path
+        self.hashes_path = os.path.join(root, "hashes.txt")
+        self.offsets_path = os.path.join(root, "offsets.json")
+        self._seen = None
+        self._lock = threading.Lock()
+
+    # ---------------------------------------
+    # shards
+    # ---------------------------------------
+    def shard_for(self, when: datetime = None) -> str:
+        return os.path.join(self.root, f"qa-{(when or datetime.utcnow()):%Y%m%d}.jsonl")
+
+    def shards(self) -> list:
+        """Shard paths, oldest first (the legacy file comes first)."""
+        shards = []
+        if os.path.exists(self.legacy_path):
+            shards.append(self.legacy_path)
+        if os.path.isdir(self.root):
+            shards += sorted(
+                os.path.join(self.root, n) for n in os.listdir(self.root)
+                if n.startswith("qa-") and n.endswith(".jsonl")
+            )
+        return shards
+
+    def _shard_name(self, path: str) -> str:
+        return os.path.relpath(path, os.path.dirname(self.legacy_path))
+
+    # ---------------------------------------
+    # dedupe index
+    # ---------------------------------------
+    def _load_seen(self) -> set:
+        if self._seen is not None:
+            return self._seen
+        seen = set()
+        if os.path.exists(self.hashes_path):
+            with open(self.hashes_path, "r", encoding="utf-8") as f:
+                seen.update(line.strip() for line in f if line.strip())
+        else:
+            # first run: index whatever is already on disk
+            for rec in self._iter_all():
+                seen.add(pair_hash(rec.get("question"), rec.get("answer")))
+            os.makedirs(self.root, exist_ok=True)
+            with open(self.hashes_path, "w", encoding="utf-8") as f:
+                f.writelines(h + "\n" for h in seen)
+        self._seen = seen
+        return seen
+
+    def add(self, pairs: list) -> int:
+        """Append pairs not seen before. Returns the number actually added."""
+        with self._lock:
+            seen = self._load_seen()
+            now = datetime.utcnow()
+            new_lines, new_hashes = [], []
+            for p in pairs:
+                if not p.get("question") or not p.get("answer"):
+                    continue
+                h = pair_hash(p["question"], p["answer"])
+                if h in seen:
+                    continue
+                seen.add(h)
+                new_hashes.append(h)
+                rec = {"question": p["question"], "answer": p["answer"], "hash": h, "created_at": now.isoformat()}
+                new_lines.append(json.dumps(rec, ensure_ascii=False) + "\n")
+            if not new_lines:
+                return 0
+            os.makedirs(self.root, exist_ok=True)
+            with open(self.shard_for(now), "a", encoding="utf-8") as f:
+                f.writelines(new_lines)
+            with open(self.hashes_path, "a", encoding="utf-8") as f:
+                f.writelines(h + "\n" for h in new_hashes)
+            return len(new_lines)
+
+    # ---------------------------------------
+    # reading
+    # ---------------------------------------
+    def _read_shard(self, path: str, offset: int = 0):
+        """Yields (record, end_offset) for complete lines after offset."""
+        with open(path, "rb") as f:
+            f.seek(offset)
+            pos = offset
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break   # partially written line; picked up next time
+                pos += len(raw)
+                line = raw.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line), pos
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping malformed Q/A line in {path} at byte {pos - len(raw)}")
+
+    def _iter_all(self):
+        for path in self.shards():
+            for rec, _ in self._read_shard(path):
+                yield rec
+
+    @staticmethod
+    def _complete_end(path: str) -> int:
+        """Byte offset just after the last complete line of path."""
+        size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            pos = size
+            while pos > 0:
+                step = min(65536, pos)
+                f.seek(pos - step)
+                block = f.read(step)
+                nl = block.rfind(b"\n")
+                if nl != -1:
+                    return pos - step + nl + 1
+                pos -= step
+        return 0
+
+    def segments(self, since: dict = None):
+        """
+        Byte ranges [start, end) of each shard after watermark `since`
+        ({shard, offset}; None = from the start), oldest first.
+        Returns (segments, watermark at the end of them).
+        """
+        shards = self.shards()
+        names = [self._shard_name(p) for p in shards]
+        start, start_offset = 0, 0
+        if since:
+            if since["shard"] in names:
+                start, start_offset = names.index(since["shard"]), since["offset"]
+            else:
+                later = [i for i, n in enumerate(names) if shards[i] != self.legacy_path and n > since["shard"]]
+                start = later[0] if later else len(shards)
+
+        segments = []
+        watermark = dict(since) if since else None
+        for i in range(start, len(shards)):
+            begin = start_offset if i == start else 0
+            end = self._complete_end(shards[i])
+            if end <= begin:
+                continue
+            segments.append({"shard": names[i], "path": shards[i], "start": begin, "end": end})
+            watermark = {"shard": names[i], "offset": end}
+        return segments, watermark
+
+    def segments_before(self, until: dict) -> list:
+        """Byte ranges of everything up to watermark `until` (the data already consumed)."""
+        if not until:
+            return []
+        segments, _ = self.segments(None)
+        older = []
+        for seg in segments:
+            if seg["shard"] == until["shard"]:
+                end = min(seg["end"], until["offset"])
+                if end > seg["start"]:
+                    older.append({**seg, "end": end})
+                break
+            if seg["path"] != self.legacy_path and seg["shard"] > until["shard"]:
+                break
+            older.append(seg)
+        return older
+
+    def read_range(self, path: str, start: int, end: int) -> list:
+        records = []
+        legacy_seen = None
+        if path == self.legacy_path:
+            # the legacy file was appended to blindly; dedupe while reading
+            legacy_seen = {pair_hash(r.get("question"), r.get("answer")) for r, pos in self._read_shard(path) if pos <= start}
+        for rec, pos in self._read_shard(path, start):
+            if pos > end:
+                break
+            if legacy_seen is not None:
+                h = pair_hash(rec.get("question"), rec.get("answer"))
+                if h in legacy_seen:
+                    continue
+                legacy_seen.add(h)
+            records.append(rec)
+        return records
+
+    def read(self, since: dict = None):
+        """
+        Records after watermark `since` ({shard, offset}; None = from the
+        start). Returns (records, watermark at the end of what was read).
+        """
+        segments, watermark = self.segments(since)
+        records = []
+        for seg in segments:
+            records += self.read_range(seg["path"], seg["start"], seg["end"])
+        return records, watermark
+
+    # ---------------------------------------
+    # consumer offsets
+    # ---------------------------------------
+    def _offsets(self) -> dict:
+        if not os.path.exists(self.offsets_path):
+            return {}
+        with open(self.offsets_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def watermark(self, consumer: str):
+        return self._offsets().get(consumer)
+
+    def read_new(self, consumer: str):
+        """Records the consumer has not committed yet, plus the new watermark."""
+        return self.read(self.watermark(consumer))
+
+    def commit(self, consumer: str, watermark: dict):
+        if not watermark:
+            return
+        with self._lock:
+            offsets = self._offsets()
+            offsets[consumer] = watermark
+            os.makedirs(self.root, exist_ok=True)
+            tmp = self.offsets_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(offsets, f, indent=2)
+            os.replace(tmp, self.offsets_path)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> QADatasetStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = QADatasetStore()
+    return _store
+
 
 def save_qa_pairs(pairs):
-    os.makedirs(DATASET_DIR, exist_ok=True)
-    with open(DATASET_PATH, "a", encoding="utf-8") as f:
-        for p in pairs:
-            f.write(json.dumps(p, ensure_ascii=False) + "\n")
-    return DATASET_PATH
+    """Store new unique pairs; returns how many were actually added."""
+    return get_store().add(pairs)
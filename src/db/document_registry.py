@@ -0,0 +1,113 @@
+# src/db/document_registry.py
+"""
+Parse-once document registry.
+
+Maps a file's content hash to its canonical document id (the Mongo
+`documents` _id as a string) and to the ingest stages already completed
+for it: parsed, labeled, indexed. Re-uploading the same bytes resolves to
+the same document; changed bytes under the same filename become a new
+version that supersedes the previous one.
+"""
+import os
+import re
+import hashlib
+import threading
+
+from db.mongo_client import find_registry_entry, find_latest_registry_entry, upsert_registry_entry
+
+STAGES = ("parsed", "labeled", "indexed")
+
+_OBJECT_ID_RE = re.compile(r"^[0-9a-fA-F]{24}$")
+
+# path -> (mtime_ns, size, sha256) so unchanged files are not re-hashed
+_hash_cache = {}
+_hash_lock = threading.Lock()
+
+
+def file_hash(path: str) -> str:
+    st = os.stat(path)
+    key = os.path.abspath(path)
+    with _hash_lock:
+        cached = _hash_cache.get(key)
+    if cached and cached[:2] == (st.st_mtime_ns, st.st_size):
+        return cached[2]
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    digest = h.hexdigest()
+    with _hash_lock:
+        _hash_cache[key] = (st.st_mtime_ns, st.st_size, digest)
+    return digest
+
+
+def remember_hash(path: str, mtime_ns: int, size: int, digest: str):
+    """Seed the hash cache with a digest computed elsewhere (e.g. a worker process)."""
+    with _hash_lock:
+        _hash_cache[os.path.abspath(path)] = (mtime_ns, size, digest)
+
+
+def lookup_document(path: str):
+    """Registry entry for the file's current content, or None if never seen."""
+    if not path or not os.path.isfile(path):
+        return None
+    return find_registry_entry(file_hash(path))
+
+
+def register_document(path: str) -> dict:
+    """Return the registry entry for path, creating a new version if the content is new."""
+    content_hash = file_hash(path)
+    entry = find_registry_entry(content_hash)
+    if entry:
+        return entry
+    filename = os.path.basename(path)
+    previous = find_latest_registry_entry(filename)
+    return upsert_registry_entry(
+        content_hash,
+        {"path": os.path.abspath(path)},
+        on_insert={
+            "filename": filename,
+            "version": (previous.get("version", 0) + 1) if previous else 1,
+            "supersedes": previous["_id"] if previous else None,
+            "document_id": None,
+            "status": {stage: False for stage in STAGES},
+        },
+    )
+
+
+def superseded_document_id(entry):
+    """document_id of the version this entry replaces, or None."""
+    previous_hash = (entry or {}).get("supersedes")
+    if not previous_hash:
+        return None
+    previous = find_registry_entry(previous_hash)
+    return previous.get("document_id") if previous else None
+
+
+def mark_stage(content_hash: str, stage: str, **fields) -> dict:
+    """Record a completed ingest stage (plus any extra fields, e.g. document_id)."""
+    return upsert_registry_entry(content_hash, {f"status.{stage}": True, **fields})
+
+
+def assign_document_id(content_hash: str, document_id) -> dict:
+    """Record the stored document of this content before any stage is done, so a retry reuses it."""
+    return upsert_registry_entry(content_hash, {"document_id": str(document_id)})
+
+
+def is_done(entry, *stages) -> bool:
+    status = (entry or {}).get("status", {})
+    return all(status.get(s) for s in stages)
+
+
+def resolve_document_id(doc_ref):
+    """
+    Canonical document id for either an ObjectId string or a file path.
+    Returns None for files that were never parsed.
+    """
+    if not doc_ref:
+        return None
+    doc_ref = str(doc_ref)
+    if _OBJECT_ID_RE.match(doc_ref) and not os.path.exists(doc_ref):
+        return doc_ref
+    entry = lookup_document(doc_ref)
+    return entry.get("document_id") if entry else None
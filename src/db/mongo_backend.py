@@ -0,0 +1,174 @@
+# src/db/mongo_backend.py
+import os
+import threading
+from dotenv import load_dotenv
+from pymongo import MongoClient, ReturnDocument, ASCENDING
+import gridfs
+from bson import ObjectId
+
+from db.storage import StorageBackend
+
+load_dotenv()
+
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+DB_NAME = os.getenv("DB_NAME", "audit_ai")
+MONGO_POOL_SIZE = int(os.getenv("MONGO_POOL_SIZE", "50"))
+
+# chunks are inserted in slices of this size
+CHUNK_INSERT_BATCH = int(os.getenv("MONGO_CHUNK_INSERT_BATCH", "1000"))
+
+
+class MongoBackend(StorageBackend):
+    name = "mongo"
+
+    def __init__(self, uri: str = MONGO_URI, db_name: str = DB_NAME):
+        super().__init__()
+        self.uri = uri
+        self.db_name = db_name
+        self._client = None
+        self._db = None
+        self._text_fs = None
+        self._lock = threading.Lock()
+
+    # ---------------------------------------
+    # lazy, pooled connection
+    # ---------------------------------------
+    def _connect(self):
+        with self._lock:
+            if self._db is None:
+                # MongoClient keeps its own connection pool; connect=False
+                # defers the first network round trip to the first operation
+                self._client = MongoClient(self.uri, maxPoolSize=MONGO_POOL_SIZE, connect=False)
+                db = self._client[self.db_name]
+                db.document_chunks.create_index([("document_id", ASCENDING), ("chunk_id", ASCENDING)], unique=True)
+                # raw statement text lives in GridFS, so headers stay small
+                self._text_fs = gridfs.GridFSBucket(db, bucket_name="document_text")
+                self._db = db
+
+    @property
+    def client(self):
+        if self._db is None:
+            self._connect()
+        return self._client
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._connect()
+        return self._db
+
+    @property
+    def text_fs(self):
+        if self._db is None:
+            self._connect()
+        return self._text_fs
+
+    def close(self):
+        super().close()
+        if self._client is not None:
+            self._client.close()
+
+    # ---------------------------------------
+    # generic writes
+    # ---------------------------------------
+    def new_id(self):
+        return ObjectId()
+
+    def insert_many(self, collection: str, docs: list):
+        self.db[collection].insert_many(docs, ordered=False)
+
+    # ---------------------------------------
+    # documents + chunks
+    # ---------------------------------------
+    def insert_document(self, record: dict, text: str, chunks: list) -> dict:
+        return self.insert_documents([(record, text, chunks)])[0]
+
+    def insert_documents(self, items: list) -> list:
+        """One GridFS upload per text, then the headers and all chunks in batched insert_many calls."""
+        db = self.db
+        records, chunk_docs = [], []
+        for record, text, chunks in items:
+            record.setdefault("_id", ObjectId())
+            document_id = str(record["_id"])
+            record["text_file_id"] = self.text_fs.upload_from_stream(
+                record.get("filename") or document_id, text.encode("utf-8"), metadata={"document_id": document_id}
+            )
+            records.append(record)
+            chunk_docs += [{**c, "document_id": document_id, "chunk_id": c.get("chunk_id", i)}
+                           for i, c in enumerate(chunks)]
+        if records:
+            db.documents.insert_many(records, ordered=False)
+        for start in range(0, len(chunk_docs), CHUNK_INSERT_BATCH):
+            db.document_chunks.insert_many(chunk_docs[start:start + CHUNK_INSERT_BATCH], ordered=False)
+        return records
+
+    def find_document(self, doc_id, fields: list = None):
+        projection = {f: 1 for f in fields} if fields else None
+        return self.db.documents.find_one({"_id": ObjectId(doc_id)}, projection)
+
+    def find_chunks(self, doc_id, chunk_ids: list = None, fields: list = ("chunk_id", "text")) -> list:
+        query = {"document_id": str(doc_id)}
+        if chunk_ids is not None:
+            query["chunk_id"] = {"$in": list(chunk_ids)}
+        projection = {"_id": 0, "chunk_id": 1, **{f: 1 for f in fields}}
+        return list(self.db.document_chunks.find(query, projection).sort("chunk_id", ASCENDING))
+
+    def find_chunks_many(self, refs: list, fields: list = ("chunk_id", "text")) -> dict:
+        db = self.db
+        by_doc = {}
+        for doc_id, chunk_id in refs:
+            by_doc.setdefault(str(doc_id), set()).add(chunk_id)
+        if not by_doc:
+            return {}
+        query = {"$or": [{"document_id": d, "chunk_id": {"$in": sorted(ids)}} for d, ids in by_doc.items()]}
+        projection = {"_id": 0, "document_id": 1, "chunk_id": 1, **{f: 1 for f in fields}}
+        found = {(c["document_id"], c["chunk_id"]): c for c in db.document_chunks.find(query, projection)}
+
+        # documents stored before chunks were split out keep them embedded
+        for doc_id, chunk_id in refs:
+            key = (str(doc_id), chunk_id)
+            if key in found or not ObjectId.is_valid(str(doc_id)):
+                continue
+            legacy = db.documents.find_one({"_id": ObjectId(str(doc_id))}, {"chunks": {"$slice": [chunk_id, 1]}})
+            if legacy and legacy.get("chunks"):
+                found[key] = {"document_id": str(doc_id), "chunk_id": chunk_id, **legacy["chunks"][0]}
+        return found
+
+    def get_document_text(self, doc_id) -> str:
+        header = self.find_document(doc_id, fields=["text_file_id", "text"])
+        if not header:
+            return None
+        if header.get("text_file_id") is not None:
+            return self.text_fs.open_download_stream(header["text_file_id"]).read().decode("utf-8")
+        return header.get("text", "")
+
+    # ---------------------------------------
+    # document registry
+    # ---------------------------------------
+    def find_registry_entry(self, content_hash: str):
+        return self.db.document_registry.find_one({"_id": content_hash})
+
+    def find_latest_registry_entry(self, filename: str):
+        return self.db.document_registry.find_one({"filename": filename}, sort=[("version", -1)])
+
+    def upsert_registry_entry(self, content_hash: str, fields: dict, on_insert: dict, now) -> dict:
+        return self.db.document_registry.find_one_and_update(
+            {"_id": content_hash},
+            {"$set": {**fields, "updated_at": now}, "$setOnInsert": {**on_insert, "created_at": now}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+
+    # ---------------------------------------
+    # fine-tune runs
+    # ---------------------------------------
+    def update_record(self, collection: str, record_id, fields: dict):
+        if not isinstance(record_id, ObjectId) and ObjectId.is_valid(str(record_id)):
+            record_id = ObjectId(str(record_id))
+        self.db[collection].update_one({"_id": record_id}, {"$set": fields})
+
+    def find_latest_finetune(self, base_model: str):
+        return self.db.fine_tunes.find_one(
+            {"base_model": base_model, "status": "active"},
+            sort=[("adapter_version", -1)],
+        )
@@ -1,40 +1,68 @@
 # src/db/mongo_client.py
-import os
-from dotenv import load_dotenv
-from pymongo import MongoClient
+"""
+Public storage functions used by the agents.
+
+The name is historical: calls are forwarded to the backend selected by
+STORAGE_BACKEND (mongo | sqlite, see db/storage.py), which connects on
+first use.
+"""
 from datetime import datetime
-from bson import ObjectId
+from utils.tracing import traced
+from db.storage import get_backend
 
-load_dotenv()
 
-MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
-DB_NAME = os.getenv("DB_NAME", "audit_ai")
+def __getattr__(name):
+    # `client` / `db` used to be module globals; keep them reachable (Mongo only)
+    if name in ("client", "db"):
+        return getattr(get_backend(), name)
+    raise AttributeError(name)
 
-client = MongoClient(MONGO_URI)
-db = client[DB_NAME]
 
-def insert_document(record: dict):
+def _document_item(record: dict):
+    text = record.pop("text", "") or ""
+    chunks = record.pop("chunks", []) or []
     record['uploaded_at'] = datetime.utcnow()
-    res = db.documents.insert_one(record)
-    return db.documents.find_one({"_id": res.inserted_id})
+    record["text_length"] = len(text)
+    record["chunk_count"] = len(chunks)
+    return record, text, chunks
+
+@traced("db.insert_document")
+def insert_document(record: dict):
+    """
+    Stores a document as a small header plus one record per chunk and the
+    raw text kept apart (Mongo: documents / document_chunks / GridFS).
+    Returns the header (with _id). Synchronous: retrieval reads the
+    chunks straight after ingest.
+    """
+    return get_backend().insert_document(*_document_item(record))
 
+@traced("db.insert_documents")
+def insert_documents(records: list) -> list:
+    """insert_document for many documents in one batched backend write (bulk ingest)."""
+    return get_backend().insert_documents([_document_item(r) for r in records])
+
+@traced("db.insert_labeled_document")
 def insert_labeled_document(record: dict):
     record['generated_at'] = datetime.utcnow()
-    res = db.labeled_documents.insert_one(record)
-    return db.labeled_documents.find_one({"_id": res.inserted_id})
+    get_backend().write("labeled_documents", record)
+    return record
 
-def insert_log(agent: str, request_id: str, input_payload: dict, output_payload: dict, confidence: float = None):
+@traced("db.insert_log")
+def insert_log(agent: str, request_id: str, input_payload: dict, output_payload: dict, confidence: float = None, duration_sec: float = None):
     log = {
         "agent": agent,
         "request_id": request_id,
         "input": input_payload,
         "output": output_payload,
         "confidence": confidence,
+        "duration_sec": duration_sec,
         "timestamp": datetime.utcnow()
     }
-    db.agents_logs.insert_one(log)
+    return get_backend().write("agents_logs", log)
 
+@traced("db.insert_qapairs")
 def insert_qapairs(qapairs: list, source_doc_id=None):
+    backend = get_backend()
     docs = []
     for qa in qapairs:
         qa_doc = {
@@ -44,14 +72,58 @@ def insert_qapairs(qapairs: list, source_doc_id=None):
             "created_at": datetime.utcnow()
         }
         docs.append(qa_doc)
-    if docs:
-        db.qapairs.insert_many(docs)
+    for qa_doc in docs:
+        backend.write("qapairs", qa_doc)
     return len(docs)
 
+@traced("db.insert_finetune_record")
 def insert_finetune_record(record: dict):
     record['created_at'] = datetime.utcnow()
-    res = db.fine_tunes.insert_one(record)
-    return res.inserted_id
+    return get_backend().insert_one("fine_tunes", record)
+
+@traced("db.find_document")
+def find_document(doc_id, fields: list = None):
+    """Document header; `fields` limits the returned fields (projection)."""
+    return get_backend().find_document(doc_id, fields)
+
+@traced("db.find_chunks")
+def find_chunks(doc_id, chunk_ids: list = None, fields: list = ("chunk_id", "text")) -> list:
+    """Chunks of one document (all, or only chunk_ids), sorted by chunk_id."""
+    return get_backend().find_chunks(doc_id, chunk_ids, fields)
+
+@traced("db.find_chunks_many")
+def find_chunks_many(refs: list, fields: list = ("chunk_id", "text")) -> dict:
+    """
+    Fetch many (document_id, chunk_id) chunks in one go.
+    Returns {(document_id, chunk_id): chunk}; missing refs are absent.
+    """
+    return get_backend().find_chunks_many(refs, fields)
+
+@traced("db.get_document_text")
+def get_document_text(doc_id) -> str:
+    return get_backend().get_document_text(doc_id)
+
+@traced("db.find_registry_entry")
+def find_registry_entry(content_hash: str):
+    return get_backend().find_registry_entry(content_hash)
+
+@traced("db.find_latest_registry_entry")
+def find_latest_registry_entry(filename: str):
+    return get_backend().find_latest_registry_entry(filename)
+
+@traced("db.upsert_registry_entry")
+def upsert_registry_entry(content_hash: str, fields: dict, on_insert: dict = None):
+    return get_backend().upsert_registry_entry(content_hash, fields, on_insert or {}, datetime.utcnow())
+
+@traced("db.update_finetune_record")
+def update_finetune_record(record_id, fields: dict):
+    get_backend().update_record("fine_tunes", record_id, fields)
+
+@traced("db.find_latest_finetune")
+def find_latest_finetune(base_model: str):
+    return get_backend().find_latest_finetune(base_model)
+
+def flush_writes(timeout: float = None) -> bool:
+    """Block until queued writes are persisted."""
+    return get_backend().flush(timeout)
 
-def find_document(doc_id):
-    return db.documents.find_one({"_id": ObjectId(doc_id)})
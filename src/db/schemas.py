@@ -2,12 +2,15 @@
 """
 Schemas (informational) for MongoDB collections:
 
-documents:
+documents (header only; older records may still embed text + chunks):
 {
-  _id, filename, text, chunks: [{chunk_id, text, start, end}],
-  uploaded_at, metadata: {source, pages, filetype}, version
+  _id, filename, text_file_id (GridFS "document_text"), text_length, chunk_count,
+  uploaded_at, metadata: {source, pages, filetype}, version, content_hash
 }
 
+document_chunks:  unique index (document_id, chunk_id)
+{ _id, document_id (str), chunk_id, text, start, end }
+
 labeled_documents:
 {
   _id, document_id (ObjectId), labels: [ {line_id, date, description, debit, credit, balance, category} ],
@@ -15,11 +18,25 @@ labeled_documents:
 }
 
 agents_logs:
-{ agent, request_id, input, output, confidence, timestamp }
+{ agent, request_id, input, output (or summary when large), output_ref, output_bytes, confidence, duration_sec, timestamp }
+
+agents_payloads:
+{ _id, log_id, output }   # large agents_logs outputs stored by reference
 
 qapairs:
 { question, answer, source_doc_id, created_at }
 
+document_registry:
+{
+  _id (sha256 of file content), document_id, filename, path, version, supersedes,
+  status: {parsed, labeled, indexed}, labeled_csv, labeled_docx, created_at, updated_at
+}
+
 fine_tunes:
-{ base_model, peft_config, dataset_path, metrics: {loss_history,..}, output_dir, created_at }
+{ base_model, peft_config, dataset_path, output_dir, created_at,
+  metrics: {loss_history: [{step, epoch, loss, learning_rate, tokens_per_sec}], final_loss,
+            tokens, target_tokens, padding_ratio, tokens_per_sec, samples_per_sec, steps,
+            train_time_sec, phases_sec: {load, tokenize, train, save}, total_sec, peak_rss_mb},
+  mode (continual|full), adapter_version, adapter_dir, parent_version, status (active|rolled_back),
+  new_examples, replay_examples }
 """
@@ -0,0 +1,264 @@
+# src/db/sqlite_backend.py
+"""
+Embedded storage backend: one SQLite file in WAL mode.
+
+Every collection is a table of (id, body JSON); lookups that need to be
+fast use expression indexes on json_extract. Chunks get their own
+WITHOUT ROWID table keyed on (document_id, chunk_id) and raw text its own
+table, mirroring the Mongo header / chunk / GridFS split.
+
+Connections are per thread (sqlite3 objects are not shareable across
+threads) and reused for the life of the thread.
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+from datetime import datetime
+
+from db.storage import StorageBackend
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+SQLITE_PATH = os.getenv("SQLITE_PATH", os.path.join(PROJECT_ROOT, "data", "audit_ai.db"))
+
+COLLECTIONS = (
+    "documents",
+    "labeled_documents",
+    "agents_logs",
+    "agents_payloads",
+    "qapairs",
+    "fine_tunes",
+    "document_registry",
+)
+
+SCHEMA = [
+    *[f"CREATE TABLE IF NOT EXISTS {c} (id TEXT PRIMARY KEY, body TEXT NOT NULL)" for c in COLLECTIONS],
+    """CREATE TABLE IF NOT EXISTS document_chunks (
+        document_id TEXT NOT NULL, chunk_id INTEGER NOT NULL, body TEXT NOT NULL,
+        PRIMARY KEY (document_id, chunk_id)) WITHOUT ROWID""",
+    "CREATE TABLE IF NOT EXISTS document_text (document_id TEXT PRIMARY KEY, text TEXT NOT NULL)",
+    """CREATE INDEX IF NOT EXISTS registry_filename_version ON document_registry
+        (json_extract(body, '$.filename'), json_extract(body, '$.version'))""",
+    "CREATE INDEX IF NOT EXISTS logs_request ON agents_logs (json_extract(body, '$.request_id'))",
+    """CREATE INDEX IF NOT EXISTS fine_tunes_model ON fine_tunes
+        (json_extract(body, '$.base_model'), json_extract(body, '$.adapter_version'))""",
+]
+
+
+def _default(o):
+    if isinstance(o, datetime):
+        return o.isoformat()
+    return str(o)
+
+
+def _dumps(doc) -> str:
+    return json.dumps(doc, default=_default, ensure_ascii=False)
+
+
+def _project(doc: dict, fields) -> dict:
+    if doc is None or not fields:
+        return doc
+    keep = {f.split(".")[0] for f in fields}
+    return {k: v for k, v in doc.items() if k == "_id" or k in keep}
+
+
+def _set_path(doc: dict, dotted: str, value):
+    parts = dotted.split(".")
+    for p in parts[:-1]:
+        doc = doc.setdefault(p, {})
+    doc[parts[-1]] = value
+
+
+class SQLiteBackend(StorageBackend):
+    name = "sqlite"
+
+    def __init__(self, path: str = SQLITE_PATH):
+        super().__init__()
+        self.path = path
+        self._local = threading.local()
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+
+    # ---------------------------------------
+    # per-thread connections
+    # ---------------------------------------
+    @property
+    def conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, isolation_level=None, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+            self._ensure_schema(conn)
+        return conn
+
+    def _ensure_schema(self, conn):
+        if self._schema_ready:
+            return
+        with self._schema_lock:
+            if not self._schema_ready:
+                for stmt in SCHEMA:
+                    conn.execute(stmt)
+                self._schema_ready = True
+
+    def _fetch_one(self, sql: str, params=()):
+        row = self.conn.execute(sql, params).fetchone()
+        return json.loads(row[0]) if row else None
+
+    # ---------------------------------------
+    # generic writes
+    # ---------------------------------------
+    def new_id(self):
+        # ObjectId-shaped: 4-byte timestamp + 8 random bytes, as 24 hex chars
+        return int(time.time()).to_bytes(4, "big").hex() + os.urandom(8).hex()
+
+    def insert_many(self, collection: str, docs: list):
+        rows = []
+        for d in docs:
+            d.setdefault("_id", self.new_id())
+            rows.append((str(d["_id"]), _dumps(d)))
+        conn = self.conn
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(f"INSERT INTO {collection} (id, body) VALUES (?, ?)", rows)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    # ---------------------------------------
+    # documents + chunks
+    # ---------------------------------------
+    def insert_document(self, record: dict, text: str, chunks: list) -> dict:
+        return self.insert_documents([(record, text, chunks)])[0]
+
+    def insert_documents(self, items: list) -> list:
+        """All documents of the batch in one transaction."""
+        records = []
+        conn = self.conn
+        conn.execute("BEGIN")
+        try:
+            for record, text, chunks in items:
+                record.setdefault("_id", self.new_id())
+                document_id = str(record["_id"])
+                conn.execute("INSERT INTO documents (id, body) VALUES (?, ?)", (document_id, _dumps(record)))
+                conn.execute("INSERT INTO document_text (document_id, text) VALUES (?, ?)", (document_id, text))
+                conn.executemany(
+                    "INSERT INTO document_chunks (document_id, chunk_id, body) VALUES (?, ?, ?)",
+                    (
+                        (document_id, c.get("chunk_id", i), _dumps({**c, "document_id": document_id, "chunk_id": c.get("chunk_id", i)}))
+                        for i, c in enumerate(chunks)
+                    ),
+                )
+                records.append(record)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return records
+
+    def find_document(self, doc_id, fields: list = None):
+        return _project(self._fetch_one("SELECT body FROM documents WHERE id = ?", (str(doc_id),)), fields)
+
+    def find_chunks(self, doc_id, chunk_ids: list = None, fields: list = ("chunk_id", "text")) -> list:
+        sql = "SELECT body FROM document_chunks WHERE document_id = ?"
+        params = [str(doc_id)]
+        if chunk_ids is not None:
+            chunk_ids = list(chunk_ids)
+            sql += f" AND chunk_id IN ({','.join('?' * len(chunk_ids))})"
+            params += chunk_ids
+        sql += " ORDER BY chunk_id"
+        keep = {"chunk_id", *fields}
+        return [
+            {k: v for k, v in json.loads(row[0]).items() if k in keep}
+            for row in self.conn.execute(sql, params)
+        ]
+
+    def find_chunks_many(self, refs: list, fields: list = ("chunk_id", "text")) -> dict:
+        by_doc = {}
+        for doc_id, chunk_id in refs:
+            by_doc.setdefault(str(doc_id), set()).add(chunk_id)
+        found = {}
+        for doc_id, ids in by_doc.items():
+            for c in self.find_chunks(doc_id, sorted(ids), fields=("document_id", *fields)):
+                found[(doc_id, c["chunk_id"])] = c
+        return found
+
+    def get_document_text(self, doc_id) -> str:
+        row = self.conn.execute("SELECT text FROM document_text WHERE document_id = ?", (str(doc_id),)).fetchone()
+        return row[0] if row else None
+
+    # ---------------------------------------
+    # document registry
+    # ---------------------------------------
+    def find_registry_entry(self, content_hash: str):
+        return self._fetch_one("SELECT body FROM document_registry WHERE id = ?", (content_hash,))
+
+    def find_latest_registry_entry(self, filename: str):
+        return self._fetch_one(
+            """SELECT body FROM document_registry WHERE json_extract(body, '$.filename') = ?
+               ORDER BY json_extract(body, '$.version') DESC LIMIT 1""",
+            (filename,),
+        )
+
+    def upsert_registry_entry(self, content_hash: str, fields: dict, on_insert: dict, now) -> dict:
+        conn = self.conn
+        # IMMEDIATE takes the write lock up front, so read-modify-write is atomic
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT body FROM document_registry WHERE id = ?", (content_hash,)).fetchone()
+            if row:
+                entry = json.loads(row[0])
+            else:
+                entry = {"_id": content_hash, "created_at": now}
+                for k, v in on_insert.items():
+                    _set_path(entry, k, v)
+            for k, v in {**fields, "updated_at": now}.items():
+                _set_path(entry, k, v)
+            conn.execute(
+                "INSERT OR REPLACE INTO document_registry (id, body) VALUES (?, ?)",
+                (content_hash, _dumps(entry)),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return json.loads(_dumps(entry))
+
+    # ---------------------------------------
+    # fine-tune runs
+    # ---------------------------------------
+    def update_record(self, collection: str, record_id, fields: dict):
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(f"SELECT body FROM {collection} WHERE id = ?", (str(record_id),)).fetchone()
+            if row:
+                doc = json.loads(row[0])
+                for k, v in fields.items():
+                    _set_path(doc, k, v)
+                conn.execute(f"UPDATE {collection} SET body = ? WHERE id = ?", (_dumps(doc), str(record_id)))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def find_latest_finetune(self, base_model: str):
+        return self._fetch_one(
+            """SELECT body FROM fine_tunes WHERE json_extract(body, '$.base_model') = ?
+               AND json_extract(body, '$.status') = 'active'
+               ORDER BY json_extract(body, '$.adapter_version') DESC LIMIT 1""",
+            (base_model,),
+        )
+
+    def close(self):
+        super().close()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
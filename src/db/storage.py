@@ -0,0 +1,197 @@
+# src/db/storage.py
+"""
+Storage backend interface.
+
+db/mongo_client.py keeps the public functions (insert_document,
+find_document, insert_log, insert_qapairs, insert_finetune_record, ...)
+and forwards them to the backend picked by STORAGE_BACKEND:
+
+    mongo   MongoDB (db/mongo_backend.py), the default
+    sqlite  embedded SQLite in WAL mode (db/sqlite_backend.py), no server
+
+Backends are created on first use, so importing db modules never opens a
+connection. Fire-and-forget writes (logs, labeled documents, Q/A pairs)
+go through a shared BulkWriter; writes that are read back right away
+(documents, registry, fine-tune records) are synchronous.
+"""
+import os
+import json
+import abc
+import atexit
+import threading
+
+from db.bulk_writer import BulkWriter
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "mongo").lower()
+
+# background write pipeline (see db/bulk_writer.py)
+ASYNC_WRITES = os.getenv("DB_ASYNC_WRITES", "1") == "1"
+WRITE_QUEUE_SIZE = int(os.getenv("DB_WRITE_QUEUE_SIZE", "10000"))
+WRITE_BATCH_SIZE = int(os.getenv("DB_WRITE_BATCH_SIZE", "500"))
+WRITE_FLUSH_INTERVAL = float(os.getenv("DB_WRITE_FLUSH_INTERVAL", "1.0"))
+# log outputs larger than this are stored in agents_payloads and referenced
+LOG_PAYLOAD_INLINE_MAX_BYTES = int(os.getenv("LOG_PAYLOAD_INLINE_MAX_BYTES", "65536"))
+
+
+def _payload_summary(payload):
+    if isinstance(payload, dict):
+        return {k: _payload_summary(v) for k, v in payload.items()}
+    if isinstance(payload, (list, tuple)):
+        return {"items": len(payload)}
+    return payload if isinstance(payload, (int, float, bool)) or payload is None else str(payload)[:200]
+
+
+class StorageBackend(abc.ABC):
+    """Backends implement every abstract method; a missing one fails at construction."""
+    name = "base"
+
+    def __init__(self):
+        self.writer = BulkWriter(
+            self.insert_many,
+            queue_size=WRITE_QUEUE_SIZE,
+            batch_size=WRITE_BATCH_SIZE,
+            flush_interval=WRITE_FLUSH_INTERVAL,
+            prepare=self._externalize_large_payload,
+            name=f"{self.name}-writer",
+        )
+
+    # ---------------------------------------
+    # generic writes
+    # ---------------------------------------
+    @abc.abstractmethod
+    def new_id(self):
+        ...
+
+    @abc.abstractmethod
+    def insert_many(self, collection: str, docs: list):
+        ...
+
+    def insert_one(self, collection: str, doc: dict):
+        """Synchronous insert; returns the _id."""
+        doc.setdefault("_id", self.new_id())
+        self.insert_many(collection, [doc])
+        return doc["_id"]
+
+    def write(self, collection: str, doc: dict):
+        """Queue doc for a batched insert (or insert inline when async writes are off)."""
+        doc.setdefault("_id", self.new_id())
+        if ASYNC_WRITES:
+            self.writer.submit(collection, doc)
+        else:
+            for c, d in self._externalize_large_payload(collection, doc):
+                self.insert_many(c, [d])
+        return doc["_id"]
+
+    def flush(self, timeout: float = None) -> bool:
+        return self.writer.flush(timeout)
+
+    def close(self):
+        self.writer.close()
+
+    def _externalize_large_payload(self, collection: str, doc: dict) -> list:
+        """Runs on the writer thread: move oversized log outputs to agents_payloads."""
+        if collection != "agents_logs" or LOG_PAYLOAD_INLINE_MAX_BYTES <= 0:
+            return [(collection, doc)]
+        output = doc.get("output")
+        size = len(json.dumps(output, default=str))
+        if size <= LOG_PAYLOAD_INLINE_MAX_BYTES:
+            return [(collection, doc)]
+        payload_id = self.new_id()
+        doc["output"] = _payload_summary(output)
+        doc["output_ref"] = payload_id
+        doc["output_bytes"] = size
+        return [
+            ("agents_payloads", {"_id": payload_id, "log_id": doc["_id"], "output": output}),
+            (collection, doc),
+        ]
+
+    # ---------------------------------------
+    # documents + chunks
+    # ---------------------------------------
+    @abc.abstractmethod
+    def insert_document(self, record: dict, text: str, chunks: list) -> dict:
+        ...
+
+    def insert_documents(self, items: list) -> list:
+        """items: [(record, text, chunks)]; backends override this with one batched write."""
+        return [self.insert_document(record, text, chunks) for record, text, chunks in items]
+
+    @abc.abstractmethod
+    def find_document(self, doc_id, fields: list = None):
+        ...
+
+    @abc.abstractmethod
+    def find_chunks(self, doc_id, chunk_ids: list = None, fields: list = ("chunk_id", "text")) -> list:
+        ...
+
+    @abc.abstractmethod
+    def find_chunks_many(self, refs: list, fields: list = ("chunk_id", "text")) -> dict:
+        ...
+
+    @abc.abstractmethod
+    def get_document_text(self, doc_id) -> str:
+        ...
+
+    # ---------------------------------------
+    # document registry
+    # ---------------------------------------
+    @abc.abstractmethod
+    def find_registry_entry(self, content_hash: str):
+        ...
+
+    @abc.abstractmethod
+    def find_latest_registry_entry(self, filename: str):
+        ...
+
+    @abc.abstractmethod
+    def upsert_registry_entry(self, content_hash: str, fields: dict, on_insert: dict, now) -> dict:
+        ...
+
+    # ---------------------------------------
+    # fine-tune runs
+    # ---------------------------------------
+    @abc.abstractmethod
+    def update_record(self, collection: str, record_id, fields: dict):
+        ...
+
+    @abc.abstractmethod
+    def find_latest_finetune(self, base_model: str):
+        """Newest active adapter record for base_model (highest adapter_version)."""
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def create_backend(name: str = None) -> StorageBackend:
+    name = (name or STORAGE_BACKEND).lower()
+    if name == "sqlite":
+        from db.sqlite_backend import SQLiteBackend
+        return SQLiteBackend()
+    if name == "mongo":
+        from db.mongo_backend import MongoBackend
+        return MongoBackend()
+    raise ValueError(f"Unknown STORAGE_BACKEND: {name}")
+
+
+def get_backend() -> StorageBackend:
+    """Process-wide backend, created on first use."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend()
+    return _backend
+
+
+def set_backend(backend: StorageBackend):
+    """Swap the process-wide backend (tests, benchmarks)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+@atexit.register
+def _flush_at_exit():
+    if _backend is not None:
+        _backend.flush(timeout=30)
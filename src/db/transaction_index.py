@@ -0,0 +1,352 @@
+# src/db/transaction_index.py
+"""
+Cross-document transaction index for duplicate and anomaly detection.
+
+Maintained incrementally at ingest (one add_document() per parsed
+document) in a single SQLite file, so checking a new transaction never
+re-reads earlier statements:
+
+- entries     one row per indexed transaction, keyed by
+              hash(normalized description, direction, amount) + date bucket
+              (TX_INDEX_WINDOW_DAYS wide). A duplicate is an earlier entry
+              with the same key in the same or a neighbouring bucket and at
+              most TX_INDEX_WINDOW_DAYS apart: one indexed lookup.
+- stats       per (category, direction) running statistics: count / mean /
+              M2 (Welford) for z-scores and a fixed-size reservoir sample of
+              amounts for the quartiles used by the IQR rule.
+- flags       what add_document() found, so the anomalies task is a plain
+              query afterwards.
+
+A new transaction is scored against the history before it is added, and
+only once its category has TX_INDEX_MIN_HISTORY amounts. When a document
+is a new version of an earlier one (the registry's `supersedes`), the
+earlier version's entries, stats contributions and flags are removed
+first, so its unchanged rows are not reported as duplicates.
+"""
+import os
+import json
+import random
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime, date
+
+from parsers.categorizer import normalize_description
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+TX_INDEX_PATH = os.getenv("TX_INDEX_PATH", os.path.join(PROJECT_ROOT, "data", "transaction_index.db"))
+TX_INDEX_WINDOW_DAYS = int(os.getenv("TX_INDEX_WINDOW_DAYS", "3"))
+TX_INDEX_Z = float(os.getenv("TX_INDEX_Z", "3.0"))
+TX_INDEX_IQR_K = float(os.getenv("TX_INDEX_IQR_K", "1.5"))
+TX_INDEX_MIN_HISTORY = int(os.getenv("TX_INDEX_MIN_HISTORY", "8"))
+TX_INDEX_RESERVOIR = int(os.getenv("TX_INDEX_RESERVOIR", "256"))
+
+_DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y", "%d-%m-%Y", "%d/%m/%y", "%m/%d/%y", "%d-%m-%y")
+
+
+def parse_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value or "").strip()[:10]
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _amount(row: dict):
+    """(direction, absolute amount) of a row, or (None, None)."""
+    for direction in ("debit", "credit"):
+        value = row.get(direction)
+        if value in (None, ""):
+            continue
+        try:
+            value = abs(float(str(value).replace(",", "")))
+        except ValueError:
+            continue
+        if value == value and value > 0:
+            return direction, round(value, 2)
+    return None, None
+
+
+def tx_key(description, direction: str, amount: float) -> str:
+    raw = f"{normalize_description(description)}|{direction}|{amount:.2f}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _quartiles(values: list):
+    s = sorted(values)
+    n = len(s)
+
+    def q(p):
+        pos = p * (n - 1)
+        lo = int(pos)
+        hi = min(lo + 1, n - 1)
+        return s[lo] + (s[hi] - s[lo]) * (pos - lo)
+
+    return q(0.25), q(0.75)
+
+
+# ---------------------------------------
+# per-category running statistics
+# ---------------------------------------
+class RunningStats:
+    def __init__(self, n: int = 0, mean: float = 0.0, m2: float = 0.0, sample: list = None):
+        self.n, self.mean, self.m2 = n, mean, m2
+        self.sample = sample or []
+        self._quartiles = None
+
+    def add(self, x: float, rng: random.Random, capacity: int = TX_INDEX_RESERVOIR):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+        if len(self.sample) < capacity:
+            self.sample.append(x)
+        else:
+            j = rng.randrange(self.n)
+            if j < capacity:
+                self.sample[j] = x
+        self._quartiles = None
+
+    def remove(self, x: float):
+        """Undo add(x): exact for count / mean / M2, best effort for the reservoir."""
+        if self.n <= 1:
+            self.n, self.mean, self.m2, self.sample = 0, 0.0, 0.0, []
+        else:
+            mean = (self.n * self.mean - x) / (self.n - 1)
+            self.m2 = max(0.0, self.m2 - (x - mean) * (x - self.mean))
+            self.n -= 1
+            self.mean = mean
+            if x in self.sample:
+                self.sample.remove(x)
+        self._quartiles = None
+
+    @property
+    def std(self) -> float:
+        return (self.m2 / (self.n - 1)) ** 0.5 if self.n > 1 else 0.0
+
+    def score(self, x: float, z: float = TX_INDEX_Z, k: float = TX_INDEX_IQR_K) -> list:
+        """Reasons x is an outlier against the history so far ([] if it is not)."""
+        reasons = []
+        std = self.std
+        if std > 0 and abs(x - self.mean) / std > z:
+            reasons.append({"rule": "zscore", "z": round((x - self.mean) / std, 2),
+                            "mean": round(self.mean, 2), "std": round(std, 2)})
+        if self.sample:
+            if self._quartiles is None:
+                self._quartiles = _quartiles(self.sample)
+            q1, q3 = self._quartiles
+            iqr = q3 - q1
+            if iqr > 0 and (x < q1 - k * iqr or x > q3 + k * iqr):
+                reasons.append({"rule": "iqr", "q1": round(q1, 2), "q3": round(q3, 2)})
+        return reasons
+
+
+# ---------------------------------------
+# index
+# ---------------------------------------
+class TransactionIndex:
+    def __init__(self, path: str = TX_INDEX_PATH, window_days: int = TX_INDEX_WINDOW_DAYS,
+                 min_history: int = TX_INDEX_MIN_HISTORY):
+        self.path = path
+        self.window_days = max(1, window_days)
+        self.min_history = min_history
+        self._lock = threading.Lock()
+        self._conn = None
+        self._rng = random.Random(0)
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS documents (document_id TEXT PRIMARY KEY, rows INTEGER, indexed_at TEXT);
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT NOT NULL, bucket INTEGER, day INTEGER, document_id TEXT NOT NULL,
+                    line_id INTEGER, date TEXT, description TEXT, direction TEXT, amount REAL, category TEXT
+                );
+                CREATE INDEX IF NOT EXISTS entries_key ON entries (key, bucket);
+                CREATE TABLE IF NOT EXISTS stats (
+                    category TEXT, direction TEXT, n INTEGER, mean REAL, m2 REAL, sample TEXT,
+                    PRIMARY KEY (category, direction)
+                );
+                CREATE TABLE IF NOT EXISTS flags (
+                    document_id TEXT, line_id INTEGER, kind TEXT, category TEXT, amount REAL, detail TEXT
+                );
+                CREATE INDEX IF NOT EXISTS flags_document ON flags (document_id);
+            """)
+        return self._conn
+
+    def _load_stats(self, category: str, direction: str) -> RunningStats:
+        row = self.conn.execute(
+            "SELECT n, mean, m2, sample FROM stats WHERE category = ? AND direction = ?", (category, direction)
+        ).fetchone()
+        return RunningStats(row[0], row[1], row[2], json.loads(row[3])) if row else RunningStats()
+
+    def _find_duplicates(self, key: str, day: int, pending: list) -> list:
+        bucket = day // self.window_days
+        hits = self.conn.execute(
+            "SELECT document_id, line_id, date, day FROM entries WHERE key = ? AND bucket BETWEEN ? AND ?",
+            (key, bucket - 1, bucket + 1),
+        ).fetchall()
+        # rows of the same document are not in the table yet
+        hits += [(d, l, dt, dy) for k, d, l, dt, dy in pending if k == key]
+        return [{"document_id": d, "line_id": l, "date": dt} for d, l, dt, dy in hits
+                if dy is None or day is None or abs(dy - day) <= self.window_days]
+
+    def _remove(self, document_id: str, stats: dict) -> int:
+        """Take a document's entries out of the index (caller holds the lock and commits)."""
+        rows = self.conn.execute(
+            "SELECT category, direction, amount FROM entries WHERE document_id = ?", (document_id,)
+        ).fetchall()
+        for category, direction, amount in rows:
+            sk = (category, direction)
+            if sk not in stats:
+                stats[sk] = self._load_stats(*sk)
+            stats[sk].remove(amount)
+        for table in ("entries", "flags", "documents"):
+            self.conn.execute(f"DELETE FROM {table} WHERE document_id = ?", (document_id,))
+        return len(rows)
+
+    def _save_stats(self, stats: dict):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO stats VALUES (?, ?, ?, ?, ?, ?)",
+            [(c, d, s.n, s.mean, s.m2, json.dumps(s.sample)) for (c, d), s in stats.items()],
+        )
+
+    def remove_document(self, document_id: str) -> int:
+        """Drop a document from the index; returns the number of entries removed."""
+        with self._lock:
+            stats = {}
+            with self.conn:
+                removed = self._remove(str(document_id), stats)
+                self._save_stats(stats)
+        return removed
+
+    def add_document(self, document_id: str, rows: list, supersedes: str = None) -> dict:
+        """
+        Index a document's rows; returns the duplicates and anomalies found
+        among them. A document already in the index is not added twice.
+        supersedes: document_id of the version this one replaces; its
+        entries are removed before the new rows are checked.
+        """
+        document_id = str(document_id)
+        with self._lock:
+            if self.conn.execute("SELECT 1 FROM documents WHERE document_id = ?", (document_id,)).fetchone():
+                return {"document_id": document_id, "skipped": True, **self.flags(document_id, _locked=True)}
+
+            # one transaction: the superseded version's removal, the new entries,
+            # stats and flags are committed together or not at all
+            with self.conn:
+                stats, entries, flags, pending = {}, [], [], []
+                removed = 0
+                if supersedes and str(supersedes) != document_id:
+                    removed = self._remove(str(supersedes), stats)
+                for i, row in enumerate(rows):
+                    direction, amount = _amount(row)
+                    if direction is None:
+                        continue
+                    line_id = row.get("line_id", i)
+                    day_date = parse_date(row.get("date"))
+                    day = day_date.toordinal() if day_date else None
+                    description = row.get("description") or row.get("raw") or ""
+                    category = row.get("category") or "UNCATEGORIZED"
+                    key = tx_key(description, direction, amount)
+                    base = {"document_id": document_id, "line_id": line_id, "category": category, "amount": amount}
+
+                    if day is not None:
+                        matches = self._find_duplicates(key, day, pending)
+                        if matches:
+                            flags.append({**base, "kind": "duplicate", "detail": {"matches": matches[:10]}})
+                        pending.append((key, document_id, line_id, day_date.isoformat(), day))
+
+                    sk = (category, direction)
+                    if sk not in stats:
+                        stats[sk] = self._load_stats(*sk)
+                    rs = stats[sk]
+                    if rs.n >= self.min_history:
+                        reasons = rs.score(amount)
+                        if reasons:
+                            flags.append({**base, "kind": "anomaly",
+                                          "detail": {"direction": direction, "reasons": reasons}})
+                    rs.add(amount, self._rng)
+
+                    entries.append((key, None if day is None else day // self.window_days, day, document_id, line_id,
+                                    day_date.isoformat() if day_date else None, description, direction, amount, category))
+
+                self.conn.executemany("INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", entries)
+                self._save_stats(stats)
+                self.conn.executemany(
+                    "INSERT INTO flags VALUES (?, ?, ?, ?, ?, ?)",
+                    [(f["document_id"], f["line_id"], f["kind"], f["category"], f["amount"], json.dumps(f["detail"]))
+                     for f in flags],
+                )
+                self.conn.execute("INSERT INTO documents VALUES (?, ?, ?)",
+                                  (document_id, len(entries), datetime.utcnow().isoformat()))
+
+        out = {"document_id": document_id, "indexed": len(entries), **_split(flags)}
+        if removed:
+            out["superseded"] = {"document_id": str(supersedes), "removed": removed}
+        return out
+
+    def flags(self, document_id: str = None, kind: str = None, limit: int = 500, _locked: bool = False) -> dict:
+        """Stored duplicate / anomaly flags, optionally for one document or kind."""
+        sql, params = "SELECT document_id, line_id, kind, category, amount, detail FROM flags WHERE 1 = 1", []
+        if document_id:
+            sql += " AND document_id = ?"
+            params.append(str(document_id))
+        if kind:
+            sql += " AND kind = ?"
+            params.append(kind)
+        sql += " ORDER BY rowid LIMIT ?"
+        params.append(limit)
+        if _locked:
+            rows = self.conn.execute(sql, params).fetchall()
+        else:
+            with self._lock:
+                rows = self.conn.execute(sql, params).fetchall()
+        return _split([
+            {"document_id": d, "line_id": l, "kind": k, "category": c, "amount": a, "detail": json.loads(detail)}
+            for d, l, k, c, a, detail in rows
+        ])
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def _split(flags: list) -> dict:
+    return {
+        "duplicates": [f for f in flags if f["kind"] == "duplicate"],
+        "anomalies": [f for f in flags if f["kind"] == "anomaly"],
+    }
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_transaction_index() -> TransactionIndex:
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = TransactionIndex()
+    return _index
+
+
+def index_transactions(document_id: str, rows: list, supersedes: str = None) -> dict:
+    return get_transaction_index().add_document(document_id, rows, supersedes)
+
+
+def find_flags(document_id: str = None, kind: str = None, limit: int = 500) -> dict:
+    return get_transaction_index().flags(document_id, kind, limit)
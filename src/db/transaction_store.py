@@ -0,0 +1,151 @@
+# src/db/transaction_store.py
+"""
+Columnar per-document transaction store.
+
+At ingest time each document's parsed rows are normalized into a typed
+table and written as Parquet, together with precomputed monthly,
+category and counterparty aggregates:
+
+datasets/transactions/<document_id>/
+    transactions.parquet   line_id, date, month, description, counterparty,
+                           category, debit, credit, balance
+    monthly.parquet        month -> debit, credit, count
+    category.parquet       category -> debit, credit, count
+    counterparty.parquet   counterparty -> debit, credit, count
+
+The analysis task answers totals, group-bys and date-range filters with
+vectorized queries against these files.
+"""
+import os
+import re
+import hashlib
+
+import pandas as pd
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+TX_STORE_DIR = os.getenv("TX_STORE_DIR", os.path.join(PROJECT_ROOT, "datasets", "transactions"))
+
+GROUP_BY_COLUMNS = {
+    "month": "month",
+    "category": "category",
+    "counterparty": "counterparty",
+}
+
+_NOISE_RE = r"[\d\W_]+"
+
+
+def _doc_dir(document_id: str) -> str:
+    document_id = str(document_id)
+    if not re.fullmatch(r"[\w-]+", document_id):
+        document_id = hashlib.sha1(document_id.encode("utf-8")).hexdigest()
+    return os.path.join(TX_STORE_DIR, document_id)
+
+
+def normalize_counterparty(descriptions: pd.Series) -> pd.Series:
+    # drop dates, amounts and punctuation, keep the first few words
+    s = descriptions.fillna("").astype(str).str.upper()
+    s = s.str.replace(_NOISE_RE, " ", regex=True).str.split().str[:4].str.join(" ")
+    return s.where(s != "", "UNKNOWN")
+
+
+def rows_to_frame(rows: list) -> pd.DataFrame:
+    """Normalize labeled rows into the typed transactions table."""
+    df = pd.DataFrame(rows)
+    n = len(df)
+    out = pd.DataFrame({
+        "line_id": df["line_id"] if "line_id" in df else pd.RangeIndex(n),
+    })
+    for col in ("debit", "credit", "balance"):
+        out[col] = pd.to_numeric(df[col], errors="coerce") if col in df else pd.Series([float("nan")] * n, dtype=float)
+    out["date"] = pd.to_datetime(df["date"], errors="coerce", format="mixed") if "date" in df else pd.NaT
+    out["month"] = out["date"].dt.strftime("%Y-%m").fillna("UNKNOWN")
+    description = df["description"] if "description" in df else pd.Series([""] * n)
+    out["description"] = description.fillna("").astype(str)
+    out["counterparty"] = normalize_counterparty(out["description"])
+    category = df["category"] if "category" in df else pd.Series([None] * n)
+    out["category"] = category.fillna("UNCATEGORIZED").astype(str)
+    return out
+
+
+def _aggregate(df: pd.DataFrame, column: str) -> pd.DataFrame:
+    return (
+        df.groupby(column, sort=True)
+        .agg(debit=("debit", "sum"), credit=("credit", "sum"), count=("line_id", "size"))
+        .reset_index()
+    )
+
+
+def write_transactions(document_id: str, rows: list) -> dict:
+    """Persist a document's transactions and their aggregates. Returns {document_id, rows}."""
+    df = rows_to_frame(rows)
+    path = _doc_dir(document_id)
+    os.makedirs(path, exist_ok=True)
+    df.to_parquet(os.path.join(path, "transactions.parquet"), index=False)
+    for name, column in GROUP_BY_COLUMNS.items():
+        _aggregate(df, column).to_parquet(os.path.join(path, f"{name}.parquet"), index=False)
+    return {"document_id": str(document_id), "rows": len(df)}
+
+
+def has_transactions(document_id) -> bool:
+    return bool(document_id) and os.path.exists(os.path.join(_doc_dir(document_id), "transactions.parquet"))
+
+
+def load_transactions(document_id: str, columns: list = None, start_date=None, end_date=None) -> pd.DataFrame:
+    filters = []
+    if start_date:
+        filters.append(("date", ">=", pd.Timestamp(start_date)))
+    if end_date:
+        filters.append(("date", "<=", pd.Timestamp(end_date)))
+    return pd.read_parquet(
+        os.path.join(_doc_dir(document_id), "transactions.parquet"),
+        columns=columns,
+        filters=filters or None,
+    )
+
+
+def load_rows(document_id: str) -> list:
+    """Transactions as row dicts (same keys as the labeler output)."""
+    df = load_transactions(document_id)
+    df["date"] = df["date"].dt.strftime("%Y-%m-%d")
+    df = df.astype(object).where(df.notna(), None)
+    return df.drop(columns=["month", "counterparty"]).to_dict(orient="records")
+
+
+def query_transactions(document_id: str, group_by: str = None, start_date=None, end_date=None) -> dict:
+    """
+    Totals (and optionally a group-by) for one document.
+    Unfiltered group-bys are served from the precomputed aggregates.
+    """
+    path = _doc_dir(document_id)
+    filtered = bool(start_date or end_date)
+
+    if filtered:
+        df = load_transactions(document_id, columns=["line_id", "date", "debit", "credit", "month", "category", "counterparty"],
+                               start_date=start_date, end_date=end_date)
+        totals = df[["debit", "credit"]].sum()
+        result = {
+            "total_debit": float(totals["debit"]),
+            "total_credit": float(totals["credit"]),
+            "count": int(len(df)),
+        }
+    else:
+        monthly = pd.read_parquet(os.path.join(path, "monthly.parquet"))
+        result = {
+            "total_debit": float(monthly["debit"].sum()),
+            "total_credit": float(monthly["credit"].sum()),
+            "count": int(monthly["count"].sum()),
+        }
+
+    if group_by in GROUP_BY_COLUMNS:
+        column = GROUP_BY_COLUMNS[group_by]
+        if filtered:
+            grouped = _aggregate(df, column)
+        else:
+            grouped = pd.read_parquet(os.path.join(path, f"{group_by}.parquet"))
+        result["by_" + group_by] = grouped.to_dict(orient="records")
+
+    if start_date:
+        result["start_date"] = str(start_date)
+    if end_date:
+        result["end_date"] = str(end_date)
+    return result
@@ -0,0 +1,82 @@
+# src/fine_tune/adapters.py
+"""
+Versioned LoRA adapters.
+
+models/lora-output/
+    v0001/, v0002/, ...     one save_pretrained() output per training run
+    LATEST                  name of the version currently served
+
+Each run is recorded in `fine_tunes` with its adapter_version, parent
+version and status. The active adapter for a base model is the newest
+record with status "active"; rolling back marks it "rolled_back" and
+points LATEST at the one before it. Version numbers are never reused.
+"""
+import os
+import re
+
+from db.mongo_client import find_latest_finetune, update_finetune_record
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+# relative LORA_OUTPUT_DIR values are taken from the project root, not the cwd,
+# so the app, the API, the model worker and the CLIs all see the same tree
+ADAPTER_ROOT = os.path.join(PROJECT_ROOT, os.getenv("LORA_OUTPUT_DIR", os.path.join("models", "lora-output")))
+LATEST_FILE = "LATEST"
+
+_VERSION_RE = re.compile(r"^v(\d+)$")
+
+
+def version_name(version: int) -> str:
+    return f"v{version:04d}"
+
+
+def version_dir(version: int, root: str = ADAPTER_ROOT) -> str:
+    return os.path.join(root, version_name(version))
+
+
+def next_version(root: str = ADAPTER_ROOT) -> int:
+    if not os.path.isdir(root):
+        return 1
+    found = [int(m.group(1)) for m in (_VERSION_RE.match(n) for n in os.listdir(root)) if m]
+    return max(found, default=0) + 1
+
+
+def latest_adapter(base_model: str):
+    """Newest active adapter record for base_model whose directory still exists."""
+    record = find_latest_finetune(base_model)
+    if record and os.path.isdir(record.get("adapter_dir") or ""):
+        return record
+    return None
+
+
+def publish(version: int, root: str = ADAPTER_ROOT):
+    os.makedirs(root, exist_ok=True)
+    tmp = os.path.join(root, LATEST_FILE + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(version_name(version) + "\n")
+    os.replace(tmp, os.path.join(root, LATEST_FILE))
+
+
+def current_adapter_dir(root: str = ADAPTER_ROOT):
+    """Directory LATEST points at, or None before the first run."""
+    path = os.path.join(root, LATEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        name = f.read().strip()
+    return os.path.join(root, name) if name else None
+
+
+def rollback(base_model: str, root: str = ADAPTER_ROOT):
+    """Retire the active adapter; returns the record now active (None = base model only)."""
+    current = find_latest_finetune(base_model)
+    if not current:
+        return None
+    update_finetune_record(current["_id"], {"status": "rolled_back"})
+    previous = latest_adapter(base_model)
+    if previous:
+        publish(previous["adapter_version"], root)
+    else:
+        latest = os.path.join(root, LATEST_FILE)
+        if os.path.exists(latest):
+            os.remove(latest)
+    return previous
@@ -0,0 +1,206 @@
+# src/fine_tune/data_pipeline.py
+"""
+Training data pipeline for the LoRA trainers.
+
+Two ways to stop paying for padding:
+
+- packing: consecutive examples are concatenated into sequences of up to
+  TRAIN_SEQ_LEN tokens. Labels keep the per-example prompt mask and
+  position_ids restart at 0 for every example. The collator flattens a
+  packed batch into one row without an attention_mask, so a varlen
+  attention backend (flash-attention) splits it back into examples at
+  every position 0 and no example attends to another. Eager / SDPA
+  attention would ignore those boundaries, so packing is only used when
+  the model runs a VARLEN_ATTENTION backend (see packing_enabled).
+- length grouping (the default on CPU): examples stay separate, the
+  Trainer samples batches of similar length (group_by_length) and the
+  collator pads each batch only to its own longest sequence.
+
+The collator counts real vs padded tokens; ThroughputCallback turns those
+counts into tokens/sec in the training logs and the final metrics.
+"""
+import os
+import time
+
+import torch
+from transformers import TrainerCallback
+
+from fine_tune.tokenized_cache import IGNORE_INDEX
+from utils.logger import logger
+
+# pack when the attention backend allows it; "0" always uses length grouping
+TRAIN_PACKING = os.getenv("TRAIN_PACKING", "1") == "1"
+TRAIN_SEQ_LEN = int(os.getenv("TRAIN_SEQ_LEN", "1024"))
+TRAIN_BATCH_SIZE = int(os.getenv("TRAIN_BATCH_SIZE", "4"))
+PAD_TO_MULTIPLE_OF = int(os.getenv("TRAIN_PAD_TO_MULTIPLE_OF", "8"))
+# attention implementations that split a row into sequences at position_ids == 0
+VARLEN_ATTENTION = {"flash_attention_2", "flash_attention_3"}
+
+
+# ---------------------------------------
+# packing
+# ---------------------------------------
+def _pack_batch(batch, seq_len: int):
+    packed = {"input_ids": [], "labels": [], "position_ids": [], "length": []}
+    ids, labels, positions = [], [], []
+
+    def close():
+        if ids:
+            packed["input_ids"].append(ids)
+            packed["labels"].append(labels)
+            packed["position_ids"].append(positions)
+            packed["length"].append(len(ids))
+
+    for ex_ids, ex_labels in zip(batch["input_ids"], batch["labels"]):
+        ex_ids, ex_labels = ex_ids[:seq_len], ex_labels[:seq_len]
+        if len(ids) + len(ex_ids) > seq_len:
+            close()
+            ids, labels, positions = [], [], []
+        ids.extend(ex_ids)
+        labels.extend(ex_labels)
+        positions.extend(range(len(ex_ids)))
+    close()
+    return packed
+
+
+def packing_enabled(model, requested: bool = TRAIN_PACKING) -> bool:
+    """Pack only when the model's attention keeps packed examples apart."""
+    if not requested:
+        return False
+    impl = getattr(getattr(model, "config", None), "_attn_implementation", None)
+    if impl in VARLEN_ATTENTION:
+        return True
+    logger.info(f"packing needs one of {sorted(VARLEN_ATTENTION)} attention (model uses {impl}); "
+                "using length-grouped batches")
+    return False
+
+
+def pack_dataset(ds, seq_len: int = TRAIN_SEQ_LEN):
+    """Greedy in-order packing of tokenized examples into <= seq_len sequences."""
+    return ds.map(
+        _pack_batch,
+        batched=True,
+        batch_size=1000,
+        fn_kwargs={"seq_len": seq_len},
+        remove_columns=ds.column_names,
+    )
+
+
+def build_train_dataset(ds, packing: bool = False, seq_len: int = TRAIN_SEQ_LEN):
+    return pack_dataset(ds, seq_len) if packing else ds
+
+
+def training_kwargs(packing: bool = False) -> dict:
+    """TrainingArguments settings that go with the chosen pipeline (packing: see packing_enabled)."""
+    kwargs = {
+        "per_device_train_batch_size": TRAIN_BATCH_SIZE,
+        # the collator needs labels / position_ids; "length" is dropped there
+        "remove_unused_columns": False,
+    }
+    if not packing:
+        kwargs.update(group_by_length=True, length_column_name="length")
+    return kwargs
+
+
+# ---------------------------------------
+# collator
+# ---------------------------------------
+class CausalLMCollator:
+    """
+    Pads a batch to its longest sequence (rounded up to pad_to_multiple_of).
+    Packed batches (features with position_ids) are flattened instead, see
+    _flatten.
+    """
+
+    def __init__(self, tokenizer, pad_to_multiple_of: int = PAD_TO_MULTIPLE_OF):
+        self.pad_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+        self.pad_to_multiple_of = pad_to_multiple_of
+        self.tokens = 0          # real (non-pad) tokens
+        self.target_tokens = 0   # tokens that contribute to the loss
+        self.padded_tokens = 0   # tokens including padding
+        self.samples = 0         # sequences (packed or not)
+
+    def __call__(self, features: list) -> dict:
+        if "position_ids" in features[0]:
+            return self._flatten(features)
+        width = max(len(f["input_ids"]) for f in features)
+        if self.pad_to_multiple_of:
+            width = -(-width // self.pad_to_multiple_of) * self.pad_to_multiple_of
+
+        input_ids, labels, attention = [], [], []
+        for f in features:
+            n = len(f["input_ids"])
+            pad = width - n
+            input_ids.append(list(f["input_ids"]) + [self.pad_id] * pad)
+            labels.append(list(f["labels"]) + [IGNORE_INDEX] * pad)
+            attention.append([1] * n + [0] * pad)
+            self.tokens += n
+            self.target_tokens += sum(1 for t in f["labels"] if t != IGNORE_INDEX)
+        self.padded_tokens += width * len(features)
+        self.samples += len(features)
+
+        return {
+            "input_ids": torch.tensor(input_ids, dtype=torch.long),
+            "labels": torch.tensor(labels, dtype=torch.long),
+            "attention_mask": torch.tensor(attention, dtype=torch.long),
+        }
+
+    def _flatten(self, features: list) -> dict:
+        """
+        Packed batch -> one [1, total] row, no padding and no attention_mask:
+        the varlen attention path starts a new sequence at every
+        position_ids == 0. The first token of each example gets no label,
+        so no example is trained to predict the start of the next one.
+        """
+        input_ids, labels, positions = [], [], []
+        for f in features:
+            input_ids.extend(f["input_ids"])
+            positions.extend(f["position_ids"])
+            labels.extend(IGNORE_INDEX if p == 0 else t for t, p in zip(f["labels"], f["position_ids"]))
+        self.tokens += len(input_ids)
+        self.padded_tokens += len(input_ids)
+        self.target_tokens += sum(1 for t in labels if t != IGNORE_INDEX)
+        self.samples += len(features)
+        return {
+            "input_ids": torch.tensor([input_ids], dtype=torch.long),
+            "labels": torch.tensor([labels], dtype=torch.long),
+            "position_ids": torch.tensor([positions], dtype=torch.long),
+        }
+
+    def stats(self) -> dict:
+        return {
+            "tokens": self.tokens,
+            "target_tokens": self.target_tokens,
+            "padding_ratio": round(1 - self.tokens / self.padded_tokens, 4) if self.padded_tokens else 0.0,
+        }
+
+
+# ---------------------------------------
+# throughput
+# ---------------------------------------
+class ThroughputCallback(TrainerCallback):
+    """Adds tokens/sec (real tokens, not padding) to the Trainer logs."""
+
+    def __init__(self, collator: CausalLMCollator):
+        self.collator = collator
+        self.start = None
+        self.summary = {}
+
+    def _rates(self) -> dict:
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        stats = self.collator.stats()
+        return {
+            "tokens_per_sec": round(stats["tokens"] / elapsed, 1),
+            "target_tokens_per_sec": round(stats["target_tokens"] / elapsed, 1),
+            "padding_ratio": stats["padding_ratio"],
+        }
+
+    def on_train_begin(self, args, state, control, **kwargs):
+        self.start = time.perf_counter()
+
+    def on_log(self, args, state, control, logs=None, **kwargs):
+        if logs is not None and self.start is not None:
+            logs.update(self._rates())
+
+    def on_train_end(self, args, state, control, **kwargs):
+        self.summary = {**self.collator.stats(), **self._rates(), "train_time_sec": round(time.perf_counter() - self.start, 2)}
@@ -1,29 +1,70 @@
-import time, os, json
+import time, os, json, math
 import torch
-from peft import LoraConfig, get_peft_model, set_peft_model_state_dict
-from transformers import AutoTokenizer, AutoModelForCausalLM, Trainer, TrainingArguments, DataCollatorForSeq2Seq
-from datasets import Dataset
+from peft import LoraConfig, PeftModel, get_peft_model, set_peft_model_state_dict
+from transformers import AutoTokenizer, AutoModelForCausalLM, Trainer, TrainingArguments
+from datasets import Dataset, concatenate_datasets
 from db.mongo_client import insert_finetune_record
-from db.dataset_manager import DATASET_PATH
-
-def _load_qas_from_file(path):
-    data = []
-    with open(path,"r",encoding="utf-8") as f:
-        for line in f:
-            try:
-                data.append(json.loads(line))
-            except:
-                continue
-    return data
-
-def finetune_local_lora(base_model="tiiuae/falcon-7b-instruct", output_dir="models/lora-output", epochs=1):
+from db.dataset_manager import get_store
+from fine_tune.tokenized_cache import TokenizedDatasetCache
+from fine_tune.data_pipeline import build_train_dataset, training_kwargs, packing_enabled, CausalLMCollator
+from fine_tune.telemetry import RunTelemetry
+from fine_tune import adapters
+
+# dataset-store consumer name; its watermark marks the examples already trained on
+DATASET_CONSUMER = "finetune_local_lora"
+
+# "continual": resume from the active adapter, train on new pairs + replay
+# "full": fresh adapter over the whole dataset
+FINETUNE_MODE = os.getenv("FINETUNE_MODE", "continual")
+# replayed old examples per new example, capped at FINETUNE_REPLAY_MAX
+FINETUNE_REPLAY_RATIO = float(os.getenv("FINETUNE_REPLAY_RATIO", "1.0"))
+FINETUNE_REPLAY_MAX = int(os.getenv("FINETUNE_REPLAY_MAX", "256"))
+# keep the base model in memory between runs instead of reloading it each time
+FINETUNE_KEEP_BASE = os.getenv("FINETUNE_KEEP_BASE", "0") == "1"
+
+_base_models = {}
+
+
+def _load_base(base_model: str, device: str):
+    if base_model in _base_models:
+        return _base_models[base_model]
+    tokenizer = AutoTokenizer.from_pretrained(base_model, use_fast=True, local_files_only=False)
+    # low_cpu_mem_usage loads safetensors weights memory-mapped instead of copying them twice
+    model = AutoModelForCausalLM.from_pretrained(base_model, device_map="auto" if device=="cuda" else None, torch_dtype=torch.float16 if device=="cuda" else torch.float32, low_cpu_mem_usage=True)
+    if FINETUNE_KEEP_BASE:
+        _base_models[base_model] = (tokenizer, model)
+    return tokenizer, model
+
+
+def _replay_sample(cache, store, watermark, n_new: int, seed: int):
+    """Bounded random sample of already-trained examples (cached tokens, no re-tokenizing)."""
+    n = min(FINETUNE_REPLAY_MAX, math.ceil(n_new * FINETUNE_REPLAY_RATIO))
+    if n <= 0:
+        return None
+    old_ds = cache.for_segments(store.segments_before(watermark), store)
+    if old_ds is None:
+        return None
+    return old_ds.shuffle(seed=seed).select(range(min(n, len(old_ds))))
+
+def finetune_local_lora(base_model="tiiuae/falcon-7b-instruct", output_dir=adapters.ADAPTER_ROOT, epochs=1, mode=None):
     start = time.time()
-    device = "cuda" if torch.cuda.is_available() else "cpu"
+    mode = mode or FINETUNE_MODE
 
-    # Load tokenizer and base model (use small model if no GPU)
-    tokenizer = AutoTokenizer.from_pretrained(base_model, use_fast=True, local_files_only=False)
+    # Only the Q/A pairs added since the last run
+    store = get_store()
+    last_mark = store.watermark(DATASET_CONSUMER)
+    segments, watermark = store.segments(last_mark)
+    if not segments:
+        return {"status": "skipped", "reason": "no new Q/A pairs"}
 
-    model = AutoModelForCausalLM.from_pretrained(base_model, device_map="auto" if device=="cuda" else None, torch_dtype=torch.float16 if device=="cuda" else torch.float32)
+    parent = adapters.latest_adapter(base_model) if mode == "continual" else None
+    if not parent:
+        # full run (or nothing to resume from): fresh adapter over everything collected so far
+        mode = "full"
+        segments, watermark = store.segments(None)
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    telemetry = RunTelemetry()
 
     # PEFT config
     peft_config = LoraConfig(
@@ -35,62 +76,99 @@ def finetune_local_lora(base_model="tiiuae/falcon-7b-instruct", output_dir="mode
         task_type="CAUSAL_LM"
     )
 
-    model = get_peft_model(model, peft_config)
-
-    # Load dataset
-    qas = _load_qas_from_file(DATASET_PATH)
-    if not qas:
-        raise RuntimeError("No Q/A dataset found at " + DATASET_PATH)
-
-    # Build dataset list: combine prompt and answer
-    examples = []
-    for qa in qas:
-        prompt = f"Q: {qa['question']}\nA:"
-        target = " " + qa['answer'].strip()
-        examples.append({"input_text": prompt, "target_text": target})
-
-    ds = Dataset.from_list(examples)
-
-    def tokenize_fn(x):
-        input_enc = tokenizer(x["input_text"], truncation=True, max_length=512)
-        target_enc = tokenizer(x["target_text"], truncation=True, max_length=256)
-        input_ids = input_enc["input_ids"]
-        labels = target_enc["input_ids"]
-        return {"input_ids": input_ids, "labels": labels}
-
-    tok_ds = ds.map(tokenize_fn, batched=False)
-
-    training_args = TrainingArguments(
-        output_dir=output_dir,
-        per_device_train_batch_size=1,
-        num_train_epochs=epochs,
-        learning_rate=2e-4,
-        logging_steps=10,
-        save_total_limit=2,
-        bf16=torch.cuda.is_available(),
-        fp16=torch.cuda.is_available(),
-        push_to_hub=False,
-        report_to=[]
-    )
-
-    trainer = Trainer(
-        model=model,
-        args=training_args,
-        train_dataset=tok_ds
-    )
-
-    trainer.train()
+    with telemetry.phase("load"):
+        # Load tokenizer and base model (use small model if no GPU)
+        tokenizer, model = _load_base(base_model, device)
+        if parent:
+            # continue training the active adapter instead of starting over
+            model = PeftModel.from_pretrained(model, parent["adapter_dir"], is_trainable=True)
+        else:
+            model = get_peft_model(model, peft_config)
+
+    try:
+        with telemetry.phase("tokenize"):
+            # Tokenized Arrow cache: only byte ranges not seen before get tokenized
+            cache = TokenizedDatasetCache(tokenizer, max_input_length=512, max_target_length=256)
+            tok_ds = cache.for_segments(segments, store)
+            if tok_ds is None:
+                store.commit(DATASET_CONSUMER, watermark)
+                return {"status": "skipped", "reason": "no new Q/A pairs"}
+            new_examples = len(tok_ds)
+
+            version = adapters.next_version(output_dir)
+            version_dir = adapters.version_dir(version, output_dir)
+
+            # a few old examples keep the resumed adapter from drifting toward the newest batch
+            replay = _replay_sample(cache, store, last_mark, new_examples, seed=version) if parent else None
+            replay_examples = len(replay) if replay is not None else 0
+            if replay_examples:
+                tok_ds = concatenate_datasets([tok_ds, replay]).shuffle(seed=version)
+
+            # pack short Q/A examples into full-length sequences when the attention
+            # backend keeps them apart, length-grouped padding otherwise
+            if tokenizer.pad_token is None:
+                tokenizer.pad_token = tokenizer.eos_token
+            packing = packing_enabled(model)
+            train_ds = build_train_dataset(tok_ds, packing)
+            collator = CausalLMCollator(tokenizer)
+
+        training_args = TrainingArguments(
+            output_dir=version_dir,
+            **training_kwargs(packing),
+            num_train_epochs=epochs,
+            learning_rate=2e-4,
+            logging_steps=10,
+            save_strategy="no",
+            bf16=torch.cuda.is_available(),
+            fp16=torch.cuda.is_available(),
+            push_to_hub=False,
+            report_to=[]
+        )
+
+        trainer = Trainer(
+            model=model,
+            args=training_args,
+            train_dataset=train_ds,
+            data_collator=collator,
+            callbacks=[telemetry.callback(collator)],
+        )
+
+        with telemetry.phase("train"):
+            trainer.train()
+
+        with telemetry.phase("save"):
+            model.save_pretrained(version_dir)
+            adapters.publish(version, output_dir)
+            store.commit(DATASET_CONSUMER, watermark)
+    finally:
+        if FINETUNE_KEEP_BASE:
+            # strip the LoRA layers (unmerged) so the cached base stays clean for the
+            # next run, also when tokenizing or training failed
+            model.unload()
 
-    model.save_pretrained(output_dir)
     end = time.time()
 
     # Log fine-tune run
-    log_id = insert_finetune_record({
+    record = {
         "base_model": base_model,
         "output_dir": output_dir,
-        "dataset_size": len(qas),
+        "mode": mode,
+        "adapter_version": version,
+        "adapter_dir": version_dir,
+        "parent_version": parent["adapter_version"] if parent else None,
+        "status": "active",
+        "dataset_size": len(tok_ds),
+        "new_examples": new_examples,
+        "replay_examples": replay_examples,
+        "train_sequences": len(train_ds),
+        "packing": packing,
+        "metrics": telemetry.summary(),
+        "tokenized_cache": cache.key,
         "train_time_sec": end - start,
         "epochs": epochs
-    })
+    }
+    log_id = insert_finetune_record(record)
+    telemetry.write(record)
 
-    return {"status":"ok", "model_dir": output_dir, "log_id": str(log_id)}
+    return {"status":"ok", "model_dir": version_dir, "adapter_version": version,
+            "tokens_per_sec": record["metrics"].get("tokens_per_sec"), "log_id": str(log_id)}
@@ -3,6 +3,8 @@ import os
 from transformers import AutoTokenizer, AutoModelForCausalLM, TrainingArguments, Trainer
 from datasets import Dataset
 from peft import LoraConfig, get_peft_model
+from fine_tune.tokenized_cache import TokenizedDatasetCache
+from fine_tune.data_pipeline import build_train_dataset, training_kwargs, packing_enabled, CausalLMCollator, ThroughputCallback
 
 def prepare_dataset_from_qas(qas):
     # expects list of {"question","answer"}
@@ -13,12 +15,6 @@ def prepare_dataset_from_qas(qas):
         prompts.append({"input_text": prompt, "target_text": target})
     return Dataset.from_list(prompts)
 
-def collate_fn(batch, tokenizer, max_length=512):
-    inputs = tokenizer([b["input_text"] for b in batch], truncation=True, padding="longest", max_length=max_length, return_tensors="pt")
-    labels = tokenizer([b["target_text"] for b in batch], truncation=True, padding="longest", max_length=128, return_tensors="pt")
-    inputs["labels"] = labels["input_ids"]
-    return inputs
-
 def fine_tune_lora(qas, base_model="gpt2", output_dir="./models/lora-output", epochs=1):
     tokenizer = AutoTokenizer.from_pretrained(base_model, local_files_only=True)
     model = AutoModelForCausalLM.from_pretrained(base_model, local_files_only=True)
@@ -31,18 +27,23 @@ def fine_tune_lora(qas, base_model="gpt2", output_dir="./models/lora-output", ep
         bias="none"
     )
     model = get_peft_model(model, peft_config)
-    ds = prepare_dataset_from_qas(qas)
-    tokenized = ds.map(lambda x: tokenizer(x["input_text"], truncation=True, max_length=512), batched=True)
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    tokenized = TokenizedDatasetCache(tokenizer, max_input_length=512, max_target_length=128).for_records(qas)
+    packing = packing_enabled(model)
+    collator = CausalLMCollator(tokenizer)
+    throughput = ThroughputCallback(collator)
     training_args = TrainingArguments(
         output_dir=output_dir,
-        per_device_train_batch_size=2,
+        **training_kwargs(packing),
         num_train_epochs=epochs,
         logging_steps=10,
         save_total_limit=2,
         learning_rate=1e-4,
         fp16=False
     )
-    trainer = Trainer(model=model, args=training_args, train_dataset=tokenized)
+    trainer = Trainer(model=model, args=training_args, train_dataset=build_train_dataset(tokenized, packing),
+                      data_collator=collator, callbacks=[throughput])
     trainer.train()
     model.save_pretrained(output_dir)
-    return {"status": "ok", "output_dir": output_dir}
+    return {"status": "ok", "output_dir": output_dir, "throughput": throughput.summary}
@@ -53,3 +53,51 @@ Context:
     if not qas:
         qas = [{"question": "Provide a brief summary of the context", "answer": "Summary not available."}]
     return qas
+
+
+def _amount(value) -> float:
+    try:
+        return float(str(value).replace(",", "").strip() or 0)
+    except ValueError:
+        return 0.0
+
+
+def generate_qas_from_labeled(labeled, source_doc_id=None, n_questions=20):
+    """
+    Deterministic Q/A pairs from labeled transaction rows (no LLM call):
+    totals, counts, date range, largest debit and spend per category.
+    labeled: list of {"date","description","debit","credit","category",...}
+    """
+    rows = [r for r in labeled or [] if r]
+    if not rows:
+        return []
+
+    debits = [(_amount(r.get("debit")), r) for r in rows]
+    total_debit = sum(a for a, _ in debits)
+    total_credit = sum(_amount(r.get("credit")) for r in rows)
+    dates = sorted(str(r["date"]) for r in rows if r.get("date"))
+
+    qas = [
+        {"question": "How many transactions are in the statement?", "answer": str(len(rows))},
+        {"question": "What is the total debit amount?", "answer": f"{total_debit:.2f}"},
+        {"question": "What is the total credit amount?", "answer": f"{total_credit:.2f}"},
+    ]
+    if dates:
+        qas.append({"question": "What period does the statement cover?", "answer": f"{dates[0]} to {dates[-1]}"})
+
+    amount, row = max(debits, key=lambda d: d[0])
+    if amount > 0:
+        qas.append({"question": "What was the largest debit?",
+                    "answer": f"{amount:.2f} on {row.get('date') or 'unknown date'} ({row.get('description') or 'no description'})"})
+
+    by_category = {}
+    for amount, row in debits:
+        if row.get("category") and amount > 0:
+            by_category[row["category"]] = by_category.get(row["category"], 0.0) + amount
+    for category, spent in sorted(by_category.items(), key=lambda kv: -kv[1]):
+        qas.append({"question": f"How much was spent on {category}?", "answer": f"{spent:.2f}"})
+
+    if source_doc_id:
+        for qa in qas:
+            qa["document_id"] = str(source_doc_id)
+    return qas[:n_questions]
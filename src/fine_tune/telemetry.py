@@ -0,0 +1,101 @@
+# src/fine_tune/telemetry.py
+"""
+Fine-tune run telemetry.
+
+    telemetry = RunTelemetry()
+    with telemetry.phase("load"):
+        ...
+    trainer = Trainer(..., callbacks=[telemetry.callback(collator)])
+    record["metrics"] = telemetry.summary()
+    telemetry.write(record)
+
+Collects phase wall times (load / tokenize / train / save), the per-step
+loss curve, tokens/sec and samples/sec from the collator counters and the
+peak RSS of the process. summary() goes into the fine_tunes record;
+write() appends one JSON line per run to FINETUNE_METRICS_PATH so
+efficiency regressions can be compared across runs. Phases are also
+traced as "finetune.<phase>" spans.
+"""
+import os
+import sys
+import json
+import time
+import resource
+from contextlib import contextmanager
+from datetime import datetime
+
+from fine_tune.data_pipeline import ThroughputCallback
+from utils.tracing import span
+
+FINETUNE_METRICS_PATH = os.getenv("FINETUNE_METRICS_PATH", os.path.join("logs", "finetune_metrics.jsonl"))
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes on Linux
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+class TelemetryCallback(ThroughputCallback):
+    """Loss curve + throughput; also adds tokens/sec to the Trainer logs."""
+
+    def __init__(self, collator, telemetry):
+        super().__init__(collator)
+        self.telemetry = telemetry
+
+    def on_log(self, args, state, control, logs=None, **kwargs):
+        super().on_log(args, state, control, logs=logs, **kwargs)
+        if logs and "loss" in logs:
+            self.telemetry.loss_history.append({
+                "step": state.global_step,
+                "epoch": round(state.epoch or 0, 4),
+                "loss": logs["loss"],
+                "learning_rate": logs.get("learning_rate"),
+                "tokens_per_sec": logs.get("tokens_per_sec"),
+            })
+
+    def on_train_end(self, args, state, control, **kwargs):
+        super().on_train_end(args, state, control, **kwargs)
+        elapsed = self.summary["train_time_sec"] or 1e-9
+        self.summary["samples_per_sec"] = round(self.collator.samples / elapsed, 2)
+        self.summary["steps"] = state.global_step
+        self.telemetry.throughput = self.summary
+
+
+class RunTelemetry:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.loss_history = []
+        self.throughput = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            with span(f"finetune.{name}"):
+                yield
+        finally:
+            self.phases[name] = round(self.phases.get(name, 0.0) + time.perf_counter() - start, 3)
+
+    def callback(self, collator) -> TelemetryCallback:
+        return TelemetryCallback(collator, self)
+
+    def summary(self) -> dict:
+        return {
+            "loss_history": self.loss_history,
+            "final_loss": self.loss_history[-1]["loss"] if self.loss_history else None,
+            **self.throughput,
+            "phases_sec": dict(self.phases),
+            "total_sec": round(time.perf_counter() - self.started, 3),
+            "peak_rss_mb": peak_rss_mb(),
+        }
+
+    def write(self, record: dict, path: str = FINETUNE_METRICS_PATH):
+        """Append the run record (metrics included) to the local metrics file."""
+        line = {k: v for k, v in record.items() if k != "_id"}
+        line["logged_at"] = datetime.utcnow().isoformat()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(line, default=str) + "\n")
@@ -0,0 +1,186 @@
+# src/fine_tune/tokenized_cache.py
+"""
+Tokenized Q/A dataset cache (Arrow on disk).
+
+Tokenized examples are stored per dataset-store byte range:
+
+datasets/finetune/tokenized/<config key>/
+    manifest.json                     {shard: [[start, end, bytes hash, dir], ...]}
+    <shard>/<start>-<end>-<hash>/     Dataset.save_to_disk output
+
+The config key covers everything that changes the token ids: tokenizer
+id + vocab size, max lengths, prompt template and cache format. A cached
+range is reused only while the shard bytes it was built from still hash
+the same, so past (immutable) shards are tokenized once and an appended
+shard only tokenizes the bytes after its last cached range.
+
+Each example is one causal-LM sequence, prompt + target + eos, with the
+prompt positions masked out of the loss (labels = -100). Packing and
+padding happen later, in fine_tune.data_pipeline.
+
+Tokenization is batched and, for larger deltas, multi-process.
+"""
+import os
+import re
+import json
+import hashlib
+import threading
+
+from datasets import Dataset, load_from_disk, concatenate_datasets
+
+from db.dataset_manager import DATASET_DIR, get_store
+
+TOKENIZED_CACHE_DIR = os.getenv("TOKENIZED_CACHE_DIR", os.path.join(DATASET_DIR, "tokenized"))
+TOKENIZE_BATCH_SIZE = int(os.getenv("TOKENIZE_BATCH_SIZE", "1000"))
+TOKENIZE_NUM_PROC = int(os.getenv("TOKENIZE_NUM_PROC", str(min(4, os.cpu_count() or 1))))
+# below this many examples, worker processes cost more than they save
+TOKENIZE_MULTIPROC_MIN = int(os.getenv("TOKENIZE_MULTIPROC_MIN", "5000"))
+
+PROMPT_TEMPLATE = "Q: {question}\nA:"
+TARGET_TEMPLATE = " {answer}"
+CACHE_FORMAT = 2
+IGNORE_INDEX = -100
+
+
+def format_example(qa: dict) -> dict:
+    return {
+        "input_text": PROMPT_TEMPLATE.format(question=qa["question"]),
+        "target_text": TARGET_TEMPLATE.format(answer=str(qa["answer"]).strip()),
+    }
+
+
+def tokenizer_id(tokenizer) -> str:
+    return f"{type(tokenizer).__name__}:{getattr(tokenizer, 'name_or_path', '')}:{len(tokenizer)}"
+
+
+def _bytes_hash(path: str, start: int, end: int) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            block = f.read(min(1 << 20, remaining))
+            if not block:
+                break
+            h.update(block)
+            remaining -= len(block)
+    return h.hexdigest()
+
+
+class TokenizedDatasetCache:
+    def __init__(self, tokenizer, max_input_length: int = 512, max_target_length: int = 256,
+                 root: str = TOKENIZED_CACHE_DIR, num_proc: int = TOKENIZE_NUM_PROC):
+        self.tokenizer = tokenizer
+        self.max_input_length = max_input_length
+        self.max_target_length = max_target_length
+        self.num_proc = num_proc
+        config = {
+            "tokenizer": tokenizer_id(tokenizer),
+            "max_input_length": max_input_length,
+            "max_target_length": max_target_length,
+            "prompt_template": PROMPT_TEMPLATE,
+            "target_template": TARGET_TEMPLATE,
+            "format": CACHE_FORMAT,
+        }
+        self.key = hashlib.sha1(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+        self.dir = os.path.join(root, self.key)
+        self.manifest_path = os.path.join(self.dir, "manifest.json")
+        self._lock = threading.Lock()
+
+    # ---------------------------------------
+    # tokenization
+    # ---------------------------------------
+    def _tokenize_batch(self, batch):
+        prompts = self.tokenizer(batch["input_text"], truncation=True, max_length=self.max_input_length)["input_ids"]
+        targets = self.tokenizer(batch["target_text"], truncation=True, max_length=self.max_target_length,
+                                 add_special_tokens=False)["input_ids"]
+        eos = [self.tokenizer.eos_token_id] if self.tokenizer.eos_token_id is not None else []
+        input_ids, labels = [], []
+        for p, t in zip(prompts, targets):
+            input_ids.append(p + t + eos)
+            labels.append([IGNORE_INDEX] * len(p) + t + eos)
+        return {"input_ids": input_ids, "labels": labels, "length": [len(ids) for ids in input_ids]}
+
+    def tokenize(self, qas: list) -> Dataset:
+        ds = Dataset.from_list([format_example(qa) for qa in qas])
+        num_proc = self.num_proc if len(ds) >= TOKENIZE_MULTIPROC_MIN and self.num_proc > 1 else None
+        return ds.map(
+            self._tokenize_batch,
+            batched=True,
+            batch_size=TOKENIZE_BATCH_SIZE,
+            num_proc=num_proc,
+            remove_columns=["input_text", "target_text"],
+        )
+
+    # ---------------------------------------
+    # manifest
+    # ---------------------------------------
+    def _manifest(self) -> dict:
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_manifest(self, manifest: dict):
+        os.makedirs(self.dir, exist_ok=True)
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp, self.manifest_path)
+
+    # ---------------------------------------
+    # dataset-store segments
+    # ---------------------------------------
+    def for_segments(self, segments: list, store=None) -> Dataset:
+        """Tokenized dataset for dataset-store segments (see QADatasetStore.segments)."""
+        store = store or get_store()
+        parts = []
+        with self._lock:
+            manifest = self._manifest()
+            for seg in segments:
+                parts += self._segment_parts(store, seg, manifest)
+            self._save_manifest(manifest)
+        parts = [p for p in parts if len(p)]
+        if not parts:
+            return None
+        return parts[0] if len(parts) == 1 else concatenate_datasets(parts)
+
+    def _segment_parts(self, store, seg: dict, manifest: dict) -> list:
+        path, shard = seg["path"], seg["shard"]
+        cached = sorted(manifest.get(shard, []))
+        parts, pos = [], seg["start"]
+
+        for start, end, digest, rel_dir in cached:
+            if start != pos or end > seg["end"]:
+                continue
+            if _bytes_hash(path, start, end) != digest or not os.path.isdir(os.path.join(self.dir, rel_dir)):
+                break
+            parts.append(load_from_disk(os.path.join(self.dir, rel_dir)))
+            pos = end
+
+        if pos < seg["end"]:
+            # only the bytes not covered by cached ranges are tokenized
+            ds = self.tokenize(store.read_range(path, pos, seg["end"]))
+            digest = _bytes_hash(path, pos, seg["end"])
+            rel_dir = os.path.join(re.sub(r"[^\w.-]", "_", shard), f"{pos}-{seg['end']}-{digest[:8]}")
+            ds.save_to_disk(os.path.join(self.dir, rel_dir))
+            entries = [e for e in manifest.get(shard, []) if e[0] != pos]
+            manifest[shard] = sorted(entries + [[pos, seg["end"], digest, rel_dir]])
+            parts.append(ds)
+        return parts
+
+    # ---------------------------------------
+    # in-memory Q/A lists
+    # ---------------------------------------
+    def for_records(self, qas: list) -> Dataset:
+        """Tokenized dataset for an in-memory list, cached by its content hash."""
+        digest = hashlib.blake2b(
+            json.dumps([[qa["question"], qa["answer"]] for qa in qas], ensure_ascii=False).encode("utf-8"),
+            digest_size=16,
+        ).hexdigest()
+        path = os.path.join(self.dir, "records", digest)
+        if os.path.isdir(path):
+            return load_from_disk(path)
+        ds = self.tokenize(qas)
+        ds.save_to_disk(path)
+        return ds
@@ -7,12 +7,16 @@ Behavior (hybrid):
  - If no chunks -> fallback to general LLM response.
  - Protects against huge prompts by truncating and limiting chunks.
  - Prefers a fast CPU-friendly model (phi3) if available; falls back to OLLAMA_MODEL.
+ - LLM_BACKEND=worker sends prompts to the resident model worker
+   (llm/model_worker.py, serving the fine-tuned adapter) and falls back to
+   Ollama if it is unreachable.
 """
 
 import os
 import requests
 from typing import List, Dict
 from utils.logger import logger
+from utils.tracing import traced
 
 OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "phi3")   # default from .env
@@ -26,6 +30,11 @@ MAX_CHUNKS = int(os.getenv("RAG_MAX_CHUNKS", "3"))        # max number of chunks
 MAX_CHARS_PER_CHUNK = int(os.getenv("RAG_MAX_CHARS", "800"))  # truncate each chunk
 MAX_PROMPT_CHARS = int(os.getenv("RAG_MAX_PROMPT_CHARS", "3000"))  # total allowed context chars
 
+# "ollama" or "worker"
+LLM_BACKEND = os.getenv("LLM_BACKEND", "ollama")
+MODEL_WORKER_URL = os.getenv("MODEL_WORKER_URL", "http://localhost:8601")
+
+@traced("ollama.generate")
 def _call_ollama(prompt: str, model: str, max_tokens: int = 512) -> str:
     """
     Calls Ollama /api/generate with stream=False (most robust).
@@ -58,6 +67,23 @@ def _call_ollama(prompt: str, model: str, max_tokens: int = 512) -> str:
         logger.exception("Ollama request failed")
         raise
 
+@traced("worker.generate")
+def _call_worker(prompt: str, max_tokens: int = 512) -> str:
+    resp = requests.post(f"{MODEL_WORKER_URL}/generate", json={"prompt": prompt, "max_tokens": max_tokens},
+                         timeout=REQUEST_TIMEOUT)
+    resp.raise_for_status()
+    return resp.json()["response"]
+
+def _generate(prompt: str, model: str = None) -> str:
+    """Route to the configured backend; the worker falls back to Ollama."""
+    if LLM_BACKEND == "worker":
+        try:
+            return _call_worker(prompt)
+        except Exception:
+            logger.exception("Model worker request failed, falling back to Ollama")
+    return _call_ollama(prompt, model=model or _pick_model())
+
+@traced("ollama.tags")
 def _pick_model() -> str:
     """
     Return the model name to use:
@@ -112,7 +138,7 @@ def generate_final_answer(query: str, chunks: List[Dict] = None, top_k: int = MA
     Generate human-readable answer. Protects prompt size and chooses a fast model when possible.
     """
     chunks = chunks or []
-    model_to_use = _pick_model()
+    model_to_use = _pick_model() if LLM_BACKEND == "ollama" else None
 
     # If there is retrieved context - strict RAG
     if chunks:
@@ -133,11 +159,11 @@ Only use the content to answer the question.
 
 """
         try:
-            return _call_ollama(prompt, model=model_to_use).strip()
+            return _generate(prompt, model=model_to_use).strip()
         except Exception as e:
             # try fallback to a different, smaller model if possible
             try:
-                fallback = FALLBACK_MODEL if model_to_use != FALLBACK_MODEL else OLLAMA_MODEL
+                fallback = FALLBACK_MODEL if (model_to_use or _pick_model()) != FALLBACK_MODEL else OLLAMA_MODEL
                 return _call_ollama(prompt, model=fallback).strip()
             except Exception as e2:
                 logger.exception("Both primary and fallback LLM calls failed")
@@ -154,7 +180,7 @@ Question:
 Provide a concise, helpful answer. If you are unsure, say you are unsure and advise the user to upload the relevant documents for a precise answer.
 """
         try:
-            return _call_ollama(prompt, model=model_to_use).strip()
+            return _generate(prompt, model=model_to_use).strip()
         except Exception as e:
             logger.exception("Fallback LLM call failed")
             return f"[LLM error] Could not generate answer locally: {e}"
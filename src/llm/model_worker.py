@@ -0,0 +1,222 @@
+# src/llm/model_worker.py
+"""
+Long-lived local model worker.
+
+Keeps one base model resident (safetensors weights are memory-mapped by
+from_pretrained) and serves the fine-tuned LoRA adapters on top of it.
+Adapters are loaded next to each other with PEFT and switched with
+set_adapter, so a new fine-tune never reloads the base weights. The
+adapter LATEST points at (see fine_tune.adapters) is picked up on the
+next "latest" request; without LATEST (nothing trained yet, or the last
+version rolled back) "latest" is the base model. Pinning a request to a
+named adapter does not change what "latest" serves.
+
+    PYTHONPATH=src python src/llm/model_worker.py --port 8601
+
+API (JSON):
+    POST /generate        {prompt, max_tokens?, adapter?}  -> {response, adapter}
+                          adapter: "latest" (default), "base" or a loaded name
+    POST /adapters/load   {path, name?}                    -> {adapter}
+    GET  /adapters        -> {active, loaded}
+    GET  /health          -> {status, base_model, device}
+"""
+import os
+import json
+import threading
+import argparse
+from collections import OrderedDict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import torch
+from transformers import AutoTokenizer, AutoModelForCausalLM
+from peft import PeftModel
+
+from fine_tune.adapters import ADAPTER_ROOT, current_adapter_dir
+from utils.logger import logger
+
+WORKER_BASE_MODEL = os.getenv("MODEL_WORKER_BASE_MODEL", "tiiuae/falcon-7b-instruct")
+WORKER_HOST = os.getenv("MODEL_WORKER_HOST", "127.0.0.1")
+WORKER_PORT = int(os.getenv("MODEL_WORKER_PORT", "8601"))
+# adapters kept loaded at once; the least recently used one is dropped first
+WORKER_MAX_ADAPTERS = int(os.getenv("MODEL_WORKER_MAX_ADAPTERS", "3"))
+WORKER_MAX_NEW_TOKENS = int(os.getenv("MODEL_WORKER_MAX_NEW_TOKENS", "512"))
+
+
+class ModelWorker:
+    def __init__(self, base_model: str = WORKER_BASE_MODEL, adapter_root: str = ADAPTER_ROOT):
+        self.base_model = base_model
+        self.adapter_root = adapter_root
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.tokenizer = None
+        self.model = None
+        self.loaded = OrderedDict()   # adapter name -> directory
+        self.active = None          # adapter currently set on the PEFT model
+        self._latest = None         # adapter LATEST points at (None = base model)
+        self._latest_dir = None
+        # one generate / swap at a time: they share the same module weights
+        self._lock = threading.Lock()
+
+    # ---------------------------------------
+    # base model
+    # ---------------------------------------
+    def load(self):
+        logger.info(f"Loading base model {self.base_model} on {self.device}")
+        self.tokenizer = AutoTokenizer.from_pretrained(self.base_model, use_fast=True)
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        self.model = AutoModelForCausalLM.from_pretrained(
+            self.base_model,
+            device_map="auto" if self.device == "cuda" else None,
+            torch_dtype=torch.float16 if self.device == "cuda" else torch.float32,
+            low_cpu_mem_usage=True,
+        )
+        self.model.eval()
+        self.sync_latest()
+        return self
+
+    # ---------------------------------------
+    # adapters
+    # ---------------------------------------
+    def _load_adapter(self, path: str, name: str):
+        if name in self.loaded:
+            self.loaded.move_to_end(name)
+            return
+        if not isinstance(self.model, PeftModel):
+            self.model = PeftModel.from_pretrained(self.model, path, adapter_name=name)
+            self.model.eval()
+            self.active = name      # the first adapter loaded is the one set
+        else:
+            self.model.load_adapter(path, adapter_name=name)
+        self.loaded[name] = path
+        logger.info(f"Loaded adapter {name} from {path}")
+
+        # never evict the adapter being served: PEFT would silently fall back to another one
+        keep = {name, self.active, self._latest, getattr(self.model, "active_adapter", None)}
+        while len(self.loaded) > WORKER_MAX_ADAPTERS:
+            old = next((n for n in self.loaded if n not in keep), None)
+            if old is None:
+                break
+            self.model.delete_adapter(old)
+            del self.loaded[old]
+
+    def load_adapter(self, path: str, name: str = None) -> str:
+        name = name or os.path.basename(os.path.normpath(path))
+        with self._lock:
+            self._load_adapter(path, name)
+        return name
+
+    def sync_latest(self):
+        """
+        Name of the adapter LATEST points at, loaded if it is new, or None
+        when there is no LATEST (serve the base model). Only reads LATEST:
+        the adapter a pinned request switched to plays no part.
+        """
+        path = current_adapter_dir(self.adapter_root)
+        if not path or not os.path.isdir(path):
+            self._latest, self._latest_dir = None, None
+            return None
+        name = os.path.basename(os.path.normpath(path))
+        if path != self._latest_dir or name not in self.loaded:
+            with self._lock:
+                self._load_adapter(path, name)
+            self._latest, self._latest_dir = name, path
+        return self._latest
+
+    # ---------------------------------------
+    # generation
+    # ---------------------------------------
+    def generate(self, prompt: str, max_tokens: int = WORKER_MAX_NEW_TOKENS, adapter: str = "latest") -> dict:
+        if adapter in (None, "latest"):
+            adapter = self.sync_latest() or "base"
+
+        inputs = self.tokenizer(prompt, return_tensors="pt").to(self.model.device)
+        kwargs = {
+            "max_new_tokens": min(int(max_tokens), WORKER_MAX_NEW_TOKENS),
+            "do_sample": False,
+            "pad_token_id": self.tokenizer.pad_token_id,
+        }
+        with self._lock, torch.inference_mode():
+            if adapter == "base" or not isinstance(self.model, PeftModel):
+                if isinstance(self.model, PeftModel):
+                    with self.model.disable_adapter():
+                        out = self.model.generate(**inputs, **kwargs)
+                else:
+                    out = self.model.generate(**inputs, **kwargs)
+                adapter = "base"
+            else:
+                if adapter not in self.loaded:
+                    raise KeyError(f"adapter not loaded: {adapter}")
+                if adapter != self.active:
+                    self.model.set_adapter(adapter)
+                    self.active = adapter
+                self.loaded.move_to_end(adapter)
+                out = self.model.generate(**inputs, **kwargs)
+
+        text = self.tokenizer.decode(out[0][inputs["input_ids"].shape[1]:], skip_special_tokens=True)
+        return {"response": text, "adapter": adapter}
+
+
+# ---------------------------------------
+# HTTP
+# ---------------------------------------
+def make_handler(worker: ModelWorker):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status: int, body: dict):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _body(self) -> dict:
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, {"status": "ok", "base_model": worker.base_model, "device": worker.device})
+            elif self.path == "/adapters":
+                self._send(200, {"active": worker.active, "loaded": list(worker.loaded)})
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            try:
+                body = self._body()
+                if self.path == "/generate":
+                    self._send(200, worker.generate(body["prompt"], body.get("max_tokens", WORKER_MAX_NEW_TOKENS),
+                                                    body.get("adapter", "latest")))
+                elif self.path == "/adapters/load":
+                    self._send(200, {"adapter": worker.load_adapter(body["path"], body.get("name"))})
+                else:
+                    self._send(404, {"error": "not found"})
+            except (KeyError, ValueError) as e:
+                self._send(400, {"error": str(e)})
+            except Exception as e:
+                logger.exception("Model worker request failed")
+                self._send(500, {"error": str(e)})
+
+        def log_message(self, fmt, *args):
+            logger.debug("model_worker: " + fmt % args)
+
+    return Handler
+
+
+def serve(host: str = WORKER_HOST, port: int = WORKER_PORT, base_model: str = WORKER_BASE_MODEL):
+    worker = ModelWorker(base_model).load()
+    server = ThreadingHTTPServer((host, port), make_handler(worker))
+    logger.info(f"Model worker listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Resident base model + LoRA adapter server")
+    ap.add_argument("--host", default=WORKER_HOST)
+    ap.add_argument("--port", type=int, default=WORKER_PORT)
+    ap.add_argument("--base-model", default=WORKER_BASE_MODEL)
+    args = ap.parse_args()
+    serve(args.host, args.port, args.base_model)
@@ -0,0 +1,333 @@
+# src/orchestration/bulk_ingest.py
+"""
+Bulk ingestion of statement archives.
+
+    PYTHONPATH=src python -m orchestration.bulk_ingest datasets/raw --workers 8
+
+Walks a directory tree and runs parse -> label -> chunk -> embed -> index
+-> store for every statement file:
+
+- hashing and parsing (the CPU-heavy part) run in a process pool;
+- files whose content is already fully ingested (document registry) are
+  skipped before they are parsed;
+- parsed files are committed in batches: one categorization pass, one
+  batched document insert, one embedding call + one FAISS save for all
+  chunks of the batch, labeled records through the queued bulk writer;
+- labeled exports are named after the file and its content hash, so
+  same-named statements in different folders do not overwrite each other;
+- a file that fails to commit is recorded as failed without holding up
+  the rest of its batch; the id of a document already stored for it is
+  kept in the registry, so the retry does not store it twice;
+- progress is appended to a checkpoint file after every committed batch,
+  so a rerun after a crash continues where it stopped.
+
+Prints files/sec and rows/sec while running and a JSON summary at the end.
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from db.mongo_client import insert_documents, insert_labeled_document, flush_writes
+from db.document_registry import (register_document, mark_stage, is_done, remember_hash, superseded_document_id,
+                                  assign_document_id)
+from db.transaction_store import write_transactions
+from db.transaction_index import index_transactions
+from parsers.bank_statement_parser import parse_bank_statement_file
+from parsers.categorizer import categorize_rows
+from parsers.chunker import chunk_meta
+from agents.labeler import export_labeled_csv, export_paths
+from rag.faiss_indexer import FaissIndexer
+from utils.logger import logger
+
+EXTENSIONS = (".pdf", ".csv", ".xls", ".xlsx", ".txt")
+BULK_WORKERS = int(os.getenv("BULK_INGEST_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+BULK_BATCH_FILES = int(os.getenv("BULK_INGEST_BATCH_FILES", "32"))
+CHECKPOINT_NAME = ".bulk_ingest.checkpoint.jsonl"
+
+
+# ---------------------------------------
+# worker-side jobs (run in the process pool)
+# ---------------------------------------
+def _hash_job(path: str):
+    st = os.stat(path)
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return path, st.st_mtime_ns, st.st_size, h.hexdigest()
+
+
+def _parse_job(path: str):
+    return path, parse_bank_statement_file(path)
+
+
+# ---------------------------------------
+# checkpoint
+# ---------------------------------------
+class Checkpoint:
+    """Append-only JSONL of finished files, keyed by path + size + mtime."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue    # torn last line after a crash
+                    if rec.get("status") in ("done", "skipped"):
+                        self.done[rec["path"]] = (rec["size"], rec["mtime_ns"])
+
+    def is_done(self, path: str) -> bool:
+        st = os.stat(path)
+        return self.done.get(os.path.abspath(path)) == (st.st_size, st.st_mtime_ns)
+
+    def record(self, entries: list):
+        with open(self.path, "a", encoding="utf-8") as f:
+            for e in entries:
+                f.write(json.dumps(e) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        for e in entries:
+            if e["status"] in ("done", "skipped"):
+                self.done[e["path"]] = (e["size"], e["mtime_ns"])
+
+
+def walk(root: str, extensions=EXTENSIONS):
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+        for name in sorted(filenames):
+            if name.lower().endswith(extensions) and not name.startswith("."):
+                yield os.path.abspath(os.path.join(dirpath, name))
+
+
+# ---------------------------------------
+# ingest
+# ---------------------------------------
+class BulkIngest:
+    def __init__(self, root: str, workers: int = BULK_WORKERS, batch_files: int = BULK_BATCH_FILES,
+                 checkpoint_path: str = None, export_csv: bool = True):
+        self.root = root
+        self.workers = workers
+        self.batch_files = batch_files
+        self.export_csv = export_csv
+        self.checkpoint = Checkpoint(checkpoint_path or os.path.join(root, CHECKPOINT_NAME))
+        self.index = FaissIndexer()
+        self.stats = {"files": 0, "ingested": 0, "skipped": 0, "failed": 0, "rows": 0, "chunks": 0}
+        self.started = None
+
+    def _rates(self) -> dict:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        done = self.stats["ingested"] + self.stats["skipped"]
+        return {
+            "elapsed_sec": round(elapsed, 2),
+            "files_per_sec": round(done / elapsed, 2),
+            "rows_per_sec": round(self.stats["rows"] / elapsed, 1),
+        }
+
+    def _entry(self, path: str, status: str, **extra) -> dict:
+        st = os.stat(path)
+        return {"path": path, "size": st.st_size, "mtime_ns": st.st_mtime_ns, "status": status, **extra}
+
+    def _document_record(self, path: str, entry: dict, parsed: dict) -> dict:
+        return {
+            "filename": os.path.basename(path),
+            "text": parsed.get("text", ""),
+            "chunks": parsed.get("chunks", []),
+            "metadata": parsed.get("metadata", {}),
+            "source": "bulk_ingest",
+            "version": entry.get("version", 1),
+            "content_hash": entry["_id"],
+        }
+
+    def _insert_new(self, batch: list) -> dict:
+        """
+        Store the documents of the batch that have none yet, in one batched
+        write (one by one if that fails). Each id is recorded in the registry
+        right away, so a file that fails later reuses it on the next run.
+        Returns {batch index: document_id or the exception}.
+        """
+        new = [i for i, (_, entry, _) in enumerate(batch) if not entry.get("document_id")]
+        if not new:
+            return {}
+        try:
+            saved = insert_documents([self._document_record(*batch[i]) for i in new])
+            ids = {i: str(record["_id"]) for i, record in zip(new, saved)}
+        except Exception:
+            logger.exception(f"Bulk ingest: batched insert of {len(new)} document(s) failed, retrying one by one")
+            ids = {}
+            for i in new:
+                try:
+                    ids[i] = str(insert_documents([self._document_record(*batch[i])])[0]["_id"])
+                except Exception as e:
+                    ids[i] = e
+        for i, document_id in ids.items():
+            if not isinstance(document_id, Exception):
+                assign_document_id(batch[i][1]["_id"], document_id)
+        return ids
+
+    def _commit_file(self, path: str, entry: dict, parsed: dict, document_id: str) -> list:
+        """Store, index and label one file; returns its chunks as [(text, meta)] for the FAISS pass."""
+        content_hash = entry["_id"]
+        rows = parsed.get("rows", [])
+        if not is_done(entry, "parsed"):
+            write_transactions(document_id, rows)
+            index_transactions(document_id, rows, supersedes=superseded_document_id(entry))
+            mark_stage(content_hash, "parsed", document_id=document_id)
+
+        if not is_done(entry, "labeled"):
+            insert_labeled_document({"document_id": document_id, "document_path": path,
+                                     "labels": rows, "labeler_version": "v0.2"})
+            fields = {}
+            if self.export_csv:
+                out_csv, _ = export_paths(path, content_hash)
+                export_labeled_csv(rows, out_csv)
+                fields["labeled_csv"] = out_csv
+            mark_stage(content_hash, "labeled", **fields)
+
+        if is_done(entry, "indexed"):
+            return []
+        return [(chunk["text"], {"document_id": document_id, "chunk_id": chunk_id, "text": chunk["text"],
+                                 **chunk_meta(chunk)})
+                for chunk_id, chunk in enumerate(parsed.get("chunks", []))]
+
+    def _fail(self, path: str, error, entries: list):
+        logger.error(f"Bulk ingest: failed to ingest {path}: {error}")
+        entries.append(self._entry(path, "failed", error=str(error)))
+        self.stats["failed"] += 1
+
+    def _commit_batch(self, batch: list):
+        """
+        batch: [(path, registry entry, parsed)] -> one embed/index pass + checkpoint.
+        A file that fails is recorded as failed and the rest of the batch is
+        still committed; its stages are only marked once they succeeded.
+        """
+        entries, committed = [], []
+        try:
+            # categorize the whole batch at once: one dedupe / cache / LLM pass across files
+            categorize_rows([row for _, _, parsed in batch for row in parsed.get("rows", [])])
+            categorized = True
+        except Exception:
+            logger.exception("Bulk ingest: batched categorization failed, categorizing file by file")
+            categorized = False
+
+        new_ids = self._insert_new(batch)
+        for i, (path, entry, parsed) in enumerate(batch):
+            try:
+                if not categorized:
+                    categorize_rows(parsed.get("rows", []))
+                document_id = new_ids.get(i, entry.get("document_id"))
+                if isinstance(document_id, Exception):
+                    raise document_id
+                chunks = self._commit_file(path, entry, parsed, document_id)
+            except Exception as e:
+                self._fail(path, e, entries)
+                continue
+            committed.append((path, entry, parsed, document_id, chunks))
+
+        # one embedding call and one index save for the whole batch
+        chunks = [c for *_, file_chunks in committed for c in file_chunks]
+        if chunks:
+            try:
+                self.index.add([text for text, _ in chunks], [meta for _, meta in chunks], save=True)
+            except Exception as e:
+                # stored and labeled, but not searchable yet: the next run indexes them
+                for path, entry, *_ in committed:
+                    if not is_done(entry, "indexed"):
+                        self._fail(path, e, entries)
+                committed = [c for c in committed if is_done(c[1], "indexed")]
+
+        for path, entry, parsed, document_id, file_chunks in committed:
+            if not is_done(entry, "indexed"):
+                mark_stage(entry["_id"], "indexed")
+            rows = len(parsed.get("rows", []))
+            self.stats["rows"] += rows
+            self.stats["chunks"] += len(parsed.get("chunks", []))
+            self.stats["ingested"] += 1
+            entries.append(self._entry(path, "done", hash=entry["_id"], document_id=document_id, rows=rows))
+        flush_writes()
+        self.checkpoint.record(entries)
+
+    def run(self) -> dict:
+        self.started = time.perf_counter()
+        os.makedirs(os.path.join("datasets", "labeled_data"), exist_ok=True)
+        paths = [p for p in walk(self.root) if not self.checkpoint.is_done(p)]
+        self.stats["files"] = len(paths)
+        logger.info(f"Bulk ingest: {len(paths)} file(s) to check under {self.root}")
+
+        # spawn: the parent has writer / exporter threads that must not be forked
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx) as pool:
+            # 1. content hashes, in parallel; known content is skipped before parsing
+            to_parse, skipped, seen = [], [], set()
+            for path, mtime_ns, size, digest in pool.map(_hash_job, paths, chunksize=16):
+                remember_hash(path, mtime_ns, size, digest)
+                entry = register_document(path)
+                if digest in seen or is_done(entry, "parsed", "labeled", "indexed"):
+                    # already ingested, or a copy of a file earlier in this run
+                    skipped.append(self._entry(path, "skipped", hash=digest, document_id=entry.get("document_id")))
+                else:
+                    seen.add(digest)
+                    to_parse.append((path, entry))
+            if skipped:
+                self.checkpoint.record(skipped)
+                self.stats["skipped"] += len(skipped)
+
+            # 2. parse in the pool, commit in batches as results come in
+            entries = dict(to_parse)
+            pending = iter(entries)
+            in_flight = {}
+            batch = []
+
+            def submit():
+                path = next(pending, None)
+                if path is not None:
+                    in_flight[pool.submit(_parse_job, path)] = path
+
+            for _ in range(self.workers * 2):
+                submit()
+            while in_flight:
+                future = next(as_completed(in_flight))
+                path = in_flight.pop(future)
+                submit()
+                try:
+                    _, parsed = future.result()
+                    batch.append((path, entries[path], parsed))
+                except Exception as e:
+                    logger.exception(f"Bulk ingest: failed to parse {path}")
+                    self.checkpoint.record([self._entry(path, "failed", error=str(e))])
+                    self.stats["failed"] += 1
+                if len(batch) >= self.batch_files:
+                    self._commit_batch(batch)
+                    batch = []
+                    logger.info(f"Bulk ingest progress: {self.stats} {self._rates()}")
+            if batch:
+                self._commit_batch(batch)
+
+        return {**self.stats, **self._rates()}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Parallel, resumable bulk ingestion of statement files")
+    ap.add_argument("root", nargs="?", default=os.path.join("datasets", "raw"))
+    ap.add_argument("--workers", type=int, default=BULK_WORKERS)
+    ap.add_argument("--batch-files", type=int, default=BULK_BATCH_FILES)
+    ap.add_argument("--checkpoint", default=None, help=f"default: <root>/{CHECKPOINT_NAME}")
+    ap.add_argument("--no-export", action="store_true", help="skip labeled CSV exports")
+    args = ap.parse_args(argv)
+
+    report = BulkIngest(args.root, workers=args.workers, batch_files=args.batch_files,
+                        checkpoint_path=args.checkpoint, export_csv=not args.no_export).run()
+    print(json.dumps(report, indent=2))
+    return 0 if not report["failed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+# src/orchestration/csv_profile.py
+"""
+Per-file profile cache for fast-mode CSV/XLSX questions.
+
+A profile is built once per (path, mtime, size) and holds:
+ - the typed DataFrame
+ - numeric column aggregates (sum, count, mean, min, max)
+ - per-column extraction results (emails, phones), computed lazily with
+   vectorized pandas string ops and kept for later questions
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+EMAIL_RE = r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}"
+PHONE_RE = r"\b[6-9]\d{9}\b"
+
+EXTRACTORS = {
+    "emails": EMAIL_RE,
+    "phones": PHONE_RE,
+}
+
+CACHE_SIZE = int(os.getenv("FAST_MODE_CACHE_SIZE", "32"))
+
+
+def _read_table(path: str) -> pd.DataFrame:
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".xls", ".xlsx"):
+        return pd.read_excel(path)
+    return pd.read_csv(path)
+
+
+class CsvProfile:
+    def __init__(self, path: str, key: tuple):
+        self.path = path
+        self.key = key
+        self.df = _read_table(path)
+        self.numeric_columns = list(self.df.select_dtypes(include="number").columns)
+        self.aggregates = {
+            col: {
+                "sum": float(self.df[col].sum()),
+                "count": int(self.df[col].count()),
+                "mean": float(self.df[col].mean()) if self.df[col].count() else None,
+                "min": float(self.df[col].min()) if self.df[col].count() else None,
+                "max": float(self.df[col].max()) if self.df[col].count() else None,
+            }
+            for col in self.numeric_columns
+        }
+        self._extractions = {}
+        self._lock = threading.Lock()
+
+    def _column_matches(self, col, pattern: str) -> set:
+        s = self.df[col].dropna().astype(str)
+        return set(s.str.findall(pattern).explode().dropna())
+
+    def extract(self, kind: str) -> list:
+        """Sorted unique matches of EXTRACTORS[kind] across all columns."""
+        with self._lock:
+            if kind not in self._extractions:
+                per_column = {col: self._column_matches(col, EXTRACTORS[kind]) for col in self.df.columns}
+                self._extractions[kind] = {
+                    "per_column": per_column,
+                    "all": sorted(set().union(*per_column.values())) if per_column else [],
+                }
+            return self._extractions[kind]["all"]
+
+    def first_numeric_total(self):
+        if not self.numeric_columns:
+            return None
+        return self.aggregates[self.numeric_columns[0]]["sum"]
+
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _file_key(path: str) -> tuple:
+    st = os.stat(path)
+    return (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+
+def get_profile(path: str) -> CsvProfile:
+    """Return the cached profile for path, rebuilding it if the file changed."""
+    key = _file_key(path)
+    with _cache_lock:
+        profile = _cache.get(key[0])
+        if profile is not None and profile.key == key:
+            _cache.move_to_end(key[0])
+            return profile
+
+    profile = CsvProfile(path, key)
+
+    with _cache_lock:
+        _cache[key[0]] = profile
+        _cache.move_to_end(key[0])
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return profile
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
@@ -1,22 +1,34 @@
 import os
-import pandas as pd
-import re
+import time
+import uuid
+import asyncio
 
 # === Agents ===
+# Task handlers are imported on first use: the executor pulls in FAISS and
+# sentence-transformers, the labeler pdfplumber, fine-tuning torch/transformers.
 from agents.planner import run_planner
-from agents.executor import run_executor
-from agents.reviewer import run_reviewer
-from agents.labeler import run_labeler
+from utils.lazy import LazyCallable
+
+run_executor = LazyCallable("agents.executor", "run_executor")
+run_reviewer = LazyCallable("agents.reviewer", "run_reviewer")
+run_labeler = LazyCallable("agents.labeler", "run_labeler")
+get_faiss_index = LazyCallable("agents.executor", "get_faiss_index")
 
 # === Database & Logging ===
 from db.mongo_client import insert_log
 from utils.logger import logger
+from utils.tracing import span, request_context
 
 # === Fine-tuning & Auto Q/A Gen ===
-from fine_tune.fine_tuner import finetune_local_lora
-from llm.qa_generator import generate_qa_from_chunks
-from db.dataset_manager import save_qa_pairs
+finetune_local_lora = LazyCallable("fine_tune.fine_tuner", "finetune_local_lora")
+generate_qa_from_chunks = LazyCallable("llm.qa_generator", "generate_qa_from_chunks")
+save_qa_pairs = LazyCallable("db.dataset_manager", "save_qa_pairs")
+
+# === Fast mode ===
+get_profile = LazyCallable("orchestration.csv_profile", "get_profile")
 
+# chunks per retrieval (same default as the executor's RETRIEVE_TOP_K)
+RETRIEVE_TOP_K = int(os.getenv("RETRIEVE_TOP_K", "3"))
 
 FAST_KEYWORDS = ["email", "mail", "emails", "mobile", "phone", "total", "sum", "count"]
 
@@ -26,6 +38,7 @@ TASK_MAP = {
     "ensure_indexed": run_executor,
     "label": run_labeler,
     "analysis": run_executor,
+    "anomalies": run_executor,
     "retrieve": run_executor,
     "generate": run_executor,
     "answer": run_executor,
@@ -35,68 +48,147 @@ TASK_MAP = {
 # 🚀 FAST MODE FOR CSV / XLSX QUESTIONS
 # ====================================================
 def fast_extract_csv(file_path, query):
-    try:
-        df = pd.read_csv(file_path)
-    except:
-        df = pd.read_excel(file_path)
-
-    text = "\n".join(df.astype(str).apply(lambda x: " ".join(x), axis=1))
+    # profile (DataFrame, aggregates, extractions) is cached per path + mtime
+    profile = get_profile(file_path)
+    query = query.lower()
 
     # Extract emails
-    if "email" in query.lower():
-        emails = re.findall(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}", text)
-        return list(sorted(set(emails)))
+    if "email" in query:
+        return profile.extract("emails")
 
     # Extract mobile numbers
-    if "mobile" in query.lower() or "phone" in query.lower():
-        mobiles = re.findall(r"\b[6-9]\d{9}\b", text)
-        return list(sorted(set(mobiles)))
+    if "mobile" in query or "phone" in query:
+        return profile.extract("phones")
 
     # Compute totals
-    if "total" in query.lower() or "sum" in query.lower():
-        for col in df.columns:
-            try:
-                numeric = pd.to_numeric(df[col], errors="ignore")
-                if numeric.dtype in ["float64", "int64"]:
-                    return float(numeric.sum())
-            except:
-                continue
-        return "No numeric column found."
+    if "total" in query or "sum" in query:
+        total = profile.first_numeric_total()
+        if total is None:
+            return "No numeric column found."
+        return total
+
+    return profile.df.head(20).to_dict()
+
+
+# ====================================================
+# 🧱 PIPELINE STAGES (shared by sync + async entry points)
+# ====================================================
+MEMORY_KEYS = (
+    "document_id",
+    "parsed_rows",
+    "labels",
+    "analysis",
+    "anomalies",
+    "retrieved",
+    "retrieved_chunks",
+    "summary",
+    "answer"
+)
+
+
+def _fast_mode_doc(input_json: dict):
+    """Return the CSV/XLSX path if the request can be answered in fast mode."""
+    query = input_json.get("user_query", "").lower()
+    doc = input_json.get("doc_id", "")
+    if doc and any(doc.endswith(x) for x in [".csv", ".xlsx"]):
+        if any(k in query for k in FAST_KEYWORDS):
+            return doc
+    return None
+
+
+def _fast_mode_response(fast_answer) -> dict:
+    return {
+        "request_id": "FAST-MODE",
+        "final_answer": fast_answer,
+        "chunks_used": [],
+        "results": []
+    }
+
+
+def _with_request_id(input_json: dict) -> dict:
+    # fix the request_id up front so every span of the request nests under it
+    return {**input_json, "request_id": input_json.get("request_id") or str(uuid.uuid4())}
+
+
+def _stage_name(func, t: dict) -> str:
+    return f"{func.__name__.replace('run_', '')}.{t['type']}"
+
+
+def _new_context(request_id: str, input_json: dict) -> dict:
+    return {
+        "request_id": request_id,
+        "input": input_json,
+        "memory": {}
+    }
+
+
+def _remember(shared_context: dict, out):
+    # Save output in memory
+    if isinstance(out, dict):
+        for k in MEMORY_KEYS:
+            if k in out:
+                shared_context["memory"][k] = out[k]
+
+
+def _generate_and_save_qas(shared_context: dict) -> int:
+    chunks = shared_context["memory"].get("retrieved_chunks", [])
+    if not chunks:
+        return 0
+    qa_pairs = generate_qa_from_chunks(chunks, num_pairs=20)
+    # only pairs that are new to the dataset count towards fine-tuning
+    return save_qa_pairs(qa_pairs)
+
 
-    return df.head(20).to_dict()
+def _run_finetune():
+    logger.info("⚙️ Starting Auto LoRA Fine-Tuning...")
+    finetune_local_lora()
+
+
+def _build_response(request_id: str, shared_context: dict, results: list) -> dict:
+    mem = shared_context["memory"]
+
+    final_answer = (
+        mem.get("answer")
+        or mem.get("summary")
+        or mem.get("retrieved")
+        or results
+    )
+
+    return {
+        "request_id": request_id,
+        "final_answer": final_answer,
+        "chunks_used": mem.get("retrieved_chunks", []),
+        "results": results
+    }
 
 
 # ====================================================
 # 🚀 MAIN ORCHESTRATION PIPELINE
 # ====================================================
 def orchestrate(input_json: dict) -> dict:
+    input_json = _with_request_id(input_json)
+    with request_context(input_json["request_id"]), span("orchestrate"):
+        return _orchestrate(input_json)
+
+
+def _orchestrate(input_json: dict) -> dict:
     query = input_json.get("user_query", "").lower()
-    doc = input_json.get("doc_id", "")
 
     # ---------------------------------------------
     # 🔥 FAST MODE → instant CSV/XLSX answers
     # ---------------------------------------------
-    if doc and any(doc.endswith(x) for x in [".csv", ".xlsx"]):
-        if any(k in query for k in FAST_KEYWORDS):
-            fast_answer = fast_extract_csv(doc, query)
-            return {
-                "request_id": "FAST-MODE",
-                "final_answer": fast_answer,
-                "chunks_used": [],
-                "results": []
-            }
+    fast_doc = _fast_mode_doc(input_json)
+    if fast_doc:
+        return _fast_mode_response(fast_extract_csv(fast_doc, query))
 
     # --------------------------------------------------
     # 🧠 Normal RAG + Agent Pipeline
     # --------------------------------------------------
-    planner_out = run_planner(input_json)
+    with span("planner"):
+        planner_out = run_planner(input_json)
     request_id = planner_out["request_id"]
 
-    shared_context = {
-        "request_id": request_id,
-        "input": input_json,
-        "memory": {}
-    }
+    shared_context = _new_context(request_id, input_json)
 
     results = []
 
@@ -106,27 +198,17 @@ def orchestrate(input_json: dict) -> dict:
             continue
 
         try:
-            out = func({"task": t, "context": shared_context})
-
-            # Save output in memory
-            if isinstance(out, dict):
-                for k in (
-                    "parsed_rows",
-                    "labels",
-                    "analysis",
-                    "retrieved",
-                    "retrieved_chunks",
-                    "summary",
-                    "answer"
-                ):
-                    if k in out:
-                        shared_context["memory"][k] = out[k]
+            started = time.perf_counter()
+            with span(_stage_name(func, t), task_id=t.get("task_id")):
+                out = func({"task": t, "context": shared_context})
+            duration = time.perf_counter() - started
+            _remember(shared_context, out)
 
             # Reviewer
             review = run_reviewer({"result": out, "context": shared_context})
 
             # Store logs
-            insert_log(func.__name__, request_id, t, {"result": out, "review": review})
+            insert_log(func.__name__, request_id, t, {"result": out, "review": review}, duration_sec=duration)
 
             results.append({"task": t, "result": out, "review": review})
 
@@ -136,31 +218,215 @@ def orchestrate(input_json: dict) -> dict:
     # ====================================================
     # 🧩 AUTO Q/A GENERATION + AUTO FINE-TUNING
     # ====================================================
-    chunks = shared_context["memory"].get("retrieved_chunks", [])
-
-    if chunks:
-        qa_pairs = generate_qa_from_chunks(chunks, num_pairs=20)
-        save_qa_pairs(qa_pairs)
-
-        if len(qa_pairs) > 0:
-            logger.info("⚙️ Starting Auto LoRA Fine-Tuning...")
-            finetune_local_lora()
+    if _generate_and_save_qas(shared_context) > 0:
+        _run_finetune()
 
     # ====================================================
     # FINAL ANSWER BUILDING
     # ====================================================
-    mem = shared_context["memory"]
+    return _build_response(request_id, shared_context, results)
 
-    final_answer = (
-        mem.get("answer")
-        or mem.get("summary")
-        or mem.get("retrieved")
-        or results
-    )
 
-    return {
-        "request_id": request_id,
-        "final_answer": final_answer,
-        "chunks_used": mem.get("retrieved_chunks", []),
-        "results": results
-    }
+# ====================================================
+# ⚡ ASYNC + BATCH ORCHESTRATION
+# ====================================================
+# Per-resource concurrency limits. Blocking stages run in worker threads,
+# so these bound how many requests hit Ollama / Mongo / the CPU at once.
+RESOURCE_LIMITS = {
+    "ollama": int(os.getenv("ORCH_OLLAMA_CONCURRENCY", "2")),
+    "mongo": int(os.getenv("ORCH_MONGO_CONCURRENCY", "8")),
+    "cpu": int(os.getenv("ORCH_CPU_CONCURRENCY", str(os.cpu_count() or 2))),
+    "train": 1,
+}
+
+TASK_RESOURCE = {
+    "parse": "cpu",
+    "parse_if_needed": "cpu",
+    "ensure_indexed": "cpu",
+    "label": "cpu",
+    "analysis": "cpu",
+    "anomalies": "cpu",
+    "retrieve": "cpu",
+    "generate": "ollama",
+    "answer": "ollama",
+}
+
+# ingest-style tasks whose output only depends on the document,
+# so identical ones inside a batch are run once and shared
+SHARED_TASK_TYPES = ("parse", "parse_if_needed", "ensure_indexed", "label")
+
+
+class ResourceLimiter:
+    """Runs blocking callables in threads under a semaphore per resource."""
+
+    def __init__(self, limits: dict = None):
+        limits = {**RESOURCE_LIMITS, **(limits or {})}
+        self._sems = {name: asyncio.Semaphore(max(1, n)) for name, n in limits.items()}
+
+    async def run(self, resource: str, fn, *args):
+        async with self._sems[resource]:
+            return await asyncio.to_thread(fn, *args)
+
+
+class _BatchState:
+    """Work shared between the requests of one orchestrate_many call."""
+
+    def __init__(self, limiter: ResourceLimiter):
+        self.limiter = limiter
+        self.hits = {}           # query -> prefetched FAISS hits
+        self.shared_tasks = {}   # (type, doc_id) -> asyncio.Task
+
+    async def run_task(self, func, t: dict, shared_context: dict):
+        resource = TASK_RESOURCE.get(t["type"], "cpu")
+        payload = {"task": t, "context": shared_context}
+
+        def call():
+            with span(_stage_name(func, t), task_id=t.get("task_id")):
+                return func(payload)
+
+        doc_id = t.get("args", {}).get("doc_id")
+        if t["type"] not in SHARED_TASK_TYPES or not doc_id:
+            return await self.limiter.run(resource, call)
+
+        key = (t["type"], doc_id)
+        if key not in self.shared_tasks:
+            self.shared_tasks[key] = asyncio.ensure_future(self.limiter.run(resource, call))
+        return await self.shared_tasks[key]
+
+
+async def _execute_plan(input_json: dict, planner_out: dict, batch: _BatchState, finetune: bool) -> dict:
+    request_id = planner_out["request_id"]
+    with request_context(request_id), span("orchestrate"):
+        return await _execute_tasks(input_json, planner_out, batch, finetune)
+
+
+async def _execute_tasks(input_json: dict, planner_out: dict, batch: _BatchState, finetune: bool) -> dict:
+    request_id = planner_out["request_id"]
+    shared_context = _new_context(request_id, input_json)
+    limiter = batch.limiter
+
+    results = []
+
+    for t in planner_out["tasks"]:
+        func = TASK_MAP.get(t["type"])
+        if not func:
+            continue
+
+        if t["type"] == "retrieve":
+            query = t.get("args", {}).get("query")
+            if query in batch.hits and not t["args"].get("filters"):
+                t = {**t, "args": {**t["args"], "hits": batch.hits[query]}}
+
+        try:
+            started = time.perf_counter()
+            out = await batch.run_task(func, t, shared_context)
+            duration = time.perf_counter() - started
+            _remember(shared_context, out)
+
+            review = run_reviewer({"result": out, "context": shared_context})
+
+            await limiter.run("mongo", insert_log, func.__name__, request_id, t, {"result": out, "review": review}, None, duration)
+
+            results.append({"task": t, "result": out, "review": review})
+
+        except Exception as e:
+            results.append({"task": t, "error": str(e)})
+
+    n_qas = await limiter.run("ollama", _generate_and_save_qas, shared_context)
+    if finetune and n_qas > 0:
+        await limiter.run("train", _run_finetune)
+
+    response = _build_response(request_id, shared_context, results)
+    response["_qa_pairs"] = n_qas
+    return response
+
+
+async def _plan(input_json: dict, batch: _BatchState):
+    fast_doc = _fast_mode_doc(input_json)
+    if fast_doc:
+        query = input_json.get("user_query", "").lower()
+        answer = await batch.limiter.run("cpu", fast_extract_csv, fast_doc, query)
+        return _fast_mode_response(answer), None
+    def plan():
+        with span("planner"):
+            return run_planner(input_json)
+
+    with request_context(input_json.get("request_id")):
+        planner_out = await batch.limiter.run("mongo", plan)
+    return None, planner_out
+
+
+async def orchestrate_async(input_json: dict, limiter: ResourceLimiter = None) -> dict:
+    """
+    Async counterpart of orchestrate(). Blocking stages (Mongo, Ollama,
+    parsing, FAISS) run in worker threads under per-resource limits.
+    """
+    input_json = _with_request_id(input_json)
+    batch = _BatchState(limiter or ResourceLimiter())
+    done, planner_out = await _plan(input_json, batch)
+    if done is not None:
+        return done
+    response = await _execute_plan(input_json, planner_out, batch, finetune=True)
+    response.pop("_qa_pairs", None)
+    return response
+
+
+async def orchestrate_many(inputs: list, limits: dict = None, finetune: bool = True):
+    """
+    Batch API. Yields (index, result) tuples as requests finish.
+
+    - all requests are planned concurrently
+    - retrieval queries of the whole batch are embedded and searched in
+      one FAISS call
+    - identical ingest tasks (same type + doc_id) run once per batch
+    - auto fine-tuning runs at most once, after the whole batch
+    """
+    inputs = [_with_request_id(inp) for inp in inputs]
+    batch = _BatchState(ResourceLimiter(limits))
+
+    async def plan(i, input_json):
+        try:
+            return i, await _plan(input_json, batch)
+        except Exception as e:
+            return i, ({"request_id": input_json.get("request_id"), "error": str(e)}, None)
+
+    planned = await asyncio.gather(*(plan(i, inp) for i, inp in enumerate(inputs)))
+
+    # answered requests (fast mode / planner errors) stream out first
+    pending = []
+    for i, (done, planner_out) in planned:
+        if done is not None:
+            yield i, done
+        else:
+            pending.append((i, planner_out))
+
+    # batched embeddings + FAISS search for every retrieve task in the batch
+    queries = sorted({
+        t["args"]["query"]
+        for _, p in pending
+        for t in p["tasks"]
+        if t["type"] == "retrieve" and t.get("args", {}).get("query") and not t["args"].get("filters")
+    })
+    faiss_index = get_faiss_index() if queries else None
+    if queries and faiss_index.index is not None and faiss_index.index.ntotal > 0:
+        def search():
+            with span("executor.retrieve.batch_search", queries=len(queries)):
+                return faiss_index.search_many(queries, RETRIEVE_TOP_K)
+
+        hits = await batch.limiter.run("cpu", search)
+        batch.hits = dict(zip(queries, hits))
+
+    async def execute(i, planner_out):
+        try:
+            return i, await _execute_plan(inputs[i], planner_out, batch, finetune=False)
+        except Exception as e:
+            return i, {"request_id": planner_out.get("request_id"), "error": str(e)}
+
+    total_qas = 0
+    for fut in asyncio.as_completed([execute(i, p) for i, p in pending]):
+        i, response = await fut
+        total_qas += response.pop("_qa_pairs", 0)
+        yield i, response
+
+    if finetune and total_qas > 0:
+        await batch.limiter.run("train", _run_finetune)
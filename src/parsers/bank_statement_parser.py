@@ -3,16 +3,20 @@ import os
 import re
 import pandas as pd
 from typing import Dict, Any, List
-import pdfplumber
 from utils.logger import logger
+from utils.tracing import traced
+from parsers.chunker import chunk_document
 
-AMOUNT_RE = re.compile(r'-?\d{1,3}(?:,\d{3})*(?:\.\d+)?')
+AMOUNT_RE = re.compile(r'-?(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?')
 
+@traced("parse")
 def parse_bank_statement_file(path: str) -> Dict[str, Any]:
     ext = os.path.splitext(path)[1].lower()
     rows = []
     text = ""
     metadata = {"filetype": ext}
+    row_pages = None     # page of each row (PDF tables)
+    loose_pages = []     # (page, text) not turned into rows
     if ext == ".csv":
         df = pd.read_csv(path)
         rows = df.to_dict(orient="records")
@@ -22,9 +26,11 @@ def parse_bank_statement_file(path: str) -> Dict[str, Any]:
         rows = df.to_dict(orient="records")
         text = df.astype(str).to_string()
     elif ext == ".pdf":
+        import pdfplumber   # only PDFs need it
+        row_pages = []
         try:
             with pdfplumber.open(path) as pdf:
-                for p in pdf.pages:
+                for page_no, p in enumerate(pdf.pages, start=1):
                     # try table extraction
                     try:
                         table = p.extract_table()
@@ -33,13 +39,19 @@ def parse_bank_statement_file(path: str) -> Dict[str, Any]:
                             for r in table[1:]:
                                 record = {header[i] if i < len(header) else f"c{i}": (r[i] if i < len(r) else None) for i in range(len(r))}
                                 rows.append(record)
+                                row_pages.append(page_no)
                         else:
-                            text += p.extract_text() or ""
+                            page_text = p.extract_text() or ""
+                            text += page_text
+                            loose_pages.append((page_no, page_text))
                     except Exception:
-                        text += p.extract_text() or ""
+                        page_text = p.extract_text() or ""
+                        text += page_text
+                        loose_pages.append((page_no, page_text))
         except Exception as e:
             logger.exception("pdf parsing error")
             text = ""
+            loose_pages = []
     else:
         # fallback: treat file as text
         with open(path, "r", errors="ignore") as f:
@@ -47,49 +59,133 @@ def parse_bank_statement_file(path: str) -> Dict[str, Any]:
         for line in text.splitlines():
             if line.strip():
                 rows.append({"line": line.strip()})
-    # basic chunking of text for RAG (split into 500-char chunks)
-    chunks = []
-    for i in range(0, len(text), 500):
-        chunks.append({"text": text[i:i+500], "start": i, "end": i+500})
     # try rule-based labeling to structure rows (best-effort)
     labeled_rows = rule_based_labeling(rows)
+    # chunks for RAG: whole rows / lines, split at page breaks, with
+    # row ids + date and amount ranges for filtered retrieval
+    chunks = chunk_document(labeled_rows, loose_pages, row_pages)
+    metadata["chunk_count"] = len(chunks)
     return {"text": text, "rows": labeled_rows, "chunks": chunks, "metadata": metadata}
 
+# header aliases (lowercased, punctuation dropped) for statements with real columns
+COLUMN_ALIASES = {
+    "date": ("date", "transaction date", "txn date", "tran date", "value date", "posting date", "posted date"),
+    "description": ("description", "narration", "particulars", "details", "transaction details", "remarks", "memo"),
+    "debit": ("debit", "debits", "debit amount", "withdrawal", "withdrawals", "withdrawal amt", "withdrawal amount",
+              "dr", "paid out", "money out"),
+    "credit": ("credit", "credits", "credit amount", "deposit", "deposits", "deposit amt", "deposit amount",
+               "cr", "paid in", "money in"),
+    "amount": ("amount", "transaction amount", "amt"),
+    "balance": ("balance", "closing balance", "running balance", "available balance", "balance amt"),
+}
+_ALIAS_TO_FIELD = {alias: field for field, aliases in COLUMN_ALIASES.items() for alias in aliases}
+_column_cache = {}
+
+
+def _empty(v) -> bool:
+    return v is None or (isinstance(v, float) and v != v) or (isinstance(v, str) and not v.strip())
+
+
+def structured_columns(keys) -> dict:
+    """field -> source column for the recognized headers of a row (cached per header)."""
+    keys = tuple(keys)
+    if keys not in _column_cache:
+        found = {}
+        for key in keys:
+            norm = " ".join(re.sub(r"[^a-z ]", " ", str(key).lower()).split())
+            field = _ALIAS_TO_FIELD.get(norm)
+            if field and field not in found:
+                found[field] = key
+        _column_cache[keys] = found
+    return _column_cache[keys]
+
+
+def cell_amount(v):
+    """Amount in a statement cell: numbers, '1,234.50', '$12', '(40.00)', '12.00 DR'; None when empty."""
+    if _empty(v):
+        return None
+    if isinstance(v, (int, float)):
+        return float(v)
+    text = str(v).strip()
+    sign = -1 if re.search(r"\bdr\.?$", text, re.I) else 1
+    text = re.sub(r"\b(?:cr|dr)\.?$|[^\d.,()+-]", "", text, flags=re.I)
+    try:
+        return sign * parse_amount(text)
+    except ValueError:
+        return None
+
+
+def _label_structured(r: dict, cols: dict):
+    date = None
+    if not _empty(r.get(cols.get("date"))):
+        value = str(r[cols["date"]]).strip()
+        date = extract_date(value) or value
+    debit = cell_amount(r.get(cols["debit"])) if "debit" in cols else None
+    credit = cell_amount(r.get(cols["credit"])) if "credit" in cols else None
+    if debit is None and credit is None and "amount" in cols:
+        amount = cell_amount(r.get(cols["amount"]))
+        if amount is not None:
+            debit, credit = (-amount, None) if amount < 0 else (None, amount)
+    # a debit column holds money out whatever sign the bank printed
+    debit = abs(debit) if debit is not None else None
+    credit = abs(credit) if credit is not None else None
+    balance = cell_amount(r.get(cols["balance"])) if "balance" in cols else None
+    description = r.get(cols["description"]) if "description" in cols else None
+    return date, (None if _empty(description) else str(description).strip()), debit, credit, balance
+
+
+def _label_text(line_text: str):
+    date = extract_date(line_text)
+    # dates contain digit groups and dashes the amount heuristics would pick up
+    text = line_text.replace(date, " ") if date else line_text
+    amounts = AMOUNT_RE.findall(text)
+    debit = credit = balance = None
+    lowered = text.lower()
+    if amounts:
+        if len(amounts) >= 2:
+            # last number is the running balance, the one before it the amount
+            amount, balance = amounts[-2], parse_amount(amounts[-1])
+            if re.search(r"\bdr\b", lowered) or "debit" in lowered or "-" in amount:
+                debit = abs(parse_amount(amount))
+            else:
+                credit = parse_amount(amount)
+        else:
+            val = parse_amount(amounts[-1])
+            if "withdraw" in lowered or "debit" in lowered or "-" in text:
+                debit = abs(val)
+            else:
+                credit = val
+    return date, debit, credit, balance
+
+
 def rule_based_labeling(rows: List[dict]) -> List[dict]:
+    """
+    One labeled row per input row. Rows with recognized columns (Date,
+    Description, Debit / Credit or a signed Amount, Balance, see
+    COLUMN_ALIASES) are read column by column; anything else is treated as
+    a line of text and labeled heuristically.
+    """
     labeled = []
     for idx, r in enumerate(rows):
+        cols = {}
         # If the row is dict with many columns, combine into a single line
         if isinstance(r, dict):
-            line_text = " ".join(str(v) for v in r.values() if v is not None)
+            line_text = " ".join(str(v).strip() for v in r.values() if not _empty(v))
+            cols = structured_columns(r.keys())
         else:
             line_text = str(r)
-        date = extract_date(line_text)
-        amounts = AMOUNT_RE.findall(line_text)
-        debit = credit = None
-        # heuristic: if negative sign or 'dr' present treat as debit
-        if amounts:
-            # take last two numbers, or last one
-            if len(amounts) >= 2:
-                # decide which is debit/credit by keywords
-                if "dr" in line_text.lower() or "debit" in line_text.lower() or "-" in amounts[-1]:
-                    debit = parse_amount(amounts[-1])
-                else:
-                    # fallback: assume last is balance, previous is amount
-                    credit = parse_amount(amounts[-1])
-            else:
-                val = parse_amount(amounts[-1])
-                if "withdraw" in line_text.lower() or "debit" in line_text.lower() or "-" in line_text:
-                    debit = val
-                else:
-                    credit = val
+        if cols.keys() & {"debit", "credit", "amount", "balance"}:
+            date, description, debit, credit, balance = _label_structured(r, cols)
+        else:
+            (date, debit, credit, balance), description = _label_text(line_text), None
         labeled.append({
             "line_id": idx,
             "raw": line_text,
             "date": date,
-            "description": line_text,
+            "description": description or line_text,
             "debit": debit,
             "credit": credit,
-            "balance": None,
+            "balance": balance,
             "category": None
         })
     return labeled
@@ -0,0 +1,299 @@
+# src/parsers/categorizer.py
+"""
+Transaction categorizer for the labeled rows' `category` field.
+
+1. Keyword rules, matched with one Aho-Corasick pass over the normalized
+   description (word-bounded; the longest keyword wins, so "UBER EATS"
+   beats "UBER").
+2. Descriptions no rule matches are looked up in a persistent cache
+   (SQLite, normalized description -> category).
+3. What is still unknown is deduplicated and sent to the LLM in batches
+   of CATEGORY_LLM_BATCH descriptions per prompt; the answers are cached,
+   so a recurring merchant is asked about at most once.
+
+Rules can be replaced with a JSON file {category: [keywords]} via
+CATEGORY_RULES_PATH. CATEGORIZER_LLM=0 disables step 3.
+"""
+import os
+import re
+import json
+import sqlite3
+import threading
+from collections import deque
+from datetime import datetime
+
+from utils.logger import logger
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+CATEGORY_CACHE_PATH = os.getenv("CATEGORY_CACHE_PATH", os.path.join(PROJECT_ROOT, "data", "category_cache.db"))
+CATEGORY_RULES_PATH = os.getenv("CATEGORY_RULES_PATH")
+CATEGORIZER_LLM = os.getenv("CATEGORIZER_LLM", "1") == "1"
+CATEGORY_LLM_BATCH = int(os.getenv("CATEGORY_LLM_BATCH", "40"))
+
+OTHER = "other"
+
+DEFAULT_RULES = {
+    "salary": ["SALARY", "PAYROLL", "WAGES"],
+    "rent": ["RENT", "LEASE"],
+    "utilities": ["ELECTRICITY", "ELECTRIC", "WATER BILL", "GAS BILL", "UTILITY", "BROADBAND", "INTERNET", "MOBILE BILL"],
+    "groceries": ["GROCERY", "SUPERMARKET", "WALMART", "TESCO", "KROGER", "ALDI", "LIDL", "BIGBASKET", "COSTCO"],
+    "dining": ["RESTAURANT", "CAFE", "STARBUCKS", "MCDONALDS", "SWIGGY", "ZOMATO", "UBER EATS", "DOORDASH"],
+    "transport": ["UBER", "LYFT", "OLA", "TAXI", "FUEL", "PETROL", "METRO", "RAILWAY", "AIRLINES"],
+    "shopping": ["AMAZON", "FLIPKART", "EBAY", "MYNTRA"],
+    "subscriptions": ["NETFLIX", "SPOTIFY", "APPLE COM BILL", "YOUTUBE PREMIUM"],
+    "transfer": ["NEFT", "IMPS", "RTGS", "UPI", "TRANSFER", "ZELLE", "WIRE"],
+    "cash": ["ATM", "CASH WITHDRAWAL", "CASH DEPOSIT"],
+    "fees": ["FEE", "FEES", "SERVICE CHARGE", "PENALTY", "OVERDRAFT"],
+    "interest": ["INTEREST", "INT CREDIT"],
+    "tax": ["TAX", "GST", "TDS", "IRS"],
+    "insurance": ["INSURANCE", "PREMIUM"],
+    "loan": ["EMI", "LOAN", "MORTGAGE"],
+    "refund": ["REFUND", "REVERSAL", "CASHBACK"],
+}
+
+# dates, amounts, long reference numbers and punctuation carry no merchant signal
+_NOISE_RE = re.compile(r"\d{1,4}[/-]\d{1,2}[/-]\d{1,4}|[-+]?\d[\d,]*(?:\.\d+)?|[^\w\s]|_")
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_description(text) -> str:
+    text = _NOISE_RE.sub(" ", str(text or "").upper().replace("'", ""))
+    return _WS_RE.sub(" ", text).strip()
+
+
+# ---------------------------------------
+# Aho-Corasick keyword matcher
+# ---------------------------------------
+class KeywordMatcher:
+    """All rule keywords in one automaton; match() is a single pass over the text."""
+
+    def __init__(self, rules: dict):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]     # state -> [(keyword length, category)]
+        for category, keywords in rules.items():
+            for kw in keywords:
+                kw = normalize_description(kw)
+                if kw:
+                    self._insert(f" {kw} ", category)
+        self._build()
+
+    def _insert(self, word: str, category: str):
+        state = 0
+        for ch in word:
+            nxt = self.goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+            state = nxt
+        self.out[state].append((len(word), category))
+
+    def _build(self):
+        # breadth-first, so every failure target is finished before its users
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def match(self, normalized: str):
+        """Category of the longest keyword in the text, or None."""
+        best = None
+        state = 0
+        for ch in f" {normalized} ":
+            while state and ch not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(ch, 0)
+            for length, category in self.out[state]:
+                if best is None or length > best[0]:
+                    best = (length, category)
+        return best[1] if best else None
+
+
+# ---------------------------------------
+# persistent description -> category cache
+# ---------------------------------------
+class CategoryCache:
+    def __init__(self, path: str = CATEGORY_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS categories (key TEXT PRIMARY KEY, category TEXT NOT NULL, "
+                "source TEXT, updated_at TEXT)"
+            )
+        return self._conn
+
+    def get_many(self, keys: list) -> dict:
+        found = {}
+        keys = list(keys)
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                part = keys[i:i + 500]
+                sql = f"SELECT key, category FROM categories WHERE key IN ({','.join('?' * len(part))})"
+                found.update(self.conn.execute(sql, part).fetchall())
+        return found
+
+    def put_many(self, mapping: dict, source: str):
+        if not mapping:
+            return
+        now = datetime.utcnow().isoformat()
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO categories (key, category, source, updated_at) VALUES (?, ?, ?, ?)",
+                [(k, v, source, now) for k, v in mapping.items()],
+            )
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+# ---------------------------------------
+# LLM fallback
+# ---------------------------------------
+def _default_llm(prompt: str) -> str:
+    # imported here so rule/cache-only use does not pull in the HTTP client
+    from llm.answer_generator import _generate
+    return _generate(prompt)
+
+
+def _llm_prompt(descriptions: list, categories: list) -> str:
+    lines = "\n".join(f"{i + 1}. {d}" for i, d in enumerate(descriptions))
+    return f"""
+You categorize bank transactions. Allowed categories: {", ".join(categories)}.
+For each numbered description below, pick exactly one allowed category ("{OTHER}" if none fits).
+Reply with ONLY a JSON object mapping the number to the category, e.g. {{"1": "dining", "2": "{OTHER}"}}.
+
+{lines}
+"""
+
+
+def _parse_llm_reply(raw: str, n: int, allowed: set) -> dict:
+    match = re.search(r"\{.*\}", raw or "", re.S)
+    if not match:
+        return {}
+    try:
+        data = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return {}
+    out = {}
+    for k, v in data.items():
+        try:
+            i = int(k) - 1
+        except (TypeError, ValueError):
+            continue
+        if 0 <= i < n:
+            v = str(v).strip().lower()
+            out[i] = v if v in allowed else OTHER
+    return out
+
+
+# ---------------------------------------
+# engine
+# ---------------------------------------
+class Categorizer:
+    def __init__(self, rules: dict = None, cache: CategoryCache = None, llm=_default_llm,
+                 use_llm: bool = CATEGORIZER_LLM, batch_size: int = CATEGORY_LLM_BATCH):
+        self.rules = rules or DEFAULT_RULES
+        self.matcher = KeywordMatcher(self.rules)
+        self.cache = cache or CategoryCache()
+        self.llm = llm
+        self.use_llm = use_llm
+        self.batch_size = batch_size
+        self.categories = sorted(set(self.rules) | {OTHER})
+        self.stats = {"rule": 0, "cache": 0, "llm": 0, "unknown": 0, "llm_calls": 0}
+
+    def _ask_llm(self, keys: list) -> dict:
+        allowed = set(self.categories)
+        answers = {}
+        for i in range(0, len(keys), self.batch_size):
+            batch = keys[i:i + self.batch_size]
+            try:
+                self.stats["llm_calls"] += 1
+                parsed = _parse_llm_reply(self.llm(_llm_prompt(batch, self.categories)), len(batch), allowed)
+            except Exception:
+                logger.exception(f"Categorizer LLM batch of {len(batch)} failed")
+                continue
+            answers.update({batch[j]: category for j, category in parsed.items()})
+        return answers
+
+    def categorize(self, descriptions: list) -> list:
+        keys = [normalize_description(d) for d in descriptions]
+        resolved = {}
+        for key in set(keys):
+            if key:
+                category = self.matcher.match(key)
+                if category:
+                    resolved[key] = category
+        residue = sorted({k for k in keys if k and k not in resolved})
+
+        cached = self.cache.get_many(residue) if residue else {}
+        resolved.update(cached)
+        residue = [k for k in residue if k not in cached]
+
+        asked = {}
+        if residue and self.use_llm:
+            asked = self._ask_llm(residue)
+            self.cache.put_many(asked, source="llm")
+            resolved.update(asked)
+
+        out = []
+        for key in keys:
+            category = resolved.get(key)
+            if category is None:
+                self.stats["unknown"] += 1
+            elif key in asked:
+                self.stats["llm"] += 1
+            elif key in cached:
+                self.stats["cache"] += 1
+            else:
+                self.stats["rule"] += 1
+            out.append(category)
+        return out
+
+    def label_rows(self, rows: list) -> list:
+        """Fill `category` on rows that have none (in place); returns rows."""
+        todo = [r for r in rows if not r.get("category")]
+        if todo:
+            for row, category in zip(todo, self.categorize([r.get("description") or r.get("raw") for r in todo])):
+                row["category"] = category
+        return rows
+
+
+_categorizer = None
+_categorizer_lock = threading.Lock()
+
+
+def get_categorizer() -> Categorizer:
+    global _categorizer
+    if _categorizer is None:
+        with _categorizer_lock:
+            if _categorizer is None:
+                rules = None
+                if CATEGORY_RULES_PATH and os.path.exists(CATEGORY_RULES_PATH):
+                    with open(CATEGORY_RULES_PATH, "r", encoding="utf-8") as f:
+                        rules = json.load(f)
+                _categorizer = Categorizer(rules)
+    return _categorizer
+
+
+def categorize_rows(rows: list) -> list:
+    return get_categorizer().label_rows(rows)
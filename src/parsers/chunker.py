@@ -0,0 +1,189 @@
+# src/parsers/chunker.py
+"""
+Row- and page-aware chunking for retrieval.
+
+Chunks are built from whole units and never cut one in half:
+
+- statement rows (one labeled row = one line) are packed in order until a
+  chunk reaches CHUNK_TARGET_TOKENS; a page break always starts a new chunk;
+- page text that did not become rows (PDF pages without a table) is packed
+  line by line the same way, again per page.
+
+Tokens are estimated as characters / 4, which is close enough for
+MiniLM / LLM prompt budgets and needs no tokenizer. A single unit longer
+than CHUNK_MAX_TOKENS is split on whitespace as a last resort.
+
+Every chunk carries the metadata retrieval filters on (see chunk_meta):
+row_ids, page_start / page_end, date_min / date_max (ISO) and
+amount_min / amount_max over the debits and credits it contains. A chunk
+without a date or amount range (loose page text, or a vector indexed
+before chunk metadata existed) is not excluded by a range filter; see
+migrate_meta for filling in the date range of such older vectors.
+"""
+import os
+import re
+
+from db.transaction_index import parse_date
+
+CHUNK_TARGET_TOKENS = int(os.getenv("CHUNK_TARGET_TOKENS", "200"))
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "512"))
+
+FILTER_FIELDS = ("row_ids", "page_start", "page_end", "date_min", "date_max", "amount_min", "amount_max")
+_DATE_RE = re.compile(r'\b\d{4}-\d{1,2}-\d{1,2}\b|\b\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4}\b')
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _amount(value):
+    if value in (None, ""):
+        return None
+    try:
+        x = abs(float(str(value).replace(",", "")))
+    except ValueError:
+        return None
+    return x if x == x else None
+
+
+def _split_long(line: str, max_tokens: int) -> list:
+    if estimate_tokens(line) <= max_tokens:
+        return [line]
+    parts, current = [], ""
+    for word in line.split():
+        if current and estimate_tokens(current + " " + word) > max_tokens:
+            parts.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    return parts + ([current] if current else [])
+
+
+class _Builder:
+    """Accumulates units into chunks of about target_tokens."""
+
+    def __init__(self, target_tokens: int):
+        self.target = target_tokens
+        self.chunks = []
+        self._reset()
+
+    def _reset(self):
+        self.lines, self.tokens, self.rows, self.pages = [], 0, [], []
+        self.dates, self.amounts, self.start = [], [], None
+
+    def add(self, line: str, page=None, row=None, offset=None):
+        tokens = estimate_tokens(line)
+        if self.lines and (self.tokens + tokens > self.target or (page is not None and self.pages
+                                                                  and page != self.pages[-1])):
+            self.flush()
+        if self.start is None:
+            self.start = offset
+        self.lines.append(line)
+        self.tokens += tokens
+        if page is not None:
+            self.pages.append(page)
+        if row is not None:
+            self.rows.append(row.get("line_id"))
+            d = parse_date(row.get("date"))
+            if d:
+                self.dates.append(d.isoformat())
+            for key in ("debit", "credit"):
+                a = _amount(row.get(key))
+                if a is not None:
+                    self.amounts.append(a)
+
+    def flush(self):
+        if not self.lines:
+            return
+        text = "\n".join(self.lines)
+        chunk = {"text": text, "tokens": self.tokens}
+        if self.start is not None:
+            chunk.update(start=self.start, end=self.start + len(text))
+        if self.rows:
+            chunk["row_ids"] = self.rows
+        if self.pages:
+            chunk.update(page_start=self.pages[0], page_end=self.pages[-1])
+        if self.dates:
+            chunk.update(date_min=min(self.dates), date_max=max(self.dates))
+        if self.amounts:
+            chunk.update(amount_min=min(self.amounts), amount_max=max(self.amounts))
+        self.chunks.append(chunk)
+        self._reset()
+
+
+def chunk_document(rows: list = None, pages: list = None, row_pages: list = None,
+                   target_tokens: int = CHUNK_TARGET_TOKENS, max_tokens: int = CHUNK_MAX_TOKENS) -> list:
+    """
+    rows:      labeled rows (line_id, raw, date, debit, credit, ...)
+    pages:     [(page number or None, text)] for text not covered by rows,
+               in the order it appears in the parsed document text
+    row_pages: page number of each row (PDF tables), or None
+    """
+    builder = _Builder(target_tokens)
+    for i, row in enumerate(rows or []):
+        line = str(row.get("raw") or row.get("description") or "").strip()
+        if not line:
+            continue
+        page = row_pages[i] if row_pages else None
+        for part in _split_long(line, max_tokens):
+            builder.add(part, page=page, row=row)
+    builder.flush()
+
+    offset = 0
+    for page, text in pages or []:
+        pos = 0
+        for line in (text or "").splitlines(keepends=True):
+            stripped = line.strip()
+            if stripped:
+                for part in _split_long(stripped, max_tokens):
+                    builder.add(part, page=page, offset=offset + pos)
+            pos += len(line)
+        offset += len(text or "")
+        builder.flush()     # pages never share a chunk
+
+    return builder.chunks
+
+
+def chunk_meta(chunk: dict) -> dict:
+    """The filterable metadata of a chunk (stored next to its FAISS vector)."""
+    return {k: chunk[k] for k in FILTER_FIELDS if k in chunk}
+
+
+def migrate_meta(meta: dict) -> bool:
+    """
+    Fill in the date range of a vector indexed before chunk metadata existed
+    (none of FILTER_FIELDS present) from the dates in its stored text.
+    Amounts are left out: the old fixed-size windows mix amounts with
+    balances and reference numbers. Returns True when meta was changed.
+    """
+    if any(k in meta for k in FILTER_FIELDS):
+        return False
+    dates = [parse_date(d) for d in _DATE_RE.findall(meta.get("text") or "")]
+    dates = [d.isoformat() for d in dates if d]
+    if not dates:
+        return False
+    meta.update(date_min=min(dates), date_max=max(dates))
+    return True
+
+
+def matches(meta: dict, filters: dict) -> bool:
+    """
+    filters: document_id, date_from, date_to (ISO), amount_min, amount_max.
+    A chunk matches when its date / amount range overlaps the requested one;
+    a chunk without dates or amounts is kept, since nothing in its metadata
+    rules it out (the vector search still ranks it).
+    """
+    doc = filters.get("document_id")
+    if doc and str(meta.get("document_id")) != str(doc):
+        return False
+    if filters.get("date_from") and meta.get("date_max") and meta["date_max"] < filters["date_from"]:
+        return False
+    if filters.get("date_to") and meta.get("date_min") and meta["date_min"] > filters["date_to"]:
+        return False
+    if filters.get("amount_min") is not None and (
+            meta.get("amount_max") is not None and meta["amount_max"] < filters["amount_min"]):
+        return False
+    if filters.get("amount_max") is not None and (
+            meta.get("amount_min") is not None and meta["amount_min"] > filters["amount_max"]):
+        return False
+    return True
@@ -1,12 +1,32 @@
 # src/rag/embedding_model.py
-from sentence_transformers import SentenceTransformer
 import os
+import threading
+from utils.tracing import traced
 
 MODEL_ID = os.getenv("EMBED_MODEL", "sentence-transformers_all-MiniLM-L6-v2")
 
 # If you downloaded model archive into /models/..., point MODEL_ID to that path.
-MODEL = SentenceTransformer("all-MiniLM-L6-v2")  # ensure model cached locally for offline
+# Loaded on the first embedding call, not at import.
+_model = None
+_model_lock = threading.Lock()
 
+def get_model():
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                from sentence_transformers import SentenceTransformer
+                _model = SentenceTransformer("all-MiniLM-L6-v2")  # ensure model cached locally for offline
+    return _model
+
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+
+@traced("embedding")
 def get_embedding(text: str):
-    emb = MODEL.encode(text, convert_to_numpy=True)
+    emb = get_model().encode(text, convert_to_numpy=True)
     return emb
+
+@traced("embedding.batch")
+def get_embeddings(texts, batch_size: int = EMBED_BATCH_SIZE):
+    # one encode call for the whole list -> (n, dim) matrix
+    return get_model().encode(list(texts), batch_size=batch_size, convert_to_numpy=True)
@@ -1,9 +1,13 @@
 # src/rag/faiss_indexer.py
 import os
+import threading
 import numpy as np
 import faiss
 import pickle
-from .embedding_model import get_embedding
+from .embedding_model import get_embeddings
+from utils.tracing import traced
+from parsers.chunker import matches, migrate_meta
+from utils.logger import logger
 from dotenv import load_dotenv
 load_dotenv()
 FAISS_INDEX_PATH = os.getenv("FAISS_INDEX_PATH", "./src/rag/faiss.index")
@@ -14,36 +18,104 @@ class FaissIndexer:
         self.dim = dim
         self.index = None
         self.metadata = []
+        # the index is shared by concurrent requests (see orchestrate_many)
+        self._lock = threading.RLock()
+        self._by_document = None    # document_id -> vector ids, built on first filtered search
         if os.path.exists(FAISS_INDEX_PATH) and os.path.exists(META_PATH):
             self.load()
         else:
             self.index = faiss.IndexFlatIP(dim)
             self.metadata = []
 
-    def add(self, texts, metas):
-        embs = np.vstack([get_embedding(t) for t in texts])
+    @traced("faiss.add")
+    def add(self, texts, metas, save=True):
+        embs = np.asarray(get_embeddings(texts), dtype="float32")
         # normalize for inner product (cosine similarity)
         faiss.normalize_L2(embs)
-        self.index.add(embs)
-        self.metadata.extend(metas)
-        self.save()
+        with self._lock:
+            self.index.add(embs)
+            self.metadata.extend(metas)
+            self._by_document = None
+            if save:
+                self.save()
 
     def save(self):
-        faiss.write_index(self.index, FAISS_INDEX_PATH)
-        with open(META_PATH, "wb") as f:
-            pickle.dump(self.metadata, f)
+        with self._lock:
+            faiss.write_index(self.index, FAISS_INDEX_PATH)
+            self._save_meta()
 
     def load(self):
-        self.index = faiss.read_index(FAISS_INDEX_PATH)
-        with open(META_PATH, "rb") as f:
-            self.metadata = pickle.load(f)
-
-    def search(self, query, k=5):
-        q_emb = get_embedding(query).reshape(1, -1)
-        faiss.normalize_L2(q_emb)
-        D, I = self.index.search(q_emb, k)
+        with self._lock:
+            self.index = faiss.read_index(FAISS_INDEX_PATH)
+            with open(META_PATH, "rb") as f:
+                self.metadata = pickle.load(f)
+            self._by_document = None
+            # vectors indexed before chunk metadata existed get a date range
+            # from their text, once; the migrated metadata is written back
+            migrated = sum(migrate_meta(m) for m in self.metadata)
+            if migrated:
+                logger.info(f"Migrated chunk metadata of {migrated} FAISS vector(s)")
+                self._save_meta()
+
+    def _save_meta(self):
+        tmp = META_PATH + ".tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(self.metadata, f)
+        os.replace(tmp, META_PATH)
+
+    def search(self, query, k=5, filters=None):
+        return self.search_many([query], k=k, filters=filters)[0]
+
+    def _candidates(self, filters: dict) -> list:
+        """Vector ids whose chunk metadata passes the filters (caller holds the lock)."""
+        ids = range(len(self.metadata))
+        doc = filters.get("document_id")
+        if doc:
+            if self._by_document is None:
+                by_document = {}
+                for i, m in enumerate(self.metadata):
+                    by_document.setdefault(str(m.get("document_id")), []).append(i)
+                self._by_document = by_document
+            ids = self._by_document.get(str(doc), [])
+        return [i for i in ids if matches(self.metadata[i], filters)]
+
+    @traced("faiss.search")
+    def search_many(self, queries, k=5, filters=None):
+        """
+        Batched search: embeds all queries in one call and runs a single
+        FAISS search over the (n, dim) matrix. Returns one hit list per query.
+
+        filters (document_id, date_from/date_to, amount_min/amount_max) are
+        applied to the chunk metadata first; only the matching vectors are
+        searched. Chunks without a date / amount range are not excluded by
+        the range filters.
+        """
+        if not queries:
+            return []
+        q_embs = np.asarray(get_embeddings(queries), dtype="float32")
+        faiss.normalize_L2(q_embs)
+        with self._lock:
+            metadata = self.metadata
+            if filters:
+                ids = self._candidates(filters)
+                if not ids:
+                    return [[] for _ in queries]
+                D, I = self._search_subset(q_embs, k, ids)
+            else:
+                D, I = self.index.search(q_embs, k)
         results = []
-        for idx in I[0]:
-            if idx < len(self.metadata):
-                results.append(self.metadata[idx])
+        for row in I:
+            results.append([metadata[idx] for idx in row if 0 <= idx < len(metadata)])
         return results
+
+    def _search_subset(self, q_embs, k, ids):
+        sel_ids = np.asarray(ids, dtype="int64")
+        try:
+            params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(sel_ids))
+            return self.index.search(q_embs, min(k, len(ids)), params=params)
+        except (AttributeError, TypeError):
+            # faiss without search-time selectors: score the candidates directly
+            vecs = self.index.reconstruct_batch(sel_ids)
+            scores = q_embs @ vecs.T
+            top = np.argsort(-scores, axis=1)[:, :k]
+            return np.take_along_axis(scores, top, axis=1), sel_ids[top]
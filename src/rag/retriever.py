@@ -1,6 +1,6 @@
 # src/rag/retriever.py
 from .faiss_indexer import FaissIndexer
-from db.mongo_client import db
+from db.mongo_client import find_document
 fi = FaissIndexer()
 
 def retrieve(query: str, k=5):
@@ -8,6 +8,6 @@ def retrieve(query: str, k=5):
     # return text + doc meta
     enriched = []
     for h in hits:
-        doc = db.documents.find_one({"_id": h.get("document_id")}) if h.get("document_id") else None
+        doc = find_document(h["document_id"], fields=["filename", "metadata", "version"]) if h.get("document_id") else None
         enriched.append({"meta": h, "document": doc})
     return enriched
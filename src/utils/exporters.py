@@ -0,0 +1,183 @@
+# src/utils/exporters.py
+"""
+Streaming exporters for labeled statements.
+
+- CSV is written from columns (one list per field) with csv.writer over
+  zip(*columns), without building a dict per row.
+- DOCX is written as a raw WordprocessingML package: the table XML for
+  word/document.xml is streamed into the zip in blocks of rows, so memory
+  and time stay linear in the row count (python-docx's add_row() walks
+  the whole table for every new row).
+- export_labeled() runs both exports concurrently.
+- read_csv() loads a labeled CSV export back into row dicts.
+"""
+import os
+import re
+import csv
+import zipfile
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from xml.sax.saxutils import escape
+
+CSV_FIELDS = ["line_id", "date", "description", "debit", "credit", "balance", "category", "raw"]
+DOCX_COLUMNS = [
+    ("Line", "line_id"),
+    ("Date", "date"),
+    ("Description", "description"),
+    ("Debit", "debit"),
+    ("Credit", "credit"),
+    ("Balance", "balance"),
+    ("Category", "category"),
+]
+DOCX_TITLE = "Labeled Bank Statement"
+ROWS_PER_WRITE = 1000
+
+# characters XML 1.0 does not allow
+_INVALID_XML_RE = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def to_columns(rows: list, fields: list) -> dict:
+    """Row dicts -> {field: [values]}."""
+    return {f: [r.get(f) for r in rows] for f in fields}
+
+
+def _ensure_dir(path: str):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+
+# ---------------------------------------
+# CSV
+# ---------------------------------------
+def write_csv(columns: dict, out_path: str, fields: list = CSV_FIELDS):
+    _ensure_dir(out_path)
+    n = len(next(iter(columns.values()), []))
+    cols = [columns.get(f) or [None] * n for f in fields]
+    with open(out_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(fields)
+        writer.writerows(zip(*cols))
+    return out_path
+
+
+def read_csv(in_path: str) -> list:
+    """Rows of a labeled CSV export; empty cells -> None, line ids and amounts as numbers."""
+    rows = []
+    with open(in_path, newline="", encoding="utf-8") as f:
+        for r in csv.DictReader(f):
+            row = {k: (v if v != "" else None) for k, v in r.items()}
+            for key, cast in (("line_id", int), ("debit", float), ("credit", float), ("balance", float)):
+                if row.get(key) is not None:
+                    try:
+                        row[key] = cast(row[key])
+                    except ValueError:
+                        pass
+            rows.append(row)
+    return rows
+
+
+# ---------------------------------------
+# DOCX
+# ---------------------------------------
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '<Override PartName="/word/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>'
+    '</Types>'
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '</Relationships>'
+)
+_DOCUMENT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+_W = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    f'<w:styles {_W}>'
+    '<w:style w:type="paragraph" w:default="1" w:styleId="Normal"><w:name w:val="Normal"/></w:style>'
+    '<w:style w:type="paragraph" w:styleId="Heading1"><w:name w:val="heading 1"/>'
+    '<w:basedOn w:val="Normal"/><w:pPr><w:keepNext/><w:spacing w:before="240" w:after="120"/></w:pPr>'
+    '<w:rPr><w:b/><w:sz w:val="32"/></w:rPr></w:style>'
+    '<w:style w:type="table" w:styleId="TableGrid"><w:name w:val="Table Grid"/><w:tblPr><w:tblBorders>'
+    + "".join(f'<w:{side} w:val="single" w:sz="4" w:space="0" w:color="auto"/>'
+              for side in ("top", "left", "bottom", "right", "insideH", "insideV"))
+    + '</w:tblBorders></w:tblPr></w:style>'
+    '</w:styles>'
+)
+
+
+def _xml_text(value) -> str:
+    if value is None:
+        return ""
+    return escape(_INVALID_XML_RE.sub("", str(value)))
+
+
+def _row_xml(values, header: bool = False) -> str:
+    rpr = "<w:rPr><w:b/></w:rPr>" if header else ""
+    cells = "".join(
+        f'<w:tc><w:p><w:r>{rpr}<w:t xml:space="preserve">{_xml_text(v)}</w:t></w:r></w:p></w:tc>'
+        for v in values
+    )
+    trpr = "<w:trPr><w:tblHeader/></w:trPr>" if header else ""
+    return f"<w:tr>{trpr}{cells}</w:tr>"
+
+
+def write_docx(columns: dict, out_path: str, title: str = DOCX_TITLE, layout: list = DOCX_COLUMNS):
+    _ensure_dir(out_path)
+    n = len(next(iter(columns.values()), []))
+    cols = [columns.get(field) or [None] * n for _, field in layout]
+
+    with zipfile.ZipFile(out_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        zf.writestr("_rels/.rels", _ROOT_RELS)
+        zf.writestr("word/_rels/document.xml.rels", _DOCUMENT_RELS)
+        zf.writestr("word/styles.xml", _STYLES)
+        with zf.open("word/document.xml", "w") as out:
+            out.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                f'<w:document {_W}><w:body>'
+                f'<w:p><w:pPr><w:pStyle w:val="Heading1"/></w:pPr><w:r><w:t>{_xml_text(title)}</w:t></w:r></w:p>'
+                '<w:tbl><w:tblPr><w:tblStyle w:val="TableGrid"/><w:tblW w:w="0" w:type="auto"/></w:tblPr>'
+                '<w:tblGrid>' + '<w:gridCol/>' * len(layout) + '</w:tblGrid>'
+                + _row_xml([h for h, _ in layout], header=True)
+            ).encode("utf-8"))
+            rows = zip(*cols)
+            while True:
+                block = [_row_xml(values) for values in islice(rows, ROWS_PER_WRITE)]
+                if not block:
+                    break
+                out.write("".join(block).encode("utf-8"))
+            out.write('</w:tbl><w:p/><w:sectPr/></w:body></w:document>'.encode("utf-8"))
+    return out_path
+
+
+# ---------------------------------------
+# both at once
+# ---------------------------------------
+def export_labeled(rows: list, csv_path: str = None, docx_path: str = None) -> dict:
+    """Write the CSV and DOCX exports concurrently; returns {"csv": path, "docx": path}."""
+    fields = list(dict.fromkeys(CSV_FIELDS + [f for _, f in DOCX_COLUMNS]))
+    columns = to_columns(rows, fields)
+    jobs = {}
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="export") as pool:
+        if csv_path:
+            jobs["csv"] = pool.submit(write_csv, columns, csv_path)
+        if docx_path:
+            jobs["docx"] = pool.submit(write_docx, columns, docx_path)
+        return {kind: f.result() for kind, f in jobs.items()}
@@ -1,41 +1,86 @@
 # src/utils/file_watcher.py
+"""
+Watches datasets/labeled_data for labeled CSVs and turns them into Q/A
+pairs for the fine-tuning dataset store.
+
+The watchdog observer thread only reports paths to an IngestService
+(utils/ingest_service.py), which debounces events, waits for writes to
+finish and processes files in batches on a worker pool. Progress is kept
+in <watch dir>/.ingest_state.json, so a restart only picks up new files.
+"""
+import os
+import csv
+import json
 import time
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from utils.logger import logger
+from utils.ingest_service import IngestService, WATCHER_WORKERS
 from fine_tune.qagen import generate_qas_from_labeled
-from fine_tune.lora_trainer import fine_tune_lora
-import os
-import json
+from db.dataset_manager import save_qa_pairs
+
+STATE_FILE = ".ingest_state.json"
+
+
+def is_labeled_csv(path: str) -> bool:
+    return path.endswith(".csv") and not os.path.basename(path).startswith(".")
+
+
+def process_labeled_batch(paths: list) -> dict:
+    """Q/A pairs for a batch of labeled CSVs, stored with one dataset write."""
+    results, all_qas = {}, []
+    for path in paths:
+        try:
+            with open(path, "r", newline="", encoding="utf-8") as f:
+                labeled = list(csv.DictReader(f))
+            qas = generate_qas_from_labeled(labeled, source_doc_id=None, n_questions=20)
+        except Exception:
+            logger.exception(f"Failed to process labeled csv {path}")
+            continue
+        # save qas to file for manual inspect
+        out_json = path + ".qapairs.json"
+        with open(out_json, "w", encoding="utf-8") as f:
+            json.dump(qas, f, ensure_ascii=False, indent=2)
+        all_qas += qas
+        results[path] = {"rows": len(labeled), "qa_pairs": len(qas)}
+    added = save_qa_pairs(all_qas) if all_qas else 0
+    logger.info(f"Ingested {len(results)}/{len(paths)} labeled csv(s), {added} new Q/A pair(s)")
+    return results
+
 
 class LabeledDataHandler(FileSystemEventHandler):
-    def __init__(self):
+    def __init__(self, service: IngestService):
         super().__init__()
+        self.service = service
 
     def on_created(self, event):
-        path = event.src_path
-        if path.endswith(".csv") and "datasets/labeled_data" in path:
-            logger.info(f"New labeled csv found: {path}")
-            # Load CSV quickly, create qas, and (optionally) trigger fine-tune
-            import pandas as pd
-            df = pd.read_csv(path)
-            labeled = df.to_dict(orient="records")
-            qas = generate_qas_from_labeled(labeled, source_doc_id=None, n_questions=20)
-            # optional: call fine_tune_lora(qas)
-            # save qas to file for manual inspect
-            out_json = path + ".qapairs.json"
-            with open(out_json, "w", encoding="utf-8") as f:
-                json.dump(qas, f, ensure_ascii=False, indent=2)
-            logger.info(f"Saved QAs to {out_json}")
-
-def start_watcher(path="datasets/labeled_data"):
-    event_handler = LabeledDataHandler()
+        if not event.is_directory:
+            self.service.notify(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.service.notify(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.service.notify(event.dest_path)
+
+
+def start_watcher(path="datasets/labeled_data", workers=WATCHER_WORKERS):
+    os.makedirs(path, exist_ok=True)
+    service = IngestService(process_labeled_batch, state_path=os.path.join(path, STATE_FILE),
+                            workers=workers, accept=is_labeled_csv).start()
+    service.resume(path)
+
     observer = Observer()
-    observer.schedule(event_handler, path=path, recursive=False)
+    observer.schedule(LabeledDataHandler(service), path=path, recursive=False)
     observer.start()
+    logger.info(f"Watching {path} for labeled csvs ({workers} worker(s))")
     try:
         while True:
             time.sleep(1)
     except KeyboardInterrupt:
         observer.stop()
     observer.join()
+    service.drain(timeout=30)
+    service.stop()
@@ -0,0 +1,252 @@
+# src/utils/ingest_service.py
+"""
+Queue-backed file ingest service.
+
+    service = IngestService(process_batch, state_path=".../.ingest_state.json")
+    service.start()
+    service.notify(path)        # from a watchdog handler, any number of times
+    ...
+    service.stop()
+
+- notify() only records the path and the time of its latest event, so a
+  burst of created/modified events for one file collapses into one job.
+  An event for a path that is already queued or being processed stays
+  pending and is debounced again once that run finishes, so a file
+  rewritten mid-ingest is ingested again.
+- A scheduler thread hands a path to the queue once it has been quiet for
+  debounce_sec and its size/mtime stayed the same for stable_sec (the
+  writer has finished).
+- The queue is bounded: when workers fall behind, ready paths stay pending
+  instead of piling up in memory.
+- Each worker takes up to batch_size paths at a time and calls
+  process_batch(paths) -> {path: result}.
+- Finished files are persisted in state_path keyed by (size, mtime_ns), so
+  after a restart resume(directory) only enqueues new or changed files.
+- stop() never blocks on a full queue: workers finish what is queued and
+  exit once it runs dry.
+"""
+import os
+import json
+import time
+import queue
+import threading
+
+from utils.logger import logger
+
+WATCHER_WORKERS = int(os.getenv("WATCHER_WORKERS", "2"))
+WATCHER_QUEUE_SIZE = int(os.getenv("WATCHER_QUEUE_SIZE", "256"))
+WATCHER_BATCH_SIZE = int(os.getenv("WATCHER_BATCH_SIZE", "16"))
+WATCHER_DEBOUNCE_SEC = float(os.getenv("WATCHER_DEBOUNCE_SEC", "1.0"))
+WATCHER_STABLE_SEC = float(os.getenv("WATCHER_STABLE_SEC", "0.5"))
+
+_STOP = object()
+
+
+def _fingerprint(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+class IngestService:
+    def __init__(self, process_batch, state_path: str, workers: int = WATCHER_WORKERS,
+                 queue_size: int = WATCHER_QUEUE_SIZE, batch_size: int = WATCHER_BATCH_SIZE,
+                 debounce_sec: float = WATCHER_DEBOUNCE_SEC, stable_sec: float = WATCHER_STABLE_SEC,
+                 accept=None):
+        self.process_batch = process_batch
+        self.state_path = state_path
+        self.workers = workers
+        self.batch_size = batch_size
+        self.debounce_sec = debounce_sec
+        self.stable_sec = stable_sec
+        self.accept = accept or (lambda path: True)
+
+        self.queue = queue.Queue(maxsize=queue_size)
+        self._pending = {}      # path -> (last event time, fingerprint, fingerprint since)
+        self._queued = set()
+        self._lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._state = self._load_state()
+        self._stop = threading.Event()
+        self._threads = []
+        self.processed = 0
+        self.failed = 0
+
+    # ---------------------------------------
+    # persisted progress
+    # ---------------------------------------
+    def _load_state(self) -> dict:
+        if not os.path.exists(self.state_path):
+            return {}
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            logger.warning(f"Ignoring unreadable ingest state {self.state_path}")
+            return {}
+
+    def _save_state(self):
+        if os.path.dirname(self.state_path):
+            os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._state, f, indent=1)
+        os.replace(tmp, self.state_path)
+
+    def is_done(self, path: str) -> bool:
+        entry = self._state.get(os.path.abspath(path))
+        return bool(entry) and entry.get("fingerprint") == _fingerprint(path)
+
+    def _record(self, results: dict, fingerprints: dict):
+        with self._state_lock:
+            for path, result in results.items():
+                self._state[os.path.abspath(path)] = {
+                    "fingerprint": fingerprints.get(path),
+                    "result": result,
+                    "done_at": time.time(),
+                }
+            self._save_state()
+
+    # ---------------------------------------
+    # intake
+    # ---------------------------------------
+    def notify(self, path: str):
+        """Record a file event; repeated events for the same path coalesce."""
+        if not self.accept(path):
+            return
+        with self._lock:
+            _, fp, since = self._pending.get(path, (None, None, None))
+            self._pending[path] = (time.monotonic(), fp, since)
+
+    def resume(self, directory: str):
+        """Pick up files that are new or changed since the last run."""
+        count = 0
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if os.path.isfile(path) and self.accept(path) and not self.is_done(path):
+                self.notify(path)
+                count += 1
+        if count:
+            logger.info(f"Resuming ingest of {count} file(s) in {directory}")
+        return count
+
+    def _schedule(self):
+        """Move quiet, stable pending paths onto the queue."""
+        now = time.monotonic()
+        with self._lock:
+            # a path being processed waits for that run to finish
+            items = [(p, v) for p, v in self._pending.items() if p not in self._queued]
+        for path, (last_event, fp, since) in items:
+            if now - last_event < self.debounce_sec:
+                continue
+            current = _fingerprint(path)
+            if current is None:
+                with self._lock:
+                    self._pending.pop(path, None)
+                continue
+            if current != fp:
+                # still being written (or first look): restart the stability window
+                with self._lock:
+                    if path in self._pending:
+                        self._pending[path] = (last_event, current, now)
+                continue
+            if now - since < self.stable_sec:
+                continue
+            try:
+                self.queue.put_nowait(path)
+            except queue.Full:
+                return      # backpressure: leave the rest pending
+            with self._lock:
+                # an event that arrived meanwhile stays pending for a later run
+                if self._pending.get(path) == (last_event, fp, since):
+                    del self._pending[path]
+                self._queued.add(path)
+
+    def _scheduler_loop(self):
+        tick = max(0.05, min(self.debounce_sec, self.stable_sec) / 2)
+        while not self._stop.is_set():
+            self._schedule()
+            self._stop.wait(tick)
+
+    # ---------------------------------------
+    # workers
+    # ---------------------------------------
+    def _next_batch(self) -> list:
+        while True:
+            try:
+                first = self.queue.get(timeout=0.5)
+                break
+            except queue.Empty:
+                if self._stop.is_set():
+                    return None
+        if first is _STOP:
+            return None
+        batch = [first]
+        while len(batch) < self.batch_size:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                try:
+                    self.queue.put_nowait(_STOP)   # leave it for the next worker / loop
+                except queue.Full:
+                    pass
+                break
+            batch.append(item)
+        return batch
+
+    def _worker_loop(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            fingerprints = {p: _fingerprint(p) for p in batch}
+            try:
+                results = self.process_batch(batch) or {}
+                self._record(results, fingerprints)
+                self.processed += len(results)
+                self.failed += len(batch) - len(results)
+            except Exception:
+                logger.exception(f"Ingest batch of {len(batch)} file(s) failed")
+                self.failed += len(batch)
+            finally:
+                with self._lock:
+                    self._queued.difference_update(batch)
+
+    # ---------------------------------------
+    # lifecycle
+    # ---------------------------------------
+    def start(self):
+        self._stop.clear()
+        self._threads = [threading.Thread(target=self._scheduler_loop, name="ingest-scheduler", daemon=True)]
+        self._threads += [threading.Thread(target=self._worker_loop, name=f"ingest-worker-{i}", daemon=True)
+                          for i in range(self.workers)]
+        for t in self._threads:
+            t.start()
+        return self
+
+    def idle(self) -> bool:
+        with self._lock:
+            return not self._pending and not self._queued
+
+    def drain(self, timeout: float = None) -> bool:
+        """Wait until every notified path has been processed."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.idle():
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def stop(self):
+        self._stop.set()
+        for _ in range(self.workers):
+            try:
+                self.queue.put_nowait(_STOP)   # wake idle workers at once
+            except queue.Full:
+                break   # busy workers notice _stop once the queue runs dry
+        for t in self._threads:
+            t.join(timeout=5)
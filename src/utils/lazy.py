@@ -0,0 +1,33 @@
+# src/utils/lazy.py
+"""
+Deferred imports for the cold-start path.
+
+    run_executor = LazyCallable("agents.executor", "run_executor")
+
+The target module is imported on the first call, so importing the caller
+(the orchestrator, the Streamlit app, a worker process) does not pull in
+torch, FAISS, sentence-transformers, pdfplumber or a database driver
+until a task that needs them actually runs. __name__ is the target's
+name, so stage names and logs are unchanged.
+"""
+import importlib
+
+
+class LazyCallable:
+    def __init__(self, module: str, name: str):
+        self.module = module
+        self.__name__ = name
+        self._target = None
+
+    def resolve(self):
+        if self._target is None:
+            # importlib holds the per-module import lock, so concurrent first calls are safe
+            self._target = getattr(importlib.import_module(self.module), self.__name__)
+        return self._target
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __repr__(self):
+        state = "loaded" if self._target is not None else "not loaded"
+        return f"<LazyCallable {self.module}.{self.__name__} ({state})>"
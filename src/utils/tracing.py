@@ -0,0 +1,332 @@
+# src/utils/tracing.py
+"""
+Lightweight tracing + latency metrics for the hot path.
+
+Usage:
+    with span("executor.parse", doc=path):
+        ...
+
+    @traced("ollama.generate")
+    def _call_ollama(...): ...
+
+    with request_context(request_id):   # spans below nest under this request
+        ...
+
+Spans nest (parent/child) under the current request_id and every finished
+span feeds a per-stage latency histogram + call/error counters. Metrics are
+exported in Prometheus text format to AUDIT_METRICS_PATH (periodically and
+at exit) and optionally served over HTTP with start_metrics_server().
+Finished spans are appended to AUDIT_TRACE_PATH as JSON lines.
+
+Tracing is off unless AUDIT_TRACING=1 (or enable() is called); when off,
+span() returns a shared no-op object and traced() wrappers only do a
+single flag check.
+"""
+import os
+import json
+import time
+import uuid
+import atexit
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_PATH = os.getenv("AUDIT_METRICS_PATH", os.path.join("logs", "metrics.prom"))
+TRACE_PATH = os.getenv("AUDIT_TRACE_PATH", os.path.join("logs", "traces.jsonl"))
+EXPORT_INTERVAL = float(os.getenv("AUDIT_METRICS_EXPORT_INTERVAL", "15"))
+
+# latency buckets in seconds (upper bounds)
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+_enabled = os.getenv("AUDIT_TRACING", "0") == "1"
+
+_request_id = contextvars.ContextVar("trace_request_id", default=None)
+_current_span = contextvars.ContextVar("trace_current_span", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        i = 0
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float):
+        """Bucket upper bound that covers quantile q (approximate)."""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, c in zip(self.buckets + (float("inf"),), self.counts):
+            seen += c
+            if seen >= target:
+                return bound
+        return float("inf")
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.dirty = False
+
+    def observe(self, stage: str, seconds: float, error: bool = False):
+        with self._lock:
+            h = self.histograms.get(stage)
+            if h is None:
+                h = self.histograms[stage] = Histogram()
+            h.observe(seconds)
+            self.counters[("calls", stage)] = self.counters.get(("calls", stage), 0) + 1
+            if error:
+                self.counters[("errors", stage)] = self.counters.get(("errors", stage), 0) + 1
+            self.dirty = True
+
+    def inc(self, name: str, stage: str, n: int = 1):
+        with self._lock:
+            self.counters[(name, stage)] = self.counters.get((name, stage), 0) + n
+            self.dirty = True
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                stage: {
+                    "count": h.count,
+                    "sum_sec": h.sum,
+                    "avg_sec": h.sum / h.count if h.count else None,
+                    "p50_sec": h.quantile(0.5),
+                    "p95_sec": h.quantile(0.95),
+                    "errors": self.counters.get(("errors", stage), 0),
+                }
+                for stage, h in self.histograms.items()
+            }
+
+    def render_prometheus(self) -> str:
+        lines = [
+            "# HELP audit_stage_latency_seconds Latency of pipeline stages.",
+            "# TYPE audit_stage_latency_seconds histogram",
+        ]
+        with self._lock:
+            for stage, h in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, c in zip(h.buckets, h.counts):
+                    cumulative += c
+                    lines.append(f'audit_stage_latency_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'audit_stage_latency_seconds_bucket{{stage="{stage}",le="+Inf"}} {h.count}')
+                lines.append(f'audit_stage_latency_seconds_sum{{stage="{stage}"}} {h.sum}')
+                lines.append(f'audit_stage_latency_seconds_count{{stage="{stage}"}} {h.count}')
+            names = sorted({name for name, _ in self.counters})
+            for name in names:
+                metric = f"audit_stage_{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                for (n, stage), value in sorted(self.counters.items()):
+                    if n == name:
+                        lines.append(f'{metric}{{stage="{stage}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.dirty = False
+
+
+metrics = MetricsRegistry()
+_finished_spans = deque(maxlen=10000)
+
+
+class Span:
+    __slots__ = ("name", "attrs", "span_id", "parent_id", "trace_id", "start", "duration", "error", "_token")
+
+    def __init__(self, name: str, attrs: dict):
+        self.name = name
+        self.attrs = attrs
+        self.span_id = uuid.uuid4().hex[:16]
+        self.error = None
+        self.duration = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        parent = _current_span.get()
+        self.parent_id = parent.span_id if parent is not None else None
+        self.trace_id = _request_id.get()
+        self._token = _current_span.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.error = exc_type.__name__
+        metrics.observe(self.name, self.duration, error=self.error is not None)
+        _finished_spans.append({
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "duration_sec": self.duration,
+            "error": self.error,
+            "attrs": self.attrs,
+            "ts": time.time(),
+        })
+        _ensure_exporter()
+        return False
+
+
+class _NoopSpan:
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def span(name: str, **attrs):
+    if not _enabled:
+        return _NOOP
+    return Span(name, attrs)
+
+
+def traced(name: str = None):
+    """Decorator form of span(); the stage name defaults to module.function."""
+    def decorator(fn):
+        stage = name or f"{fn.__module__}.{fn.__name__}"
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with Span(stage, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def request_context(request_id: str):
+    """Spans opened inside this block are tagged with request_id."""
+    token = _request_id.set(request_id)
+    try:
+        yield
+    finally:
+        _request_id.reset(token)
+
+
+# ---------------------------------------
+# EXPORT
+# ---------------------------------------
+def _atomic_write(path: str, text: str):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def flush_spans(path: str = TRACE_PATH) -> int:
+    spans = []
+    while _finished_spans:
+        try:
+            spans.append(_finished_spans.popleft())
+        except IndexError:
+            break
+    if spans:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            for s in spans:
+                f.write(json.dumps(s, default=str) + "\n")
+    return len(spans)
+
+
+def export_metrics(path: str = METRICS_PATH, trace_path: str = TRACE_PATH):
+    _atomic_write(path, metrics.render_prometheus())
+    metrics.dirty = False
+    flush_spans(trace_path)
+    return path
+
+
+_exporter_started = False
+_exporter_lock = threading.Lock()
+
+
+def _export_loop():
+    while True:
+        time.sleep(EXPORT_INTERVAL)
+        if metrics.dirty:
+            try:
+                export_metrics()
+            except OSError:
+                pass
+
+
+def _ensure_exporter():
+    global _exporter_started
+    if _exporter_started:
+        return
+    with _exporter_lock:
+        if _exporter_started:
+            return
+        _exporter_started = True
+        threading.Thread(target=_export_loop, name="metrics-exporter", daemon=True).start()
+        atexit.register(lambda: metrics.dirty and export_metrics())
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_metrics_server(port: int = None, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve /metrics (Prometheus text format) from a daemon thread."""
+    port = int(port if port is not None else os.getenv("AUDIT_METRICS_PORT", "9108"))
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
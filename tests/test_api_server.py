@@ -0,0 +1,75 @@
+import json
+import threading
+import urllib.request
+import urllib.error
+from app.api_server import ApiService, make_server
+
+def _post(base, path, body):
+    req = urllib.request.Request(base + path, data=json.dumps(body).encode(), method="POST",
+                                 headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=10) as r:
+            return r.status, json.loads(r.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+def test_saturated_endpoint_answers_429_and_reports_metrics():
+    started, release = threading.Event(), threading.Event()
+
+    def orchestrate(payload):
+        started.set()
+        release.wait(10)
+        return {"final_answer": payload["user_query"]}
+
+    service = ApiService(orchestrate=orchestrate, ingest=lambda path: {},
+                         limits={"query": (1, 0), "ingest": (1, 0)}, queue_timeout=1)
+    server = make_server(service, "127.0.0.1", 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        first = {}
+        t = threading.Thread(target=lambda: first.update(res=_post(base, "/query", {"user_query": "q1"})))
+        t.start()
+        assert started.wait(5)
+        status, body = _post(base, "/query", {"user_query": "q2"})
+        assert status == 429 and body["error"] == "busy"
+        assert _post(base, "/query", {})[0] == 400
+
+        release.set()
+        t.join(5)
+        assert first["res"] == (200, {"final_answer": "q1"})
+
+        with urllib.request.urlopen(base + "/health", timeout=5) as r:
+            health = json.loads(r.read())
+        assert health["endpoints"]["query"]["running"] == 0
+        with urllib.request.urlopen(base + "/metrics", timeout=5) as r:
+            text = r.read().decode()
+        assert 'audit_api_rejected_total{endpoint="query"} 1' in text
+        assert 'audit_api_completed_total{endpoint="query"} 1' in text
+    finally:
+        server.shutdown()
+        service.shutdown()
+
+def test_bad_requests_and_pipeline_errors_are_told_apart(tmp_path):
+    (tmp_path / "stmt.csv").write_text("date,debit\n")
+    outside = tmp_path.parent / "secret.csv"
+    outside.write_text("x")
+
+    def orchestrate(payload):
+        raise ValueError("bug in the pipeline")
+
+    service = ApiService(orchestrate=orchestrate, ingest=lambda path: {"path": path},
+                         limits={"query": (1, 0), "ingest": (1, 0)}, upload_root=str(tmp_path))
+    assert service.workers == 2
+    server = make_server(service, "127.0.0.1", 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        assert _post(base, "/query", {"user_query": "q"}) == (500, {"error": "bug in the pipeline"})
+        assert _post(base, "/ingest", {}) == (400, {"error": "missing field 'path'"})
+        assert _post(base, "/ingest", {"path": str(outside)})[0] == 403
+        assert _post(base, "/ingest", {"path": "../secret.csv"})[0] == 403
+        assert _post(base, "/ingest", {"path": "stmt.csv"}) == (200, {"path": str(tmp_path / "stmt.csv")})
+    finally:
+        server.shutdown()
+        service.shutdown()
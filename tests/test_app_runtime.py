@@ -0,0 +1,61 @@
+import os
+import time
+import threading
+from app.app_runtime import PipelineRunner, save_upload, DONE, FAILED, RUNNING
+
+def test_uploads_are_written_once_per_content(tmp_path):
+    path, digest, created = save_upload(b"date,debit\n2025-01-01,5\n", "stmt.csv", str(tmp_path))
+    again = save_upload(b"date,debit\n2025-01-01,5\n", "stmt.csv", str(tmp_path))
+    assert created and again == (path, digest, False) and os.path.basename(path) == "stmt.csv"
+    edited, _, _ = save_upload(b"date,debit\n2025-01-01,6\n", "stmt.csv", str(tmp_path))
+    assert edited != path and os.path.basename(edited) == "stmt.csv"
+
+def _wait(runner, key):
+    deadline = time.monotonic() + 5
+    while runner.poll(key)[0] == RUNNING and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return runner.poll(key)
+
+def test_runner_dedupes_and_caches_per_query_and_document():
+    release = threading.Event()
+    calls = []
+
+    def orchestrate(payload):
+        calls.append(payload)
+        release.wait(5)
+        if payload["user_query"] == "boom":
+            raise RuntimeError("boom")
+        return {"final_answer": payload["user_query"]}
+
+    runner = PipelineRunner(orchestrate=orchestrate, ingest=lambda path: {}, workers=2)
+    key = runner.submit("Total  Debit", "a.csv", "h1")
+    assert runner.submit("total debit", "a.csv", "h1") == key      # same normalized query, same doc
+    assert runner.poll(key)[0] == RUNNING
+    release.set()
+    assert _wait(runner, key) == (DONE, {"final_answer": "Total  Debit"}) and len(calls) == 1
+
+    runner.submit("total debit", "a.csv", "h1")                     # cached: nothing runs
+    failed = runner.submit("boom")
+    assert _wait(runner, failed)[0] == FAILED and len(calls) == 2
+    runner.submit("boom")                                           # failures stick until forget()
+    assert len(calls) == 2
+    runner.shutdown()
+
+def test_document_less_answers_are_not_reused_after_an_ingest():
+    calls = []
+    runner = PipelineRunner(orchestrate=lambda p: calls.append(p) or {"n": len(calls)},
+                            ingest=lambda path: {}, workers=1)
+    key = runner.submit("across all statements")
+    assert _wait(runner, key) == (DONE, {"n": 1})
+    assert runner.submit("across all statements") == key          # nothing new indexed: cached
+
+    _wait(runner, runner.submit_ingest("b.csv", "h2"))
+    newer = runner.submit("across all statements")
+    assert newer != key and _wait(runner, newer) == (DONE, {"n": 2})
+
+    # the same holds with a document attached: "across" looks past it
+    with_doc = runner.submit("duplicates across all statements", "a.csv", "h1")
+    assert _wait(runner, with_doc) == (DONE, {"n": 3})
+    runner.index_changed()
+    assert runner.submit("duplicates across all statements", "a.csv", "h1") != with_doc
+    runner.shutdown()
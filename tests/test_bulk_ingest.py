@@ -0,0 +1,67 @@
+# tests/test_bulk_ingest.py
+import json
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("faiss")
+
+from db import storage
+from db.sqlite_backend import SQLiteBackend
+from db.document_registry import register_document, lookup_document, is_done
+from orchestration import bulk_ingest
+
+
+class _Index:
+    def __init__(self):
+        self.metas = []
+
+    def add(self, texts, metas, save=True):
+        self.metas.extend(metas)
+
+
+@pytest.fixture
+def backend(tmp_path):
+    b = SQLiteBackend(str(tmp_path / "audit.db"))
+    storage.set_backend(b)
+    yield b
+    b.close()
+    storage.set_backend(None)
+
+
+def test_a_failing_file_is_recorded_and_the_rest_of_the_batch_commits(backend, tmp_path, monkeypatch):
+    written, broken = [], {"b.csv"}
+
+    def write_transactions(document_id, rows):
+        if rows[0]["raw"] in broken:
+            raise ValueError("bad row")
+        written.append(document_id)
+
+    monkeypatch.setattr(bulk_ingest, "FaissIndexer", _Index)
+    monkeypatch.setattr(bulk_ingest, "categorize_rows", lambda rows: rows)
+    monkeypatch.setattr(bulk_ingest, "index_transactions", lambda *args, **kwargs: {})
+    monkeypatch.setattr(bulk_ingest, "write_transactions", write_transactions)
+
+    paths = []
+    for name in ("a.csv", "b.csv", "c.csv"):
+        (tmp_path / name).write_text(f"raw\n{name}\n")
+        paths.append(str(tmp_path / name))
+
+    def batch():
+        return [(p, register_document(p), {"rows": [{"raw": p.rsplit("/", 1)[-1]}], "chunks": [{"text": p}]})
+                for p in paths]
+
+    checkpoint = tmp_path / "checkpoint.jsonl"
+    ingest = bulk_ingest.BulkIngest(str(tmp_path), checkpoint_path=str(checkpoint), export_csv=False)
+    ingest._commit_batch(batch())
+    assert ingest.stats["ingested"] == 2 and ingest.stats["failed"] == 1 and len(written) == 2
+    statuses = {json.loads(line)["path"]: json.loads(line)["status"] for line in checkpoint.read_text().splitlines()}
+    assert statuses == {paths[0]: "done", paths[1]: "failed", paths[2]: "done"}
+    assert not is_done(lookup_document(paths[1]), "parsed") and [m["text"] for m in ingest.index.metas] == [
+        paths[0], paths[2]]
+
+    # the retry reuses the document stored for the failed file instead of storing it again
+    broken.clear()
+    failed_id = lookup_document(paths[1])["document_id"]
+    ingest._commit_batch([b for b in batch() if b[0] == paths[1]])
+    assert written[-1] == failed_id and is_done(lookup_document(paths[1]), "parsed", "labeled", "indexed")
+    assert backend.conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0] == 3
@@ -0,0 +1,49 @@
+# tests/test_bulk_writer.py
+from db.bulk_writer import BulkWriter
+
+def test_batches_writes_and_flushes():
+    calls = []
+    w = BulkWriter(lambda c, docs: calls.append((c, list(docs))), batch_size=3, flush_interval=60)
+    for i in range(7):
+        w.submit("logs", {"i": i})
+    assert w.flush(timeout=5)
+    assert [len(d) for _, d in calls] == [3, 3, 1]
+    assert w.written == 7
+    w.close(timeout=5)
+
+def test_prepare_can_split_documents_and_failures_are_counted():
+    written = {}
+
+    def write_many(c, docs):
+        if c == "broken":
+            raise RuntimeError("boom")
+        written.setdefault(c, []).extend(docs)
+
+    def prepare(c, doc):
+        return [("payloads", {"big": doc.pop("big")}), (c, doc)] if "big" in doc else [(c, doc)]
+
+    w = BulkWriter(write_many, batch_size=100, flush_interval=60, prepare=prepare)
+    w.submit("logs", {"id": 1, "big": "x" * 10})
+    w.submit("broken", {"id": 2})
+    assert w.flush(timeout=5)
+    assert written == {"payloads": [{"big": "x" * 10}], "logs": [{"id": 1}]}
+    assert w.failed == 1
+    w.close(timeout=5)
+
+def test_bad_document_in_prepare_does_not_stop_the_writer():
+    written = []
+
+    def prepare(c, doc):
+        if doc.get("bad"):
+            raise ValueError("cannot prepare")
+        return [(c, doc)]
+
+    w = BulkWriter(lambda c, docs: written.extend(docs), batch_size=100, flush_interval=60, prepare=prepare)
+    w.submit("logs", {"id": 1})
+    w.submit("logs", {"bad": True})
+    assert w.flush(timeout=5)
+    w.submit("logs", {"id": 2})
+    assert w.flush(timeout=5)
+    assert written == [{"id": 1}, {"id": 2}]
+    assert w.failed == 1
+    w.close(timeout=5)
@@ -0,0 +1,27 @@
+# tests/test_categorizer.py
+import json
+from parsers.categorizer import Categorizer, CategoryCache, KeywordMatcher, normalize_description
+
+def test_longest_keyword_wins_on_word_boundaries():
+    m = KeywordMatcher({"transport": ["UBER"], "dining": ["UBER EATS"], "fees": ["FEE"]})
+    assert m.match(normalize_description("POS 12/01/2025 UBER EATS *TRIP 23.10")) == "dining"
+    assert m.match(normalize_description("UBER BV AMSTERDAM")) == "transport"
+    assert m.match(normalize_description("COFFEE SHOP")) is None    # no match inside words
+
+def test_unmatched_descriptions_are_batched_deduped_and_cached(tmp_path):
+    prompts = []
+
+    def llm(prompt):
+        prompts.append(prompt)
+        numbered = [line.split(". ", 1) for line in prompt.splitlines() if line[:1].isdigit()]
+        return json.dumps({n: "dining" if "DINER" in d else "not-a-category" for n, d in numbered})
+
+    cache = CategoryCache(str(tmp_path / "cats.db"))
+    cat = Categorizer(rules={"fees": ["FEE"], "dining": ["RESTAURANT"]}, cache=cache, llm=llm, batch_size=10)
+    out = cat.categorize(["Joe's Diner 12.50", "JOES DINER 8.00", "ACME LTD 100", "Monthly fee 5"])
+    assert out == ["dining", "dining", "other", "fees"]
+    assert len(prompts) == 1 and prompts[0].count("JOES DINER") == 1
+
+    # a fresh engine on the same cache never asks again
+    again = Categorizer(rules={"fees": ["FEE"], "dining": ["RESTAURANT"]}, cache=CategoryCache(str(tmp_path / "cats.db")), llm=llm)
+    assert again.categorize(["joes diner 1.00"]) == ["dining"] and len(prompts) == 1
@@ -0,0 +1,34 @@
+from parsers.chunker import chunk_document, chunk_meta, matches, migrate_meta
+
+def _row(i, date, debit=None, credit=None):
+    return {"line_id": i, "raw": f"{date} PAYMENT TO MERCHANT NUMBER {i:04d} {debit or credit}", "date": date,
+            "debit": debit, "credit": credit}
+
+def test_rows_are_never_split_and_pages_start_new_chunks():
+    rows = [_row(i, f"2025-01-{i + 1:02d}", debit=10.0 * (i + 1)) for i in range(12)]
+    pages = [1] * 6 + [2] * 6
+    chunks = chunk_document(rows, row_pages=pages, target_tokens=40)
+
+    assert [rid for c in chunks for rid in c["row_ids"]] == list(range(12))
+    assert all(c["page_start"] == c["page_end"] for c in chunks)
+    assert all(line in {r["raw"] for r in rows} for c in chunks for line in c["text"].split("\n"))
+    first = chunks[0]
+    assert first["date_min"] == "2025-01-01" and first["amount_min"] == 10.0
+    assert first["date_max"] == rows[first["row_ids"][-1]]["date"]
+
+def test_loose_page_text_keeps_offsets_and_metadata_filters():
+    chunks = chunk_document(pages=[(1, "Opening balance\nSummary line\n"), (2, "Closing notes\n")])
+    assert [c["page_start"] for c in chunks] == [1, 2] and chunks[1]["start"] == len("Opening balance\nSummary line\n")
+
+    meta = {"document_id": "d1", **chunk_meta({"date_min": "2025-01-01", "date_max": "2025-01-31",
+                                               "amount_min": 5.0, "amount_max": 900.0, "text": "x"})}
+    assert matches(meta, {"document_id": "d1", "date_from": "2025-01-15", "amount_min": 500})
+    assert not matches(meta, {"date_from": "2025-02-01"})
+    assert not matches(meta, {"amount_min": 1000})
+    assert matches({"document_id": "d1"}, {"date_to": "2025-01-31", "amount_min": 10})    # no range: kept
+
+def test_vectors_indexed_without_chunk_metadata_get_a_date_range():
+    old = {"document_id": "d1", "chunk_id": 0, "text": "03/01/2025 RENT 1,200.00\n2025-01-20 CAFE 4.50"}
+    assert migrate_meta(old) and (old["date_min"], old["date_max"]) == ("2025-01-03", "2025-01-20")
+    assert "amount_min" not in old and not migrate_meta(old)
+    assert not matches(old, {"date_from": "2025-02-01"})
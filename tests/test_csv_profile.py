@@ -0,0 +1,24 @@
+# tests/test_csv_profile.py
+import os
+import pytest
+
+pytest.importorskip("pandas")
+from orchestration.csv_profile import get_profile, clear_cache
+
+def test_profile_is_reused_until_the_file_changes(tmp_path):
+    clear_cache()
+    path = tmp_path / "contacts.csv"
+    path.write_text("name,amount\na,1\nb,2\n")
+    first = get_profile(str(path))
+    assert get_profile(str(path)) is first and first.first_numeric_total() == 3.0
+
+    path.write_text("name,amount\na,1\nb,2\nc,30\n")                 # size changes
+    second = get_profile(str(path))
+    assert second is not first and second.first_numeric_total() == 33.0
+
+    st = os.stat(path)
+    path.write_text("name,amount\na,1\nb,2\nc,40\n")                 # same size ...
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))  # ... newer mtime
+    third = get_profile(str(path))
+    assert third is not second and third.first_numeric_total() == 43.0
+    clear_cache()
@@ -0,0 +1,35 @@
+# tests/test_data_pipeline.py
+import types
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from fine_tune.data_pipeline import _pack_batch, packing_enabled, CausalLMCollator
+from fine_tune.tokenized_cache import IGNORE_INDEX
+
+def test_collator_keeps_packed_examples_apart():
+    packed = _pack_batch({
+        "input_ids": [[11, 12, 13], [21, 22], [31, 32, 33]],
+        "labels": [[IGNORE_INDEX, 12, 13], [21, 22], [IGNORE_INDEX, 32, 33]],
+    }, seq_len=5)
+    assert packed["position_ids"] == [[0, 1, 2, 0, 1], [0, 1, 2]]
+
+    tokenizer = types.SimpleNamespace(pad_token_id=0, eos_token_id=0)
+    batch = CausalLMCollator(tokenizer)([
+        {k: packed[k][i] for k in ("input_ids", "labels", "position_ids")} for i in range(2)
+    ])
+    # one flattened row, no dense mask that would let examples see each other
+    assert "attention_mask" not in batch
+    assert batch["input_ids"].tolist() == [[11, 12, 13, 21, 22, 31, 32, 33]]
+    assert batch["position_ids"].tolist() == [[0, 1, 2, 0, 1, 0, 1, 2]]
+    # no example learns to predict the first token of the next one
+    assert batch["labels"].tolist() == [[IGNORE_INDEX, 12, 13, IGNORE_INDEX, 22, IGNORE_INDEX, 32, 33]]
+
+def test_packing_only_with_varlen_attention():
+    def model(impl):
+        return types.SimpleNamespace(config=types.SimpleNamespace(_attn_implementation=impl))
+    assert packing_enabled(model("flash_attention_2"))
+    assert not packing_enabled(model("sdpa"))
+    assert not packing_enabled(model("eager"))
+    assert not packing_enabled(model("flash_attention_2"), requested=False)
@@ -0,0 +1,36 @@
+# tests/test_dataset_manager.py
+import json
+from db.dataset_manager import QADatasetStore
+
+def test_dedupes_and_reads_only_new_records(tmp_path):
+    legacy = tmp_path / "qa_dataset.jsonl"
+    legacy.write_text(json.dumps({"question": "Q1?", "answer": "A1"}) + "\n")
+    store = QADatasetStore(root=str(tmp_path / "qa"), legacy_path=str(legacy))
+
+    # legacy pair and near-identical variants are not stored again
+    assert store.add([{"question": "q1", "answer": "a1."}, {"question": "Q2?", "answer": "A2"}]) == 1
+    assert store.add([{"question": "Q2 ?", "answer": " a2"}]) == 0
+
+    records, mark = store.read_new("trainer")
+    assert [r["question"] for r in records] == ["Q1?", "Q2?"]
+    store.commit("trainer", mark)
+
+    store.add([{"question": "Q3?", "answer": "A3"}])
+    records, _ = store.read_new("trainer")
+    assert [r["question"] for r in records] == ["Q3?"]
+
+def test_seen_hashes_survive_restart(tmp_path):
+    root = str(tmp_path / "qa")
+    QADatasetStore(root=root, legacy_path=str(tmp_path / "none.jsonl")).add([{"question": "Q", "answer": "A"}])
+    assert QADatasetStore(root=root, legacy_path=str(tmp_path / "none.jsonl")).add([{"question": "q", "answer": "a"}]) == 0
+
+def test_segments_before_covers_consumed_bytes(tmp_path):
+    store = QADatasetStore(root=str(tmp_path / "qa"), legacy_path=str(tmp_path / "none.jsonl"))
+    store.add([{"question": "Q1", "answer": "A1"}, {"question": "Q2", "answer": "A2"}])
+    _, mark = store.read_new("trainer")
+    store.commit("trainer", mark)
+    store.add([{"question": "Q3", "answer": "A3"}])
+
+    older = store.segments_before(store.watermark("trainer"))
+    assert [r["question"] for s in older for r in store.read_range(s["path"], s["start"], s["end"])] == ["Q1", "Q2"]
+    assert store.segments_before(None) == []
@@ -0,0 +1,30 @@
+# tests/test_exporters.py
+import csv
+import zipfile
+import xml.etree.ElementTree as ET
+from utils.exporters import export_labeled, read_csv
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+def test_csv_and_docx_are_written_from_the_same_rows(tmp_path):
+    rows = [{"line_id": i, "date": "2025-01-02", "description": f"PAY <{i}> & co\x01", "debit": 1.5 * i,
+             "credit": None, "balance": 100 - i, "category": "fees"} for i in range(2500)]
+    out = export_labeled(rows, csv_path=str(tmp_path / "out.csv"), docx_path=str(tmp_path / "out.docx"))
+
+    with open(out["csv"], newline="", encoding="utf-8") as f:
+        read = list(csv.DictReader(f))
+    assert len(read) == 2500 and read[3]["description"] == "PAY <3> & co\x01" and read[3]["credit"] == ""
+
+    with zipfile.ZipFile(out["docx"]) as zf:
+        assert {"[Content_Types].xml", "_rels/.rels", "word/document.xml"} <= set(zf.namelist())
+        body = ET.fromstring(zf.read("word/document.xml"))
+    table_rows = body.findall(f".//{W}tbl/{W}tr")
+    assert len(table_rows) == 2501   # header + rows
+    cells = ["".join(t.text or "" for t in c.iter(f"{W}t")) for c in table_rows[4].findall(f"{W}tc")]
+    assert cells == ["3", "2025-01-02", "PAY <3> & co", "4.5", "", "97", "fees"]
+
+def test_csv_export_reads_back_as_rows(tmp_path):
+    rows = [{"line_id": 0, "date": "2025-01-02", "description": "RENT", "debit": 1200.0, "credit": None,
+             "balance": 300.5, "category": "housing", "raw": "2025-01-02 RENT 1200.00 300.50"}]
+    out = export_labeled(rows, csv_path=str(tmp_path / "out.csv"))
+    assert read_csv(out["csv"]) == rows
@@ -0,0 +1,31 @@
+import os
+import sys
+import subprocess
+
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1000"))
+
+# must not load until a task that needs them runs
+HEAVY = {"torch", "transformers", "peft", "datasets", "sentence_transformers", "faiss",
+         "pdfplumber", "docx", "pymongo", "pandas", "numpy", "requests"}
+
+
+def _importtime(module: str, cwd) -> dict:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd, env={**os.environ, "PYTHONPATH": SRC}, capture_output=True, text=True, timeout=120,
+    )
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    cumulative = {}
+    for line in proc.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line and "cumulative" not in line:
+            _, cum, name = line[len("import time:"):].split("|")
+            cumulative[name.strip()] = int(cum) / 1000
+    return cumulative
+
+
+def test_orchestrator_cold_start_stays_light(tmp_path):
+    modules = _importtime("orchestration.orchestrator", tmp_path)
+    loaded = {name.split(".")[0] for name in modules}
+    assert not loaded & HEAVY, f"heavy modules imported at cold start: {sorted(loaded & HEAVY)}"
+    assert modules["orchestration.orchestrator"] < BUDGET_MS
@@ -0,0 +1,63 @@
+# tests/test_ingest_service.py
+import threading
+from utils.ingest_service import IngestService
+
+def test_events_coalesce_and_progress_survives_restart(tmp_path):
+    calls, lock = [], threading.Lock()
+
+    def process(paths):
+        with lock:
+            calls.append(sorted(paths))
+        return {p: {"ok": True} for p in paths}
+
+    state = str(tmp_path / "state.json")
+    a, b = tmp_path / "a.csv", tmp_path / "b.csv"
+    a.write_text("x\n1\n")
+    b.write_text("x\n2\n")
+
+    service = IngestService(process, state, workers=2, batch_size=8, debounce_sec=0.05, stable_sec=0.05).start()
+    for _ in range(5):
+        service.notify(str(a))
+        service.notify(str(b))
+    assert service.drain(timeout=5)
+    service.stop()
+    assert sorted(p for batch in calls for p in batch) == [str(a), str(b)]
+
+    # after a restart only new or changed files are picked up
+    b.write_text("x\n2\n3\n")
+    calls.clear()
+    service = IngestService(process, state, workers=1, debounce_sec=0.05, stable_sec=0.05,
+                            accept=lambda p: p.endswith(".csv")).start()
+    assert service.resume(str(tmp_path)) == 1
+    assert service.drain(timeout=5)
+    service.stop()
+    assert calls == [[str(b)]]
+
+def test_file_rewritten_during_ingest_is_ingested_again(tmp_path):
+    started, release, runs = threading.Event(), threading.Event(), []
+    a = tmp_path / "a.csv"
+    a.write_text("x\n1\n")
+
+    def process(paths):
+        runs.append(a.read_text())
+        started.set()
+        release.wait(5)
+        return {p: {"ok": True} for p in paths}
+
+    service = IngestService(process, str(tmp_path / "state.json"), workers=1,
+                            debounce_sec=0.05, stable_sec=0.05).start()
+    service.notify(str(a))
+    assert started.wait(5)
+    a.write_text("x\n1\n2\n")
+    service.notify(str(a))
+    release.set()
+    assert service.drain(timeout=5)
+    service.stop()
+    assert runs == ["x\n1\n", "x\n1\n2\n"]
+
+def test_stop_does_not_block_on_a_full_queue(tmp_path):
+    service = IngestService(lambda paths: {}, str(tmp_path / "state.json"), workers=2, queue_size=1)
+    service.queue.put_nowait(str(tmp_path / "a.csv"))
+    done = threading.Event()
+    threading.Thread(target=lambda: (service.stop(), done.set()), daemon=True).start()
+    assert done.wait(5)
@@ -0,0 +1,91 @@
+# tests/test_model_worker.py
+import contextlib
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+pytest.importorskip("peft")
+
+import llm.model_worker as model_worker
+from fine_tune.adapters import publish, version_dir
+
+
+class _Inputs(dict):
+    def to(self, device):
+        return self
+
+
+class _Tokenizer:
+    pad_token_id = 0
+
+    def __call__(self, prompt, return_tensors=None):
+        return _Inputs(input_ids=torch.zeros((1, 2), dtype=torch.long))
+
+    def decode(self, ids, skip_special_tokens=True):
+        return "ok"
+
+
+class _Base:
+    device = "cpu"
+
+
+class _Peft:
+    """Records which adapter every generate() ran with and every set_adapter() call."""
+
+    def __init__(self, path, name):
+        self.adapters = {name: path}
+        self.active_adapter = name
+        self.device = "cpu"
+        self.disabled = False
+        self.served, self.switches = [], []
+
+    @classmethod
+    def from_pretrained(cls, model, path, adapter_name):
+        return cls(path, adapter_name)
+
+    def eval(self):
+        return self
+
+    def load_adapter(self, path, adapter_name):
+        self.adapters[adapter_name] = path
+
+    def delete_adapter(self, name):
+        del self.adapters[name]
+
+    def set_adapter(self, name):
+        self.switches.append(name)
+        self.active_adapter = name
+
+    @contextlib.contextmanager
+    def disable_adapter(self):
+        self.disabled = True
+        try:
+            yield
+        finally:
+            self.disabled = False
+
+    def generate(self, **kwargs):
+        self.served.append("base" if self.disabled else self.active_adapter)
+        return torch.zeros((1, 3), dtype=torch.long)
+
+
+def test_latest_follows_the_latest_file_not_the_pinned_adapter(tmp_path, monkeypatch):
+    monkeypatch.setattr(model_worker, "PeftModel", _Peft)
+    for version in (1, 2):
+        (tmp_path / f"v000{version}").mkdir()
+    publish(2, str(tmp_path))
+
+    worker = model_worker.ModelWorker(adapter_root=str(tmp_path))
+    worker.tokenizer, worker.model = _Tokenizer(), _Base()
+    worker.load_adapter(version_dir(1, str(tmp_path)))
+
+    assert worker.generate("hi")["adapter"] == "v0002"
+    assert worker.generate("hi", adapter="v0001")["adapter"] == "v0001"     # pinned
+    assert worker.generate("hi")["adapter"] == "v0002"                      # latest again
+    assert worker.generate("hi")["adapter"] == "v0002"
+    assert worker.model.served == ["v0002", "v0001", "v0002", "v0002"]
+    assert worker.model.switches == ["v0002", "v0001", "v0002"]             # only on a change
+
+    (tmp_path / "LATEST").unlink()                                           # rolled back to nothing
+    assert worker.generate("hi")["adapter"] == "base"
+    assert worker.model.served[-1] == "base"
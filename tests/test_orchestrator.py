@@ -0,0 +1,38 @@
+# tests/test_orchestrator.py
+import time
+import asyncio
+import threading
+from orchestration import orchestrator
+
+def test_concurrent_queries_on_one_document_share_a_single_parse(monkeypatch):
+    calls, lock = [], threading.Lock()
+
+    def run_executor(payload):
+        task = payload["task"]
+        with lock:
+            calls.append(task["type"])
+        if task["type"] == "parse":
+            time.sleep(0.05)        # long enough for every request to reach its parse task
+            return {"status": "ok", "document_id": "doc-1"}
+        return {"answer": f"{task['args']['doc_id']}: {payload['context']['input']['user_query']}"}
+
+    def run_planner(input_json):
+        args = {"doc_id": input_json["doc_id"]}
+        return {"request_id": input_json["request_id"], "tasks": [
+            {"task_id": "parse", "type": "parse", "args": args},
+            {"task_id": "analysis", "type": "analysis", "args": args},
+        ]}
+
+    for task_type in ("parse", "analysis"):
+        monkeypatch.setitem(orchestrator.TASK_MAP, task_type, run_executor)
+    monkeypatch.setattr(orchestrator, "run_planner", run_planner)
+    monkeypatch.setattr(orchestrator, "run_reviewer", lambda payload: {"ok": True})
+    monkeypatch.setattr(orchestrator, "insert_log", lambda *args: None)
+
+    async def collect():
+        inputs = [{"user_query": f"total debit {i}", "doc_id": "stmt.pdf"} for i in range(4)]
+        return [r async for r in orchestrator.orchestrate_many(inputs, limits={"cpu": 4}, finetune=False)]
+
+    results = dict(asyncio.run(collect()))
+    assert calls.count("parse") == 1 and calls.count("analysis") == 4
+    assert sorted(r["final_answer"] for r in results.values()) == [f"stmt.pdf: total debit {i}" for i in range(4)]
@@ -1,8 +1,37 @@
 # tests/test_parser.py
-from parsers.bank_statement_parser import rule_based_labeling
+import pytest
+
+pytest.importorskip("pandas")
+from parsers.bank_statement_parser import rule_based_labeling, parse_bank_statement_file
 
 def test_rule_labeling_simple():
     rows = [{"line": "2025-01-01 Salary 1,000.00"}, {"line": "2025-01-02 Grocery -50.00"}]
     labeled = rule_based_labeling([r["line"] for r in rows])
     assert len(labeled) == 2
     assert any(r.get("date") for r in labeled)
+
+def test_text_row_amounts_without_thousands_separators():
+    [row] = rule_based_labeling(["2024-01-02 SALARY 2753.53 7753.53"])
+    assert (row["date"], row["debit"], row["credit"], row["balance"]) == ("2024-01-02", None, 2753.53, 7753.53)
+    [row] = rule_based_labeling(["2024-01-04 ATM WITHDRAWAL DR 12380.13 6229.46"])
+    assert (row["debit"], row["credit"], row["balance"]) == (12380.13, None, 6229.46)
+
+def test_structured_statement_keeps_its_columns_and_reconciles(tmp_path):
+    path = tmp_path / "stmt.csv"
+    path.write_text(
+        "Date,Description,Debit,Credit,Balance\n"
+        "2024-01-02,SALARY ACME CORP,,2753.53,7753.53\n"
+        "2024-01-04,ACME SUPPLIES LTD,1143.94,,6609.59\n"
+        "2024-01-04,ATM CASH WITHDRAWAL,380.13,,6229.46\n"
+    )
+    rows = parse_bank_statement_file(str(path))["rows"]
+    assert [(r["date"], r["description"], r["debit"], r["credit"], r["balance"]) for r in rows] == [
+        ("2024-01-02", "SALARY ACME CORP", None, 2753.53, 7753.53),
+        ("2024-01-04", "ACME SUPPLIES LTD", 1143.94, None, 6609.59),
+        ("2024-01-04", "ATM CASH WITHDRAWAL", 380.13, None, 6229.46),
+    ]
+
+    pytest.importorskip("numpy")
+    from agents.validation import validate_rows
+    balance = validate_rows(rows)["checks"]["balance"]
+    assert balance["checked"] and balance["reconciled"] and balance["opening"] == 5000.0
@@ -0,0 +1,32 @@
+# tests/test_planner.py
+from agents.planner import run_planner
+
+def test_debit_flow_parses_then_queries_store():
+    out = run_planner({"user_query": "Total debit by category from 2025-01-01 to 2025-03-31", "doc_id": "stmt.csv"})
+    types = [t["type"] for t in out["tasks"]]
+    assert types == ["parse", "analysis"]
+    args = out["tasks"][1]["args"]
+    assert args["group_by"] == "category"
+    assert args["start_date"] == "2025-01-01" and args["end_date"] == "2025-03-31"
+
+def test_duplicate_question_uses_cross_document_index():
+    out = run_planner({"user_query": "Any duplicate payments across all statements?"})
+    assert [t["type"] for t in out["tasks"]] == ["anomalies"]
+    assert out["tasks"][0]["args"]["kind"] == "duplicate" and out["tasks"][0]["args"]["scope"] == "all"
+
+def test_retrieval_gets_date_and_amount_filters():
+    out = run_planner({"user_query": "Which payments over $500 happened between 01/02/2025 and 2025-02-28?"})
+    filters = out["tasks"][0]["args"]["filters"]
+    assert filters == {"date_from": "2025-02-01", "date_to": "2025-02-28", "amount_min": 500.0}
+
+def test_durations_and_counts_are_not_amount_filters():
+    q = "Show transfers to savings over the last 2025-01-01 statement and more than 3 months old"
+    filters = run_planner({"user_query": q})["tasks"][0]["args"]["filters"]
+    assert "amount_min" not in filters
+    assert "filters" not in run_planner({"user_query": "Anything unpaid for over 2 weeks?"})["tasks"][0]["args"]
+    filters = run_planner({"user_query": "Payments below 1,200 rupees"})["tasks"][0]["args"]["filters"]
+    assert filters == {"amount_max": 1200.0}
+    assert "filters" not in run_planner({"user_query": "When was the balance below 500 rs?"})["tasks"][0]["args"]
+    q = "Payments over $50 while my balance was below 500 rs"
+    filters = run_planner({"user_query": q})["tasks"][0]["args"]["filters"]
+    assert filters == {"amount_min": 50.0}
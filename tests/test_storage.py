@@ -0,0 +1,88 @@
+# tests/test_storage.py
+import os
+import pytest
+from db import storage
+from db.sqlite_backend import SQLiteBackend
+from db import mongo_client
+from db.document_registry import register_document, mark_stage, resolve_document_id
+from app.app_runtime import save_upload
+
+@pytest.fixture
+def backend(tmp_path):
+    b = SQLiteBackend(str(tmp_path / "audit.db"))
+    storage.set_backend(b)
+    yield b
+    b.close()
+    storage.set_backend(None)
+
+def test_documents_are_stored_as_header_chunks_and_text(backend):
+    saved = mongo_client.insert_document({
+        "filename": "stmt.csv",
+        "text": "hello world",
+        "chunks": [{"text": "hello", "start": 0, "end": 5}, {"text": "world", "start": 6, "end": 11}],
+    })
+    doc_id = str(saved["_id"])
+    header = mongo_client.find_document(doc_id)
+    assert header["chunk_count"] == 2 and "chunks" not in header and "text" not in header
+    assert mongo_client.find_document(doc_id, fields=["filename"]) == {"_id": doc_id, "filename": "stmt.csv"}
+    assert mongo_client.get_document_text(doc_id) == "hello world"
+    hits = mongo_client.find_chunks_many([(doc_id, 1), (doc_id, 7)])
+    assert list(hits) == [(doc_id, 1)] and hits[(doc_id, 1)]["text"] == "world"
+
+def test_batched_writes_are_visible_after_flush(backend):
+    log_id = mongo_client.insert_log("run_executor", "req-1", {"type": "parse"}, {"rows": list(range(10))})
+    assert mongo_client.flush_writes(timeout=5)
+    row = backend.conn.execute("SELECT id FROM agents_logs").fetchone()
+    assert row[0] == log_id
+
+def test_registry_versions_changed_content(backend, tmp_path):
+    path = tmp_path / "stmt.csv"
+    path.write_text("a,b\n1,2\n")
+    first = register_document(str(path))
+    assert first["version"] == 1 and first["status"]["parsed"] is False
+    mark_stage(first["_id"], "parsed", document_id="abc")
+    assert register_document(str(path))["status"]["parsed"] is True
+    assert resolve_document_id(str(path)) == "abc"
+
+    path.write_text("a,b\n1,3\n")
+    second = register_document(str(path))
+    assert second["version"] == 2 and second["supersedes"] == first["_id"]
+
+def test_finetune_rollback_restores_previous_adapter(backend, tmp_path):
+    from fine_tune import adapters
+    root = str(tmp_path / "lora")
+    for v in (1, 2):
+        os.makedirs(adapters.version_dir(v, root))
+        mongo_client.insert_finetune_record({"base_model": "m", "adapter_version": v,
+                                             "adapter_dir": adapters.version_dir(v, root), "status": "active"})
+        adapters.publish(v, root)
+    assert adapters.latest_adapter("m")["adapter_version"] == 2
+    assert adapters.next_version(root) == 3
+
+    assert adapters.rollback("m", root)["adapter_version"] == 1
+    assert adapters.current_adapter_dir(root) == adapters.version_dir(1, root)
+    assert adapters.rollback("m", root) is None and adapters.current_adapter_dir(root) is None
+
+def test_incomplete_backend_fails_at_construction():
+    class Partial(storage.StorageBackend):
+        def new_id(self):
+            return "x"
+
+    with pytest.raises(TypeError):
+        Partial()
+
+def test_insert_documents_stores_a_batch_in_one_call(backend):
+    saved = mongo_client.insert_documents([
+        {"filename": f"s{i}.csv", "text": f"text {i}", "chunks": [{"text": f"chunk {i}"}]} for i in range(3)
+    ])
+    ids = [str(s["_id"]) for s in saved]
+    assert len(set(ids)) == 3
+    assert [mongo_client.get_document_text(d) for d in ids] == ["text 0", "text 1", "text 2"]
+    assert mongo_client.find_chunks_many([(ids[2], 0)])[(ids[2], 0)]["text"] == "chunk 2"
+
+def test_edited_app_upload_supersedes_the_previous_version(backend, tmp_path):
+    first, _, _ = save_upload(b"date,debit\n2025-01-01,5\n", "stmt.csv", str(tmp_path))
+    v1 = register_document(first)
+    second, _, _ = save_upload(b"date,debit\n2025-01-01,5\n2025-01-02,7\n", "stmt.csv", str(tmp_path))
+    v2 = register_document(second)
+    assert v2["version"] == 2 and v2["supersedes"] == v1["_id"]
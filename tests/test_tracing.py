@@ -0,0 +1,38 @@
+# tests/test_tracing.py
+from utils import tracing
+from utils.tracing import span, traced, request_context, metrics
+
+def test_spans_nest_under_request_and_feed_histograms(tmp_path):
+    tracing.enable()
+    metrics.reset()
+    try:
+        @traced("inner")
+        def inner():
+            return 1
+
+        with request_context("req-1"):
+            with span("outer") as outer:
+                inner()
+
+        spans = list(tracing._finished_spans)[-2:]
+        assert [s["name"] for s in spans] == ["inner", "outer"]
+        assert spans[0]["parent_id"] == outer.span_id
+        assert all(s["trace_id"] == "req-1" for s in spans)
+
+        snap = metrics.snapshot()
+        assert snap["inner"]["count"] == 1 and snap["outer"]["count"] == 1
+
+        out = tracing.export_metrics(str(tmp_path / "metrics.prom"), str(tmp_path / "traces.jsonl"))
+        text = open(out).read()
+        assert 'audit_stage_latency_seconds_count{stage="outer"} 1' in text
+        assert 'audit_stage_calls_total{stage="inner"} 1' in text
+        assert len(open(tmp_path / "traces.jsonl").readlines()) >= 2
+    finally:
+        tracing.disable()
+
+def test_disabled_tracing_is_noop():
+    tracing.disable()
+    metrics.reset()
+    with span("ignored"):
+        pass
+    assert metrics.snapshot() == {}
@@ -0,0 +1,45 @@
+from db.transaction_index import TransactionIndex
+
+def _row(i, date, description, debit, category="utilities"):
+    return {"line_id": i, "date": date, "description": description, "debit": debit, "credit": None, "category": category}
+
+def test_duplicates_across_documents_within_the_date_window(tmp_path):
+    idx = TransactionIndex(str(tmp_path / "tx.db"), window_days=3)
+    first = idx.add_document("doc-a", [_row(0, "2025-01-10", "ACME POWER 4411", 120.0)])
+    assert first["duplicates"] == [] and first["indexed"] == 1
+
+    second = idx.add_document("doc-b", [
+        _row(0, "2025-01-12", "Acme Power 9982", "120.00"),     # same payee + amount, 2 days later
+        _row(1, "2025-01-30", "ACME POWER", 120.0),             # outside the window
+        _row(2, "2025-01-11", "ACME POWER", 121.0),             # different amount
+    ])
+    assert [d["line_id"] for d in second["duplicates"]] == [0]
+    assert second["duplicates"][0]["detail"]["matches"][0]["document_id"] == "doc-a"
+
+    # re-indexing a document is a no-op that returns the stored flags
+    again = idx.add_document("doc-b", [])
+    assert again["skipped"] and len(again["duplicates"]) == 1
+    assert len(idx.flags(kind="duplicate")["duplicates"]) == 1
+
+def test_outliers_scored_against_category_history(tmp_path):
+    idx = TransactionIndex(str(tmp_path / "tx.db"), min_history=8)
+    history = [_row(i, f"2025-02-{i + 1:02d}", f"GROCER {i}", 50.0 + i, "groceries") for i in range(12)]
+    idx.add_document("doc-a", history)
+    out = idx.add_document("doc-b", [
+        _row(0, "2025-03-01", "GROCER X", 56.0, "groceries"),
+        _row(1, "2025-03-02", "GROCER Y", 900.0, "groceries"),
+    ])
+    assert [a["line_id"] for a in out["anomalies"]] == [1]
+    rules = {r["rule"] for r in out["anomalies"][0]["detail"]["reasons"]}
+    assert rules == {"zscore", "iqr"}
+
+def test_new_version_replaces_the_superseded_one(tmp_path):
+    idx = TransactionIndex(str(tmp_path / "tx.db"), min_history=100)
+    rows = [_row(i, f"2025-04-{i + 1:02d}", f"PAYEE {i}", 10.0 + i) for i in range(5)]
+    idx.add_document("v1", rows)
+    # edited statement: same rows plus one; nothing is a duplicate of its old version
+    out = idx.add_document("v2", rows + [_row(5, "2025-04-09", "PAYEE 5", 99.0)], supersedes="v1")
+    assert out["duplicates"] == [] and out["superseded"] == {"document_id": "v1", "removed": 5}
+    stats = idx._load_stats("utilities", "debit")
+    assert stats.n == 6 and round(stats.mean, 6) == round((sum(10.0 + i for i in range(5)) + 99.0) / 6, 6)
+    assert idx.add_document("v3", rows)["duplicates"]     # an unrelated document still matches
@@ -0,0 +1,20 @@
+# tests/test_validation.py
+import pytest
+
+pytest.importorskip("numpy")
+from agents.validation import validate_rows
+
+def test_reconciliation_and_duplicates_report_offending_rows():
+    rows = [
+        {"date": "2025-01-01", "description": "OPENING", "credit": 100.0, "balance": 100.0},
+        {"date": "2025-01-02", "description": "RENT", "debit": "40.00", "balance": 60.0},
+        {"date": "2025-01-02", "description": "RENT", "debit": "40.00", "balance": 20.0},
+        {"date": None, "description": "FEE", "debit": 5.0, "balance": 10.0},   # should be 15
+    ]
+    checks = validate_rows(rows)["checks"]
+    assert checks["missing_fields"]["date"] == {"count": 1, "ratio": 0.25, "rows": [3]}
+    assert checks["duplicates"]["rows"] == [2]
+    assert checks["negative_amounts"]["count"] == 0
+    balance = checks["balance"]
+    assert balance["rows"] == [3] and balance["opening"] == 0.0 and balance["difference"] == 5.0
+    assert not balance["reconciled"] and all("ms" in c for c in checks.values())